@@ -25,6 +25,7 @@ import pickle
 
 # get global parameters
 from BU2019_CentralParameters import *
+from BU2020_CalendarLookupTables import *
 
 # **************************************************************************************
 # Time and Date Functions
@@ -111,14 +112,20 @@ def GetWeekdayOfDate(DateOrd):
 	Return weekday (1-7) of ordinal date.
 	1 is for Monday, 7 is for Sunday.
 	"""
-	return (date.fromordinal(DateOrd)).isoweekday()
+	# date.fromordinal(1) is a Monday
+	return (DateOrd - 1) % 7 + 1
 
 def GetWeekdayGroupsOfDate(WD, DateOrd, Exclude10 = True):
 	"""
 	Return WeekdayGroup(s) to which the weekday (1-7) of a given date ordinal date belongs.
 	if Exclude10 = True, exclude 10 (all weekdays) from the output list.
 	"""
-	WeekDay = date.fromordinal(DateOrd).isoweekday()
+	WeekDay = (DateOrd - 1) % 7 + 1
+
+	# lookup table for central weekday groups
+	if WD is CalendarLookup['WeekdayGroups']:
+		return list(CalendarLookup['WeekdayGroupsPerWeekday'][bool(Exclude10)][WeekDay])
+
 	WeekdayGroups = set()
 	for WDkey in WD:
 		if WeekDay in WD[WDkey]:
@@ -144,6 +151,14 @@ def GetMatchingTimeWindows(ZF, IntervalStart, IntervalEnd, MeasureTime):
 	How many minutes can a measurement continue into following time window?
 	RequiredMeasureTime -1? Is it decisive at which line the measurement has started?
 	"""
+	# cache for central time windows
+	IfCentralTimeWindows = ZF is CalendarLookup['TimeWindows']
+	if IfCentralTimeWindows:
+		IntervalKey = (IntervalStart, IntervalEnd, MeasureTime)
+		MatchingTimeWindowCache = CalendarLookup['MatchingTimeWindows']
+		if IntervalKey in MatchingTimeWindowCache:
+			return list(MatchingTimeWindowCache[IntervalKey])
+
 	MatchingTimeWindows =   []
 	for key in ZF:
 		TimeWindow = ZF[key]
@@ -153,6 +168,11 @@ def GetMatchingTimeWindows(ZF, IntervalStart, IntervalEnd, MeasureTime):
 		OverlapTime = GetIntersectionLengthOfTwoLines(IntervalStart, IntervalEnd, TimeWindowBegin, TimeWindowEnd)
 		if OverlapTime >= MeasureTime:
 			MatchingTimeWindows.append(key)
+
+	if IfCentralTimeWindows:
+		if len(MatchingTimeWindowCache) >= MaxMatchingTimeWindowCacheSize:
+			MatchingTimeWindowCache.clear()
+		MatchingTimeWindowCache[IntervalKey] = tuple(MatchingTimeWindows)
 	return MatchingTimeWindows
 
 def FindTimeWindowOfTimePoint(ZF, TimePoint):
@@ -163,6 +183,10 @@ def FindTimeWindowOfTimePoint(ZF, TimePoint):
 	Return MatchingTimeWindow
 	Function added at: 16.09.2016 
 	"""
+	# lookup table for central time windows
+	if ZF is CalendarLookup['TimeWindows'] and TimePoint >= 0 and TimePoint < MinutesOfTwoDays:
+		return CalendarLookup['TimeWindowPerMinute'][TimePoint]
+
 	MatchingTimeWindow = None
 	DMin = 24*60 
 	
@@ -1505,32 +1529,90 @@ def CheckIfIdenticalRoutes(Route1, Route2):
 
 	return True
 
+def GetRouteFingerprint(Route):
+	"""
+	Get canonical fingerprint of a route: Sequence of its connection ids.
+
+	Routes with different fingerprints are not identical; routes with equal fingerprints
+	are compared with CheckIfIdenticalRoutes (like virtual first connections without conn_id).
+
+	Returns: Fingerprint (hashable tuple)
+	"""
+	ConnIDInd = ConnInfoInd['conn_id']
+	return tuple(conn[ConnIDInd] for conn in Route)
+
+def InitDistinctRouteStream():
+	"""
+	Initiate a stream of distinct routes, for deduplicating routes while searches 
+	are still producing them (like route search per cluster or start station).
+
+	Returns: RouteStream (dictionary)
+		RouteStream['DistinctRoutes']: List of distinct routes so far
+		RouteStream['RouteIDsPerFingerprint'][Fingerprint] = list of RouteIDs in DistinctRoutes
+		RouteStream['RouteCount']: Number of all added routes, including duplicates
+	"""
+	RouteStream = {
+		'DistinctRoutes': 			[],
+		'RouteIDsPerFingerprint': 	{},
+		'RouteCount': 				0,
+		}
+	return RouteStream
+
+def AddRouteToDistinctRouteStream(RouteStream, Route):
+	"""
+	Add route to a stream of distinct routes.
+
+	Returns: (RouteID, IfNewRoute)
+		RouteID points to corresponding route in RouteStream['DistinctRoutes']
+	"""
+	RouteStream['RouteCount'] += 1
+	DistinctRoutes = RouteStream['DistinctRoutes']
+	Fingerprint = GetRouteFingerprint(Route)
+
+	if Fingerprint in RouteStream['RouteIDsPerFingerprint']:
+		RouteIDs = RouteStream['RouteIDsPerFingerprint'][Fingerprint]
+		for RouteID in RouteIDs:
+			if CheckIfIdenticalRoutes(Route, DistinctRoutes[RouteID]):
+				return (RouteID, False)
+	else:
+		RouteIDs = []
+		RouteStream['RouteIDsPerFingerprint'][Fingerprint] = RouteIDs
+
+	DistinctRoutes.append(Route)
+	RouteIDs.append(len(DistinctRoutes) - 1)
+	return (len(DistinctRoutes) - 1, True)
+
+def AddRoutesToDistinctRouteStream(RouteStream, RouteList):
+	"""
+	Add routes to a stream of distinct routes.
+
+	Returns: NewDistinctRoutes (routes of RouteList that were not in the stream yet)
+	"""
+	NewDistinctRoutes = []
+	for route in RouteList:
+		(RouteID, IfNewRoute) = AddRouteToDistinctRouteStream(RouteStream, route)
+		if IfNewRoute:
+			NewDistinctRoutes.append(route)
+	return NewDistinctRoutes
+
 def GetDistinctRoutes(RouteList):
 	"""
-	Compare each route pair in RouteList to return a list of distinct routes.
+	Get a list of distinct routes in RouteList; routes are compared only if their
+	fingerprints are equal (see GetRouteFingerprint).
 
 	Returns: (DistinctRoutes, RouteIDPerRouteInd)
 
 	Route = RouteList[RouteInd]
 	RouteID points to corresponding route in DistinctRoutes
 	"""
-	DistinctRoutes = [RouteList[0]]
+	RouteStream = InitDistinctRouteStream()
 	RouteIDPerRouteInd = {}
 	
-	for i in range(1, len(RouteList)):
-		route = RouteList[i]
+	for i in range(0, len(RouteList)):
+		(RouteID, IfNewRoute) = AddRouteToDistinctRouteStream(RouteStream, RouteList[i])
+		RouteIDPerRouteInd[i] = RouteID
 
-		for j in range(0, len(DistinctRoutes)):
-			droute = DistinctRoutes[j]
-			if CheckIfIdenticalRoutes(route, droute):
-				RouteIDPerRouteInd[i] = j 
-				break
-
-		if not i in RouteIDPerRouteInd:
-			DistinctRoutes.append(route)
-			RouteIDPerRouteInd[i] = len(DistinctRoutes) - 1
-
-	return (DistinctRoutes, RouteIDPerRouteInd)
+	return (RouteStream['DistinctRoutes'], RouteIDPerRouteInd)
 
 
 def PrettyStringAggregateConnection(ConnInfo, AggrConnInfoIndex):
@@ -1772,6 +1854,41 @@ def GenerateTourNumber(VariantNr, VariantToRoute, DepotIDPerRouteInd, PlanYear,
 # **************************************************************************************
 import psycopg2
 
+def FetchAllRowsInBatches(cursor, BatchSize=10000):
+	"""
+	Fetch all rows of an executed query with bulk reads (fetchmany) of BatchSize rows.
+
+	Returns: List of rows
+	"""
+	rows = []
+	batch = cursor.fetchmany(BatchSize)
+	while batch:
+		rows.extend(batch)
+		batch = cursor.fetchmany(BatchSize)
+	return rows
+
+# number of last opened server-side cursor, see FetchRowBatchesWithServerSideCursor
+ServerSideCursorNumber = [0]
+
+def FetchRowBatchesWithServerSideCursor(dbcon, SQL, SQLparams=None, BatchSize=10000):
+	"""
+	Execute a parameterized query with a named (server-side) cursor on connection dbcon, and yield
+	its rows in batches of BatchSize rows; only one batch at a time is transferred from the database
+	server, unlike fetchmany of a default (client-side) cursor after execute.
+	A named cursor requires an open transaction (no autocommit) and cannot run EXECUTE of a prepared statement.
+	"""
+	ServerSideCursorNumber[0] += 1
+	cursor = dbcon.cursor(name='ssc_%s' % ServerSideCursorNumber[0])
+	cursor.itersize = BatchSize
+	try:
+		cursor.execute(SQL, SQLparams)
+		batch = cursor.fetchmany(BatchSize)
+		while batch:
+			yield batch
+			batch = cursor.fetchmany(BatchSize)
+	finally:
+		cursor.close()
+
 def GetAllDistinctLineIDsFromView(dbparams):
 	"""
 	Get all distinct line IDs from the QDABA view v_tourenplan_fahrten_linien.
@@ -1786,13 +1903,9 @@ def GetAllDistinctLineIDsFromView(dbparams):
 	SQL = "SELECT distinct id_linie FROM qdababav.v_tourenplan_fahrten_linien;"
 	cur.execute(SQL)
 
-	ctr = 0 
-	row = cur.fetchone()
-	while row:
-		ctr += 1
+	for row in FetchAllRowsInBatches(cur):
 		lineID = row[0]
 		if lineID != '-1': ListOfLineIDs.append(lineID)
-		row = cur.fetchone()
 
 	if con: con.close() 
 	return ListOfLineIDs
@@ -1863,9 +1976,16 @@ def VerfuegbarkeitTK(DBparameters,PeriodBegin,PeriodEnd,project):
 			AND anwendungsfalllang = '%s');''' % (PeriodBegin, PeriodEnd, project)
 
 	cursor.execute(SQL)
-	data = cursor.fetchall()
+	data = FetchAllRowsInBatches(cursor)
+	conn.close()
 
+	return GetAvailabilityOfTCsFromExclusionRows(data)
 
+def GetAvailabilityOfTCsFromExclusionRows(data):
+	'''
+	Erstellt das Dictionairy der Verfuegbarkeiten (siehe VerfuegbarkeitTK) aus den Zeilen
+	der Tabelle tp_bav.ausschlusstermin (SELECT *).
+	'''
 	# Datenstruktur Ausschlusstermine {(Testkundennummer, Tag): [(ZeitraumVerfuegbarkeit1),(ZeitraumVerfuegbarkeit2)]}
 	Ausschlusstermine = {}
 
@@ -1939,7 +2059,15 @@ def TestKunden(DBparameters,project):
 			AND anwendungsfall.id_anwendungsfall = anwenderanwendungsfall.id_anwendungsfall
 			AND anwendungsfalllang = '%s';''' % project
 	cursor.execute(SQL_TK)
-	TKdata = cursor.fetchall()
+	TKdata = FetchAllRowsInBatches(cursor)
+	conn.close()
+
+	return GetTestCustomersFromRows(TKdata)
+
+def GetTestCustomersFromRows(TKdata):
+	"""
+	Erstellt das Dictionairy der Testkunden (siehe TestKunden) aus Zeilen (id_anwender, vorname, name).
+	"""
 	TestkundenDaten = {}
 	for TK in TKdata:
 		TK_ID = int(TK[0])
@@ -1968,14 +2096,22 @@ def MaxBlockTageTC(DBparameters,PeriodBegin, PeriodEnd):
 				WHERE datum BETWEEN '%s' AND '%s' ''' % (PeriodBegin, PeriodEnd)
 
 	cursor.execute(SQL_BT)
-	BTdata = cursor.fetchall()
+	BTdata = FetchAllRowsInBatches(cursor)
+	conn.close()
+
+	return GetMaxBlockDaysFromTCDataRows([row[1:4] for row in BTdata])
+
+def GetMaxBlockDaysFromTCDataRows(BTdata):
+	"""
+	Erstellt das Dictionairy der maximalen Blocktage (siehe MaxBlockTageTC) aus Zeilen 
+	(id_testkunde, typ, wert) der Tabelle tp_bav.testkunden_daten.
+	"""
 	MaxBlockTage ={}
-	AlternativeDepotTK = {}
 
 	for row in BTdata:
-		TK_ID = int(row[1])
-		typ = row[2]
-		wert = row[3]
+		TK_ID = int(row[0])
+		typ = row[1]
+		wert = row[2]
 
 		# Blocktage. Maximale Anzahl an auf einander folgenden Touren (in Tagen). {Testkundennummer: Anzahl Blocktage}
 		if typ == 'tourenverteilung':
@@ -2032,8 +2168,16 @@ def AlternativeDepotTK(DBparameters,PeriodBegin,PeriodEnd):
 				WHERE datum BETWEEN '%s' AND '%s' ''' % (PeriodBegin, PeriodEnd)
 
 	cursor.execute(SQL_ZD)
-	ZDdata = cursor.fetchall()
+	ZDdata = FetchAllRowsInBatches(cursor)
+	conn.close()
 
+	return GetAlternativeDepotsFromTCDataRows(ZDdata)
+
+def GetAlternativeDepotsFromTCDataRows(ZDdata):
+	"""
+	Erstellt das Dictionairy der alternativen Depots (siehe AlternativeDepotTK) aus Zeilen 
+	(id_testkunde, typ, wert) der Tabelle tp_bav.testkunden_daten.
+	"""
 	AlternativeDepot ={}
 	for row in ZDdata:
 		TK_ID = int(row[0])
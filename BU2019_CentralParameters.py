@@ -19,10 +19,16 @@ import os
 #######################################################################################
 
 
-os.chdir("C:\Users\Muhammed Karakurt\Desktop\IE 492 Final Project\Codes\IE492-BASE")
+ProjectDirectory = "C:\Users\Muhammed Karakurt\Desktop\IE 492 Final Project\Codes\IE492-BASE"
+if os.path.isdir(ProjectDirectory):
+	os.chdir(ProjectDirectory)
 
-f = open('pass.txt', 'r')
-pass_=f.readline()
+# database password; no password file is needed for file-based timetable sources (see SetTimetableSource)
+pass_ = None
+if os.path.exists('pass.txt'):
+	f = open('pass.txt', 'r')
+	pass_=f.readline()
+	f.close()
 
 
 # primary database
@@ -166,6 +172,10 @@ def GetWeekdayGroupsOfDate_(WD, DateOrd, Exclude10 = True):
 FPLAN_BeginDate = date(2017,12,10)
 FPLAN_EndDate = date(2018,12,8)
 
+# timetable has generated columns trafficdays_bits and weekdays_mask (see PrepareTimetableTrafficDayColumns);
+# SQL conditions for traffic days and weekdays are then single bit mask predicates
+TimetableHasTrafficDayBits = False
+
 # measurement period (first and last days of measurement period)
 PlanYear = 2018
 PlanMonth = 4
@@ -192,6 +202,9 @@ TrWay['YT'] = 'ZF+T'	# Zu Fuss + Tram
 # directory for saved variables
 VariableDirectory = 'SavedVariables'
 
+# directory for cached timetable query results (see ReadTimeTable); None: no caching
+TimeTableCacheDirectory = None
+
 # required minimum time for a line measurement, in minutes
 ReqLineMeasureTime = 5
 
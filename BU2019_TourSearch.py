@@ -19,6 +19,11 @@ from datetime import datetime
 from datetime import timedelta
 import calendar
 import itertools as it
+import heapq
+import hashlib
+import pickle
+import multiprocessing
+import numpy as np
 
 from BU2019_CentralParameters import *
 from BU2019_BasicFunctionsLib import *
@@ -266,6 +271,46 @@ class Cond:
 		Example: Cond.VisitAConnectionOnlyOnce: ()
 		"""
 
+	SelectRoutesWithPositiveReducedCost = 101
+	SelectRoutesWithPositiveReducedCost_explain = """
+		Pricing condition for column generation: Select only routes whose reduced cost
+		(value of LM coverage w.r.t. dual prices minus duration cost) is greater than 
+		MinReducedCost. See GetReducedCostOfRoute.
+
+		Parameters:
+		1) DualPricePerLineKey[LineKey] = price of a line measurement
+		2) RouteCostPerMinute: Duration cost of route per minute
+		3) MinReducedCost: Min required reduced cost of a route (like 0)
+		Example: Cond.SelectRoutesWithPositiveReducedCost: (DualPricePerLineKey, 1.0, 0)
+		"""
+
+	MaxNumberOfSubsequentStationPassagesOnFoot = 102
+	MaxNumberOfSubsequentStationPassagesOnFoot_explain = """
+		Maximum number of subsequent on-foot station passages (Zu Fuss, see TrWay) to nearby stations.
+		On-foot passages are only added to the next connections if footpaths are set (see SetFootpaths).
+
+		Parameters: MaxNumber (0: no on-foot passages)
+		Example: Cond.MaxNumberOfSubsequentStationPassagesOnFoot: (1,)
+		"""
+
+	TakeADirectLineConnectionFromStation1ToStation2 = 103
+	TakeADirectLineConnectionFromStation1ToStation2_explain = """
+		Route must go from Station1 to Station2 with a single trip (without line change).
+		Departures from Station1 are checked with the trip station-chain index (see BuildTripChainIndex).
+
+		Parameters: Station1, Station2
+		Example: Cond.TakeADirectLineConnectionFromStation1ToStation2: (8503000, 8507000)
+		"""
+
+	ConnectStationPairsWithASingleLine = 104
+	ConnectStationPairsWithASingleLine_explain = """
+		Route must go from Station1 to Station2 with a single trip (without line change),
+		for each listed station pair; see TakeADirectLineConnectionFromStation1ToStation2.
+
+		Parameters: StationPairs, list of (Station1, Station2)
+		Example: Cond.ConnectStationPairsWithASingleLine: ([(8503000, 8507000), (8507000, 8508500)],)
+		"""
+
 	@classmethod
 	def ResetClassVariables(cls):
 		"""
@@ -323,7 +368,10 @@ class Cond:
 
 			# SelectWeekDays
 			elif cond == cls.SelectWeekDays:
-				SQLconditions.append(CondStrSelectedWeekDays(*parameters))
+				if TimetableHasTrafficDayBits:
+					SQLconditions.append(CondStrSelectedWeekDays_mask(*parameters))
+				else:
+					SQLconditions.append(CondStrSelectedWeekDays(*parameters))
 
 			# IncludeListedManagementsOnly
 			elif cond == cls.IncludeListedManagementsOnly:
@@ -355,6 +403,51 @@ class Cond:
 
 		return ' AND '.join(SQLconditions)
 
+	@classmethod
+	def GenerateSQLQueryConditions(cls, RouteConditions):
+		"""
+		Generate parameterized SQL conditions (bind variables) according to the conditions
+		defined in dictionary RouteConditions; see GenerateSQLConditions.
+		Conditions are generated in a fixed order, such that the SQL text only depends on
+		the shape of the conditions (for prepared statements, see ExecutePreparedQuery).
+
+		Returns: (SQLcond, SQLparams)
+		"""
+		SQLconditions = []
+		SQLparams = []
+
+		for cond in sorted(RouteConditions.keys()):
+			parameters = RouteConditions[cond]
+			CondSQL = None
+
+			if cond == cls.StartTimeAndDuration:
+				CondSQL = CondSQLRouteStartAndDuration(parameters[0], parameters[1], parameters[3])
+
+			elif cond == cls.SelectWeekDays:
+				CondSQL = CondSQLSelectedWeekDays(*parameters)
+
+			elif cond == cls.IncludeListedManagementsOnly:
+				CondSQL = CondSQLSelectedVerwaltungs(*parameters)
+
+			elif cond == cls.IncludeListedGattungsOnly:
+				CondSQL = CondSQLSelectedGattung(*parameters)
+
+			elif cond == cls.ExcludeListedGattungs:
+				CondSQL = CondSQLExcludeGattungs(*parameters)
+
+			elif cond == cls.VisitStations:
+				if parameters[1] in (INCLUDE_ALL_AND_ONLY, INCLUDE_ONLY):
+					CondSQL = CondSQLSelectedStations(parameters[0])
+
+			elif cond == cls.ConnectionsAreAvailableOnAllListedDays:
+				CondSQL = CondSQLSelectedTripDays(parameters[0])
+
+			if CondSQL and CondSQL[0]:
+				SQLconditions.append(CondSQL[0])
+				SQLparams.extend(CondSQL[1])
+
+		return (' AND '.join(SQLconditions), SQLparams)
+
 	@classmethod
 	def CheckIfConnectionShouldBeSelected(cls, ConnectionInfo, PathInfo, EndStation, RouteConditions):
 		"""
@@ -513,10 +606,9 @@ class Cond:
 			cond = cls.DefaultTimeForLineChange
 			parameters = RouteConditions[cond]
 			GeneralLineChangeTime = parameters[0]
-			station = ConnectionInfo[ConnInfoInd['station_from']]
 
-			# change for BU2019
-			# MinChangeTime = GetLineChangeTimeAtStation(station, GeneralLineChangeTime)
+			# station-specific line change times are read in CheckIfEnoughTimeForLineChange
+			# (see SetLineChangeTimesPerStation)
 			MinChangeTime = GeneralLineChangeTime
 
 			if not CheckIfEnoughTimeForLineChange(ConnectionInfo, PathInfo, MinChangeTime):
@@ -536,6 +628,14 @@ class Cond:
 					if IfTest: print "--------- VisitStations violated ---------"
 					return False
 
+		# TakeADirectLineConnectionFromStation1ToStation2, ConnectStationPairsWithASingleLine
+		if global_TripChainIndex:
+			StationPairs = GetDirectLineStationPairs(RouteConditions)
+			if not CheckIfStationPairsAreConnectedWithASingleLine(ConnectionInfo, PathInfo, StationPairs, global_TripChainIndex):
+				IncrementDicValue(cls.TerminationReasonsDic, 'DirectLineConnection')
+				if IfTest: print "--------- DirectLineConnection violated ---------"
+				return False
+
 		# NoLineChangeAtVirtualStations like 138 (tunnel station)
 		# don't permit line changes at virtual stations like 138
 		if True:
@@ -577,6 +677,23 @@ class Cond:
 					if IfTest: print "--------- VisitStations_INCLUDE_ALL violated ---------"
 					return False
 
+		# TakeADirectLineConnectionFromStation1ToStation2, ConnectStationPairsWithASingleLine
+		for (Station1, Station2) in GetDirectLineStationPairs(RouteConditions):
+			if not CheckIfDirectLineConnectionFromStation1ToStation2WasAlreadyTaken(PathInfo, Station1, Station2):
+				IncrementDicValue(cls.TerminationReasonsDic, 'DirectLineConnection_Route')
+				if IfTest: print "--------- DirectLineConnection_Route violated ---------"
+				return False
+
+		# SelectRoutesWithPositiveReducedCost
+		if RouteConditions.has_key(cls.SelectRoutesWithPositiveReducedCost):
+			cond = cls.SelectRoutesWithPositiveReducedCost
+			parameters = RouteConditions[cond]
+			(DualPricePerLineKey, RouteCostPerMinute, MinReducedCost) = parameters
+			if not CheckIfRouteHasPositiveReducedCost(PathInfo, DualPricePerLineKey, RouteCostPerMinute, MinReducedCost):
+				IncrementDicValue(cls.TerminationReasonsDic, 'SelectRoutesWithPositiveReducedCost')
+				if IfTest: print "--------- SelectRoutesWithPositiveReducedCost violated ---------"
+				return False
+
 		# passed all conditions
 		cls.RouteCountAfterRouteSelection += 1
 		return True
@@ -691,77 +808,182 @@ def GetCompleteStationChainInformation(dbcur, RouteConditions):
 		global_StationChainInfoPerFahrtID[PrevFahrtID][2].append(PrevAnkunftm)
 		global_StationChainInfoPerFahrtID[PrevFahrtID][3].append(None)
 
-def ReadTimeTable(dbcur, RouteConditions):
-	"""
-	Read selected section of database table timetable into a list of N-tuples (ConnectionInfo),
-	departure time index and Station-DepartureHour index.
-	Returns: (TimeTableList, TimeTableIndex, StationHourIndex)
+# fields of timetable read by ReadTimeTable, in query order
+TimeTableFields = ['conn_id','station_order','travel_id','travel_no','management','line_category','line','line_id','station_from','station_to',
+	'departure_hour','departure_min','departure_totalmin','arrival_hour','arrival_min','arrival_totalmin','trafficdays_hexcode']
+
+# sort order of timetable query (see ReadTimeTable)
+TimeTableSortFields = ['station_from','departure_totalmin','conn_id']
+
+def GetTimeTableQuery(RouteConditions, TableName=None):
 	"""
-	# test: add conn_id for more deterministic ordering
-	# 18.06.2017: add line_id <> '-1' condition for testing
-	LineIDCond = " not (linie_id = '-1' and gattung='BUS' and linie='581') and "
+	Get parameterized query of ReadTimeTable for the given route conditions.
 
-	OrderedFields = ['conn_id','station_order','travel_id','travel_no','management','line_category','line','line_id','station_from','station_to',
-		'departure_hour','departure_min','departure_totalmin','arrival_hour','arrival_min','arrival_totalmin','trafficdays_hexcode']
-	OrderedFieldsStr = ','.join(OrderedFields)
-	
-	sql = """select %s from %s where """ % (OrderedFieldsStr, tbl_TimeTable) \
-			+ Cond.GenerateSQLConditions(RouteConditions) +  " order by station_from,departure_totalmin,conn_id;" 
-		 
-	# execute sql
-	dbcur.execute(sql)
-	rows = dbcur.fetchall()
-	RowCount = len(rows)
+	TableName: Timetable table or view; tbl_TimeTable if None
 
-	# test
-	# print "ReadTimeTable: SQL"
-	# print sql 
-	# print "RowCount: %s" % RowCount
-	# quit()
+	Returns: (SQL, SQLparams)
+	"""
+	if TableName == None:
+		TableName = tbl_TimeTable
+	(SQLcond, SQLparams) = Cond.GenerateSQLQueryConditions(RouteConditions)
+	sql = """select %s from %s where """ % (','.join(TimeTableFields), TableName) \
+			+ SQLcond +  " order by " + ','.join(TimeTableSortFields)
+	return (sql, SQLparams)
 
-	# init returned parameters
-	TimeTableList = []
-	TimeTableIndex = np.array(range(RowCount), int)
-	StationHourIndex = {}
+def InitTimeTableBuilder():
+	"""
+	Init incremental builder of timetable structures of ReadTimeTable; rows of the timetable
+	query (in query order) are added batch by batch with AddRowsToTimeTableBuilder, like
+	while they are fetched from database.
 
-	# read all rows of table into TimeTable
-	ind = 0
-	CurStation = None
-	CurHour = None
+	Returns: Builder (dictionary)
+	"""
+	Builder = {
+		'TimeTableList': 		[],
+		'DepartureTimes': 		[],
+		'StationHourIndex': 	{},
+		'CurStation': 			None,
+		'CurHour': 				None,
+		# element order defined in ConnInfoInd
+		'FieldPositions': 		[(ConnInfoInd[TimeTableFields[i]], i) for i in range(0, len(TimeTableFields))],
+		}
+	return Builder
+
+def AddRowsToTimeTableBuilder(Builder, rows):
+	"""
+	Add rows of the timetable query (fields as TimeTableFields) to the timetable builder.
+	"""
+	TimeTableList = Builder['TimeTableList']
+	DepartureTimes = Builder['DepartureTimes']
+	StationHourIndex = Builder['StationHourIndex']
+	FieldPositions = Builder['FieldPositions']
+	CurStation = Builder['CurStation']
+	CurHour = Builder['CurHour']
 
 	for row in rows:
-		# element order defined in ConnInfoInd
 		l = range(0, len(ConnInfoInd))
-
-		for i in range(0, len(OrderedFields)):
-			FieldName = OrderedFields[i]
-			FieldInd = OrderedFields.index(FieldName)
-			l[ConnInfoInd[FieldName]] = row[FieldInd]
+		for (ElementInd, FieldInd) in FieldPositions:
+			l[ElementInd] = row[FieldInd]
 
 		t = tuple(l)
+		ind = len(TimeTableList)
 		TimeTableList.append(t)
 
 		departure_hour = t[ConnInfoInd['departure_hour']]
 		departure_min = t[ConnInfoInd['departure_min']]
 		station_from = t[ConnInfoInd['station_from']]
 
-		TimeTableIndex[ind] = 60*departure_hour + departure_min
-		SHindex = (station_from, departure_hour)
+		DepartureTimes.append(60*departure_hour + departure_min)
 
 		if not (CurStation == station_from and CurHour == departure_hour):
-			StationHourIndex[SHindex] = ind
+			StationHourIndex[(station_from, departure_hour)] = ind
 		CurStation = station_from
 		CurHour = departure_hour
-		ind += 1 
-	return (TimeTableList, TimeTableIndex, StationHourIndex)
 
-def FindAllRoutes(dbcur, RouteConditions):
+	Builder['CurStation'] = CurStation
+	Builder['CurHour'] = CurHour
+
+def GetTimeTableFromBuilder(Builder):
+	"""
+	Get timetable structures of ReadTimeTable from the timetable builder.
+
+	Returns: (TimeTableList, TimeTableIndex, StationHourIndex)
+	"""
+	TimeTableIndex = np.array(Builder['DepartureTimes'], int)
+	return (Builder['TimeTableList'], TimeTableIndex, Builder['StationHourIndex'])
+
+# timetable source of ReadTimeTable (see SetTimetableSource); database cursor of ReadTimeTable if None
+TimetableSource = None
+
+def SetTimetableSource(Source):
+	"""
+	Set timetable source of ReadTimeTable, like a file-based source of BU2020_TimetableSources
+	(NpzTimetableSource, SQLiteTimetableSource) for searches without database server.
+	Source = None: read timetable with the database cursor of ReadTimeTable.
+
+	A source is a dictionary with the function Source['ReadRowBatches'](Source, RouteConditions),
+	which yields batches of rows of the timetable query (fields as TimeTableFields), 
+	filtered and sorted like the query of GetTimeTableQuery.
+	"""
+	global TimetableSource
+	TimetableSource = Source
+
+def ReadTimeTable(dbcur, RouteConditions, BatchSize=10000, IfPreparedStatement=True):
+	"""
+	Read selected section of database table timetable into a list of N-tuples (ConnectionInfo),
+	departure time index and Station-DepartureHour index.
+	IfPreparedStatement: If True, query is executed as prepared statement with dbcur, with reuse of
+		the query plan (see ExecutePreparedQuery); the complete result is transferred at execution.
+		If False, rows are read with a server-side cursor on the connection of dbcur in batches
+		of BatchSize (see FetchRowBatchesWithServerSideCursor), without plan reuse; a server-side
+		cursor cannot be declared for EXECUTE of a prepared statement.
+	Rows are added to the timetable builder batch by batch.
+	Rows are read from TimetableSource instead of dbcur if set (see SetTimetableSource).
+	Returns: (TimeTableList, TimeTableIndex, StationHourIndex)
+	"""
+	# test: add conn_id for more deterministic ordering
+	# 18.06.2017: add line_id <> '-1' condition for testing
+	LineIDCond = " not (linie_id = '-1' and gattung='BUS' and linie='581') and "
+
+	Builder = InitTimeTableBuilder()
+
+	# read from timetable source
+	if TimetableSource:
+		for RowBatch in TimetableSource['ReadRowBatches'](TimetableSource, RouteConditions):
+			AddRowsToTimeTableBuilder(Builder, RowBatch)
+		return GetTimeTableFromBuilder(Builder)
+
+	(sql, SQLparams) = GetTimeTableQuery(RouteConditions)
+
+	# read cached query result, if available
+	CacheFilePath = None
+	if TimeTableCacheDirectory:
+		CacheFilePath = os.path.join(TimeTableCacheDirectory, 'timetable_%s.dat' % GetTimetableQueryKey(sql, SQLparams))
+		if os.path.exists(CacheFilePath):
+			f = open(CacheFilePath, 'rb')
+			rows = pickle.load(f)
+			f.close()
+			AddRowsToTimeTableBuilder(Builder, rows)
+			return GetTimeTableFromBuilder(Builder)
+
+	# execute sql, build timetable while fetching
+	if IfPreparedStatement:
+		ExecutePreparedQuery(dbcur, sql, SQLparams)
+		RowBatches = iter(lambda: dbcur.fetchmany(BatchSize), [])
+	else:
+		RowBatches = FetchRowBatchesWithServerSideCursor(dbcur.connection, sql, SQLparams, BatchSize)
+
+	rows = []
+	for RowBatch in RowBatches:
+		AddRowsToTimeTableBuilder(Builder, RowBatch)
+		if CacheFilePath:
+			rows.extend(RowBatch)
+
+	if CacheFilePath:
+		if not os.path.exists(TimeTableCacheDirectory):
+			os.makedirs(TimeTableCacheDirectory)
+		f = open(CacheFilePath, 'wb')
+		pickle.dump(rows, f, pickle.HIGHEST_PROTOCOL)
+		f.close()
+
+	# test
+	# print "ReadTimeTable: SQL"
+	# print sql 
+	# print "RowCount: %s" % len(Builder['TimeTableList'])
+	# quit()
+
+	return GetTimeTableFromBuilder(Builder)
+
+def FindAllRoutes(dbcur, RouteConditions, TimeTable=None):
 	"""
 	Find all possible routes (w.r.t. time table) from start to end station 
     according to all conditions given in RouteConditions. 
     
     RouteConditions: Dictionary containing all route conditions
     including start and end stations.
+    TimeTable: Preloaded (TimeTableList, TimeTableIndex, StationHourIndex) of ReadTimeTable
+    for RouteConditions, like PlanningInputs['TimeTable'] of LoadPlanningInputs;
+    read from database if None.
     
     Return: PathInfoList (synonym for RouteInfoList)
 	"""
@@ -803,10 +1025,13 @@ def FindAllRoutes(dbcur, RouteConditions):
 	ConnectionInfo = tuple(ConnectionInfo)
 
 	# read table with RouteConditions
-	print "START reading timetable data (Fahrplandaten) from database..."
-	st = time.time()
-	(TimeTableList, TimeTableIndex, StationHourIndex) = ReadTimeTable(dbcur, RouteConditions)
-	print "FINISHED reading timetable data (Fahrplandaten) from database, in %.2f seconds." % (time.time() - st)
+	if TimeTable:
+		(TimeTableList, TimeTableIndex, StationHourIndex) = TimeTable
+	else:
+		print "START reading timetable data (Fahrplandaten) from database..."
+		st = time.time()
+		(TimeTableList, TimeTableIndex, StationHourIndex) = ReadTimeTable(dbcur, RouteConditions)
+		print "FINISHED reading timetable data (Fahrplandaten) from database, in %.2f seconds." % (time.time() - st)
 	print "TEST: SizeOf variable TimeTableList in kilobytes: %d" % math.floor(sys.getsizeof(TimeTableList) / 2**10)
 
 	if Cond.IfTestRouteSearch:
@@ -820,24 +1045,27 @@ def FindAllRoutes(dbcur, RouteConditions):
 		for i in range(L-N,L):
 			print TimeTableList[i]
 
-	# set global variables StationChainPerFahrtID_global, ArrivalChainPerFahrtID_global etc.
-	# if they are required by any included tour condition (added on 10.12.2017 by Tunc)
-	# cancel if clause (4/3/2019)
-	if False:
-		if Cond.TakeADirectLineConnectionFromStation1ToStation2 in RouteConditions \
-			or Cond.ExactFollowAggregatePath in RouteConditions \
-			or Cond.RelativeFollowAggregatePath in RouteConditions \
-			or Cond.ConnectStationPairsWithASingleLine in RouteConditions:
-
-			print "START reading station chain information for each FahrtID from database..."
-			st = time.time()
-			GetCompleteStationChainInformation(dbcur, RouteConditions)
-			print "FINISHED reading station chain information from database, in %.2f seconds." % (time.time() - st)
-			print "TEST: SizeOf global variable global_StationChainInfoPerFahrtID in kilobytes: %d" % math.floor(sys.getsizeof(global_StationChainInfoPerFahrtID) / 2**10)
+	# set global variable global_TripChainIndex if it is required by any included tour condition;
+	# the index is built from the timetable, without reading station chains from database
+	global global_TripChainIndex
+	global_TripChainIndex = None
+	if GetDirectLineStationPairs(RouteConditions):
+		st = time.time()
+		global_TripChainIndex = BuildTripChainIndex(TimeTableList)
+		print "Trip station-chain index with %s trips built in %.2f seconds." \
+			% (len(global_TripChainIndex['TripIDs']), time.time() - st)
+
+	# footpath graph between stations of timetable (see SetFootpaths)
+	FootpathGraph = None
+	if Footpaths and Cond.MaxNumberOfSubsequentStationPassagesOnFoot in RouteConditions \
+		and RouteConditions[Cond.MaxNumberOfSubsequentStationPassagesOnFoot][0] > 0:
+		Stations = set(station for (station, hour) in StationHourIndex)
+		Stations.add(EndStation)
+		FootpathGraph = BuildFootpathGraph(Footpaths, Stations)
 
 	# find all possible paths
 	FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, \
-		TimeTableList, TimeTableIndex, StationHourIndex)
+		TimeTableList, TimeTableIndex, StationHourIndex, FootpathGraph=FootpathGraph)
 	PathInfoList = Cond.SelectedRoutes
 
 	# apply filter
@@ -847,10 +1075,14 @@ def FindAllRoutes(dbcur, RouteConditions):
 	(StatusReport, TerminationReasons) = Cond.ResetClassVariables() 
 	return (RouteInfoList, StatusReport, TerminationReasons)
 
-def FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, TimeTableList, TimeTableIndex, StationHourIndex, PathInfo=[]):
+def FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, TimeTableList, TimeTableIndex, StationHourIndex, PathInfo=[], \
+    FootpathGraph=None, SubsequentWalks=0):
     """ 
     Find all possible routes (w.r.t. time table) from start to end station w.r.t.
     all conditions given by the dictionary RouteConditions.
+
+    FootpathGraph: On-foot passages to nearby stations (see BuildFootpathGraph), or None
+    SubsequentWalks: Number of subsequent on-foot passages at the end of PathInfo
     """
     PathInfo = PathInfo + [ConnectionInfo]
 
@@ -888,32 +1120,28 @@ def FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, TimeTableList,
     # get next connections from the station
     ConnectionInfoList = GetListOfNextConnections(TimeTableList, TimeTableIndex, StationHourIndex, start_station, departure_hour, departure_min, WaitLimit)
 
-    # insert on-foot connections (Zu Fuss, ZF) to nearby stations into ConnectionInfoList
-    # cancel (Tunc 4/3/2019)
-    if False:
-	    StationMeasurementTime = ReqStationMeasureTime
-	    
-	    if Cond.MaxNumberOfSubsequentStationPassagesOnFoot in RouteConditions \
-	    	and RouteConditions[Cond.MaxNumberOfSubsequentStationPassagesOnFoot][0] > 0:
-
-		    if RouteConditions.has_key(Cond.MeasureStations):
-		    	StationMeasurementTime = RouteConditions[Cond.MeasureStations][1]
-		    Connections = GetOnFootStationChangeConnections(start_station, departure_hour, departure_min, StationMeasurementTime)
-		    
-		    if Connections:		# i.e. if Connections is not None
-		    	(OnFootConnections1, OnFootConnections2) = Connections 
-		    	ConnectionInfoList = AddConnectionsToListAfterDepartureTime(ConnectionInfoList, OnFootConnections1)
-		    	ConnectionInfoList = AddConnectionsToListAfterDepartureTime(ConnectionInfoList, OnFootConnections2)
-
     if Cond.IfTestRouteSearch:
 		print "Next connections:"
 		for c in ConnectionInfoList:
 			print c
 		time.sleep(Cond.TestWaitingTime)
 
-    if not ConnectionInfoList:		# Endstation: Node w/o successor nodes
+    # on-foot connections (Zu Fuss, ZF) to nearby stations, merged lazily by departure time
+    IfOnFoot = FootpathGraph and start_station in FootpathGraph \
+	and SubsequentWalks < RouteConditions[Cond.MaxNumberOfSubsequentStationPassagesOnFoot][0]
+
+    if not ConnectionInfoList and not IfOnFoot:		# Endstation: Node w/o successor nodes
     	return []
 
+    if IfOnFoot:
+	# no walking back to the station of a previous on-foot passage
+	PrevStation = None
+	if SubsequentWalks > 0:
+	    PrevStation = ConnectionInfo[ConnInfoInd['station_from']]
+	OnFootConnections = GetOnFootConnections(FootpathGraph, start_station, 60*departure_hour + departure_min, PrevStation)
+	ConnectionInfoList = MergeConnectionsByDepartureTime(ConnectionInfoList, OnFootConnections)
+    OnFootGattungs = TrWay.values()
+
     PathInfoList = []
 
     for ConnectionInfo in ConnectionInfoList:
@@ -928,8 +1156,11 @@ def FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, TimeTableList,
 	   	if res == False: continue
 
 	   	# recursive call
+		NextSubsequentWalks = 0
+		if FootpathGraph and ConnectionInfo[ConnInfoInd['line_category']] in OnFootGattungs:
+			NextSubsequentWalks = SubsequentWalks + 1
 		extended_paths = FindAllRoutesRec(ConnectionInfo, EndStation, RouteConditions, \
-			TimeTableList, TimeTableIndex, StationHourIndex, PathInfo)
+			TimeTableList, TimeTableIndex, StationHourIndex, PathInfo, FootpathGraph, NextSubsequentWalks)
 
 		# report status
 		if Cond.ReportDuringRouteSearch in RouteConditions:
@@ -1928,7 +2159,7 @@ def CheckIfLMProfileRoute1ContainsLMProfileRoute2(LMCoveragePerLineKey1, LMCover
 	return True
 
 def SelectBestRoutesForLineMeasurement(SortedRouteInfoList, MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, 
-	LineMeasurementReq=None):
+	LineMeasurementReq=None, IgnoreContainedRoutes=False):
 	"""
 	Select best routes, that add to Line Measurement Coverage, up to MultiplicityLimit for a LineKey (line, TW, WG).
 	A route with lower value than an already selected equivalent route is ignored; i.e. is not selected.
@@ -1936,6 +2167,8 @@ def SelectBestRoutesForLineMeasurement(SortedRouteInfoList, MultiplicityLimit, R
 	SortedRouteInfoList: After value sorted routes, in descending order.
 	MultiplicityLimit: Upper limit (like 3) for added values per LineKey. 
 		No new tour that adds to a LineKey is selected, after MultiplicityLimit for this LineKey is achieved.
+	IgnoreContainedRoutes: If True, a route whose LM profile is contained by the profile of an already 
+		selected (higher value) route is not selected; checked with an LM profile index (see InitLMProfileIndex).
 
 	Returns: (SelectedRoutes, TotalLMCoverage)
 			TotalLMCoverage: Total LM coverage of selected routes
@@ -1948,42 +2181,35 @@ def SelectBestRoutesForLineMeasurement(SortedRouteInfoList, MultiplicityLimit, R
 	SelectedRoutes = []
 	TotalLMCoverage = {}
 	LMCoverageOfSelectedRoutes = []
+	LMProfileIndex = InitLMProfileIndex(LineMeasurementReq)
 
 	for RouteInfo in SortedRouteInfoList:
 		(LMCoverageOfRoutePerSegment, LMCoverageOfRoutePerLineKey) = \
 			GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq)
 
 		# ignore LM equivalent or contained routes
-		# obsolete: does nothing, waste of time
-		"""
-		for LMCov in LMCoverageOfSelectedRoutes:
-			# if CheckIfEquivalentLMProfiles(LMCov, LMCoverageOfRoutePerLineKey):
-			if CheckIfLMProfileRoute1ContainsLMProfileRoute2(LMCov, LMCoverageOfRoutePerLineKey):
-				# don't select route, continue with the next route
+		if IgnoreContainedRoutes:
+			ProfileBits = GetLMProfileBitset(LMProfileIndex, LMCoverageOfRoutePerLineKey)
+			if GetProfilesContainingLMProfile(LMProfileIndex, ProfileBits):
 				continue
-		"""
 
 		# check MultiplicityLimit and added value
 		# added value: Measurement of a LineKey for which TotalLMCoverage[LineKey] < MultiplicityLimit
 		for LineKey in LMCoverageOfRoutePerLineKey:
 			if LMCoverageOfRoutePerLineKey[LineKey] == 0:
 				continue
-			if LineKey not in TotalLMCoverage.keys():
-				TotalLMCoverage = AddDicValues(TotalLMCoverage, LMCoverageOfRoutePerLineKey, DefaultEmptyVal = 0)
-				SelectedRoutes.append(RouteInfo)
-				LMCoverageOfSelectedRoutes.append(LMCoverageOfRoutePerLineKey)
-				break
-			elif TotalLMCoverage[LineKey] < MultiplicityLimit:
-				TotalLMCoverage = AddDicValues(TotalLMCoverage, LMCoverageOfRoutePerLineKey, DefaultEmptyVal = 0)
+			if TotalLMCoverage.get(LineKey, 0) < MultiplicityLimit:
+				for Key in LMCoverageOfRoutePerLineKey:
+					TotalLMCoverage[Key] = TotalLMCoverage.get(Key, 0) + LMCoverageOfRoutePerLineKey[Key]
 				SelectedRoutes.append(RouteInfo)
 				LMCoverageOfSelectedRoutes.append(LMCoverageOfRoutePerLineKey)
+				if IgnoreContainedRoutes:
+					AddProfileToLMProfileIndex(LMProfileIndex, ProfileBits)
 				break
-			else: 
-				pass
 	return (SelectedRoutes, TotalLMCoverage)
 
 def AddBestValueRoutesToSelectedRoutes(SelectedRoutes, NewRoutes, MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, 
-	RouteValueFunc, SortParameters, LineMeasurementReq=None):
+	RouteValueFunc, SortParameters, LineMeasurementReq=None, ValueCache=None, ProcessCount=1):
 	"""
 	Add new routes to a list of selected routes considering route value and LM profile of route.
 
@@ -1993,6 +2219,12 @@ def AddBestValueRoutesToSelectedRoutes(SelectedRoutes, NewRoutes, MultiplicityLi
 	MultiplicityLimit: Upper limit (like 3) for added values per LineKey. 
 		No new tour that adds to a LineKey is selected, after MultiplicityLimit for this LineKey is achieved.
 
+	ValueCache, ProcessCount: Route value cache and number of processes for route valuation,
+		see GetValuesOfRoutes; values of SelectedRoutes are not recalculated with a cache.
+
+	See AddRoutesToLazyGreedySelector for adding new routes to a selection without
+	re-evaluating the LM coverage of already known routes.
+
 	Returns: (SelectedRoutes, TotalLMCoverage)
 			TotalLMCoverage: Total LM coverage of selected routes
 
@@ -2004,7 +2236,7 @@ def AddBestValueRoutesToSelectedRoutes(SelectedRoutes, NewRoutes, MultiplicityLi
 	AllRoutes = SelectedRoutes + NewRoutes
 
 	# sort all routes
-	SortedRoutes = SortRoutesAfterValueInDescOrder(AllRoutes, RouteValueFunc, SortParameters)
+	SortedRoutes = SortRoutesAfterValueInDescOrder(AllRoutes, RouteValueFunc, SortParameters, ValueCache, ProcessCount)
 
 	# select best routes
 	return SelectBestRoutesForLineMeasurement(SortedRoutes, MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq)
@@ -2661,7 +2893,33 @@ def GetSimpleValueOfRoute(PathInfo, TimeWindows, WeekDayGroup, ReqLineMeasureTim
 		- (TotalDuration / 60.0) * HourlyTripCost
 	return RouteValue
 
-def SortRoutesAfterValueInDescOrder(RouteInfoList, RouteValueFunc, Parameters):
+def GetReducedCostOfRoute(RouteInfo, DualPricePerLineKey, RouteCostPerMinute, LMCoveragePerLineKey=None):
+	"""
+	Reduced cost of a route (column) for the route selection LP (see column generation):
+	value of its LM coverage w.r.t. dual prices of LineKeys, minus duration cost.
+	A route with positive reduced cost improves the LP solution of the current route pool.
+
+	DualPricePerLineKey[LineKey] = price of a line measurement
+	LMCoveragePerLineKey: LM coverage of route (see GetLMCoverageOfRoute); calculated if None.
+
+	Returns: ReducedCost
+	"""
+	if LMCoveragePerLineKey == None:
+		(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+			GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, DualPricePerLineKey)
+
+	CoverageValue = 0
+	for LineKey in LMCoveragePerLineKey:
+		if DualPricePerLineKey.has_key(LineKey):
+			CoverageValue += DualPricePerLineKey[LineKey] * LMCoveragePerLineKey[LineKey]
+
+	departure_first_station = RouteInfo[0][ConnInfoInd['departure_hour']]*60 + RouteInfo[0][ConnInfoInd['departure_min']]
+	arrival_last_station = RouteInfo[-1][ConnInfoInd['arrival_hour']]*60 + RouteInfo[-1][ConnInfoInd['arrival_min']]
+	DurationCost = (arrival_last_station - departure_first_station) * RouteCostPerMinute
+
+	return CoverageValue - DurationCost
+
+def SortRoutesAfterValueInDescOrder(RouteInfoList, RouteValueFunc, Parameters, ValueCache=None, ProcessCount=1):
 	"""
 	Sort routes after their values, in descending order.
 	Return a sorted route list.
@@ -2669,23 +2927,502 @@ def SortRoutesAfterValueInDescOrder(RouteInfoList, RouteValueFunc, Parameters):
 	RouteValueFunc: Name of function, that evaluates the value of a route.
 	Parameters: n-Tuple with parameters for RouteValueFunc.
 		(param1, param2, param3, ...)
+	ValueCache, ProcessCount: see GetValuesOfRoutes
 	"""
-	RouteInd = range(0, len(RouteInfoList))
-	RouteValues = []
-
-	for i in RouteInd:
-		RouteInfo = RouteInfoList[i]
-		RouteValue = RouteValueFunc(RouteInfo, *Parameters)
-		RouteValues.append(RouteValue)
+	RouteValues = GetValuesOfRoutes(RouteInfoList, RouteValueFunc, Parameters, ValueCache, ProcessCount)
+	SortedInd = GetDescendingOrderOfValues(RouteValues)
 
-	SortedInd = SortIndex(RouteValues, RouteInd)
-	SortedInd.reverse()	
-	
 	SortedRouteInfoList = []
 	for i in SortedInd:
 		SortedRouteInfoList.append(RouteInfoList[i])
 	return SortedRouteInfoList
 
+# **************************************************************************************
+# Batch route valuation (value cache, process pool)
+# **************************************************************************************
+
+def GetRouteKey(RouteInfo):
+	"""
+	Hashable key of a route to identify duplicate routes (like in a route pool).
+
+	Returns: Tuple of ConnectionInfo tuples
+	"""
+	return tuple(tuple(ConnInfo) for ConnInfo in RouteInfo)
+
+def InitRouteValueCache():
+	"""
+	Initiate cache of route values (see GetValuesOfRoutes); a cache is valid for a 
+	single route value function and its parameters.
+
+	Returns: ValueCache dictionary with keys:
+		'ValuePerRoute'[RouteKey] = value
+		'LinesPerRoute'[RouteKey] = set of LineIDs of route
+	"""
+	return {'ValuePerRoute': {}, 'LinesPerRoute': {}}
+
+def InvalidateRouteValueCache(ValueCache, LineIDs=None):
+	"""
+	Remove cached values of routes that travel with any of the given lines, like 
+	the lines of LineKeys with changed LM requirements; all values if LineIDs is None.
+
+	Note: Values of other routes are kept, assuming that the value of a route
+	depends on the requirements of its own lines only (like GetSimpleLMRouteValue).
+
+	Returns: Number of removed values
+	"""
+	ValuePerRoute = ValueCache['ValuePerRoute']
+	LinesPerRoute = ValueCache['LinesPerRoute']
+
+	if LineIDs == None:
+		RemovedRoutes = ValuePerRoute.keys()
+	else:
+		LineIDs = set(LineIDs)
+		RemovedRoutes = [RouteKey for RouteKey in ValuePerRoute if LinesPerRoute[RouteKey].intersection(LineIDs)]
+
+	for RouteKey in RemovedRoutes:
+		del ValuePerRoute[RouteKey]
+		del LinesPerRoute[RouteKey]
+	return len(RemovedRoutes)
+
+# route value function and parameters of worker processes (read-only),
+# set once per process by InitRouteValueWorker
+RouteValueWorkerFunc = None
+RouteValueWorkerParameters = None
+
+def InitRouteValueWorker(RouteValueFunc, Parameters):
+	"""
+	Initialize a worker process of batch route valuation: share the route value 
+	function and its parameters, instead of passing them with each route.
+	"""
+	global RouteValueWorkerFunc, RouteValueWorkerParameters
+	RouteValueWorkerFunc = RouteValueFunc
+	RouteValueWorkerParameters = Parameters
+
+def GetRouteValueInWorker(RouteInfo):
+	"""
+	Evaluate route value in a worker process, see InitRouteValueWorker.
+	"""
+	return RouteValueWorkerFunc(RouteInfo, *RouteValueWorkerParameters)
+
+# batch versions of route value functions, used by GetValuesOfRoutes:
+# BatchRouteValueFunctions[RouteValueFunc] = BatchFunc 
+# BatchFunc(RouteInfoList, *Parameters) returns the values of all routes as an array
+BatchRouteValueFunctions = {}
+
+def GetValuesOfRoutes(RouteInfoList, RouteValueFunc, Parameters, ValueCache=None, ProcessCount=1, ChunkSize=50):
+	"""
+	Batch valuation of routes: RouteValueFunc(RouteInfo, *Parameters) for each route.
+
+	Only routes without cached value are evaluated:
+	- with the batch version of RouteValueFunc, if any (see BatchRouteValueFunctions)
+	- otherwise in chunks (ChunkSize routes) on a process pool; RouteValueFunc must be 
+		a module-level function then
+	
+	ValueCache: Cache of route values (see InitRouteValueCache), updated with the new values;
+		None for no caching.
+	ProcessCount: Number of worker processes; 1: sequential evaluation in the current
+		process; number of CPUs if None
+
+	Returns: Numpy array of route values, in the order of RouteInfoList
+	"""
+	RouteValues = np.zeros(len(RouteInfoList))
+
+	# cached values
+	RouteKeys = None
+	MissingInd = range(0, len(RouteInfoList))
+	if ValueCache != None:
+		ValuePerRoute = ValueCache['ValuePerRoute']
+		RouteKeys = [GetRouteKey(RouteInfo) for RouteInfo in RouteInfoList]
+		MissingInd = []
+		for i in range(0, len(RouteInfoList)):
+			if RouteKeys[i] in ValuePerRoute:
+				RouteValues[i] = ValuePerRoute[RouteKeys[i]]
+			else:
+				MissingInd.append(i)
+
+	if not MissingInd:
+		return RouteValues
+
+	MissingRoutes = [RouteInfoList[i] for i in MissingInd]
+
+	if RouteValueFunc in BatchRouteValueFunctions:
+		NewValues = BatchRouteValueFunctions[RouteValueFunc](MissingRoutes, *Parameters)
+	elif ProcessCount == 1 or len(MissingRoutes) <= ChunkSize:
+		NewValues = [RouteValueFunc(RouteInfo, *Parameters) for RouteInfo in MissingRoutes]
+	else:
+		if ProcessCount == None:
+			ProcessCount = multiprocessing.cpu_count()
+		pool = multiprocessing.Pool(ProcessCount, InitRouteValueWorker, (RouteValueFunc, Parameters))
+		try:
+			# values in the order of MissingRoutes
+			NewValues = pool.map(GetRouteValueInWorker, MissingRoutes, ChunkSize)
+		finally:
+			pool.close()
+			pool.join()
+
+	for k in range(0, len(MissingInd)):
+		i = MissingInd[k]
+		RouteValues[i] = NewValues[k]
+		if ValueCache != None:
+			ValueCache['ValuePerRoute'][RouteKeys[i]] = NewValues[k]
+			ValueCache['LinesPerRoute'][RouteKeys[i]] = set(ConnInfo[ConnInfoInd['line_id']] for ConnInfo in RouteInfoList[i])
+
+	return RouteValues
+
+def GetDescendingOrderOfValues(RouteValues):
+	"""
+	Argsort of values in descending order; equal values in descending index order,
+	like SortIndex followed by reverse.
+
+	Returns: Numpy array of indices
+	"""
+	RouteValues = np.asarray(RouteValues)
+	return np.lexsort((np.arange(len(RouteValues)), RouteValues))[::-1]
+
+def GetReducedCostsOfRoutes(RouteInfoList, DualPricePerLineKey, RouteCostPerMinute, LMCoveragePerRoute=None):
+	"""
+	Batch version of GetReducedCostOfRoute: reduced costs of all routes, with route 
+	durations evaluated as arrays.
+
+	LMCoveragePerRoute: List of LMCoveragePerLineKey per route; calculated if None.
+
+	Returns: Numpy array of reduced costs
+	"""
+	if LMCoveragePerRoute == None:
+		LMCoveragePerRoute = []
+		for RouteInfo in RouteInfoList:
+			(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+				GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, DualPricePerLineKey)
+			LMCoveragePerRoute.append(LMCoveragePerLineKey)
+
+	CoverageValues = np.zeros(len(RouteInfoList))
+	for r in range(0, len(RouteInfoList)):
+		LMCoveragePerLineKey = LMCoveragePerRoute[r]
+		for LineKey in LMCoveragePerLineKey:
+			if DualPricePerLineKey.has_key(LineKey):
+				CoverageValues[r] += DualPricePerLineKey[LineKey] * LMCoveragePerLineKey[LineKey]
+
+	Departures = np.array([RouteInfo[0][ConnInfoInd['departure_hour']]*60 + RouteInfo[0][ConnInfoInd['departure_min']] \
+		for RouteInfo in RouteInfoList], dtype=float)
+	Arrivals = np.array([RouteInfo[-1][ConnInfoInd['arrival_hour']]*60 + RouteInfo[-1][ConnInfoInd['arrival_min']] \
+		for RouteInfo in RouteInfoList], dtype=float)
+
+	return CoverageValues - (Arrivals - Departures) * RouteCostPerMinute
+
+BatchRouteValueFunctions[GetReducedCostOfRoute] = GetReducedCostsOfRoutes
+
+
+# **************************************************************************************
+# LM profile dominance index (route deduplication)
+# **************************************************************************************
+
+def InitLMProfileIndex(LineMeasurementReq=None, MaxCoverageLevel=None):
+	"""
+	Initiate LM profile index for fast containment (dominance) queries of LM profiles.
+
+	An LM profile (LMCoveragePerLineKey) is a bitset (python integer) over interned
+	(LineKey, level) pairs: LineKey with coverage n sets the bits of levels 1..n. 
+	Profile 1 contains profile 2 (see CheckIfLMProfileRoute1ContainsLMProfileRoute2) 
+	if and only if bitset 1 is a superset of bitset 2.
+
+	Superset queries use an inverted index: For each bit, a bitset of indexed profiles having this bit.
+
+	LineMeasurementReq: If given, only LineKeys with positive requirements are considered.
+	MaxCoverageLevel: Coverage levels above this limit (like MultiplicityLimit) are ignored (None: no limit)
+
+	Returns: LMProfileIndex (dictionary)
+	"""
+	LMProfileIndex = {
+		'LineMeasurementReq': 		LineMeasurementReq,
+		'MaxCoverageLevel': 		MaxCoverageLevel,
+		'BitPerKeyLevel': 			{},
+		'ProfilesPerBit': 			[],
+		'AllProfiles': 				0,
+		'ProfileCount': 			0,
+		}
+	return LMProfileIndex
+
+def GetLMProfileBitset(LMProfileIndex, LMCoveragePerLineKey):
+	"""
+	Get bitset of an LM profile; new (LineKey, level) pairs are interned.
+
+	Returns: ProfileBits (int)
+	"""
+	LineMeasurementReq = LMProfileIndex['LineMeasurementReq']
+	MaxCoverageLevel = LMProfileIndex['MaxCoverageLevel']
+	BitPerKeyLevel = LMProfileIndex['BitPerKeyLevel']
+
+	ProfileBits = 0
+	for LineKey in LMCoveragePerLineKey:
+		if LineMeasurementReq and LineMeasurementReq.get(LineKey, 0) <= 0:
+			continue
+		n = LMCoveragePerLineKey[LineKey]
+		if MaxCoverageLevel != None:
+			n = min(n, MaxCoverageLevel)
+		for level in range(1, n+1):
+			KeyLevel = (LineKey, level)
+			if not KeyLevel in BitPerKeyLevel:
+				BitPerKeyLevel[KeyLevel] = len(BitPerKeyLevel)
+				LMProfileIndex['ProfilesPerBit'].append(0)
+			ProfileBits |= 1 << BitPerKeyLevel[KeyLevel]
+	return ProfileBits
+
+def AddProfileToLMProfileIndex(LMProfileIndex, ProfileBits):
+	"""
+	Add profile bitset to index.
+
+	Returns: ProfileNr (number of profile in index)
+	"""
+	ProfileNr = LMProfileIndex['ProfileCount']
+	ProfileFlag = 1 << ProfileNr
+	ProfilesPerBit = LMProfileIndex['ProfilesPerBit']
+
+	bits = ProfileBits
+	while bits:
+		LowestBit = bits & -bits
+		ProfilesPerBit[LowestBit.bit_length() - 1] |= ProfileFlag
+		bits ^= LowestBit
+
+	LMProfileIndex['AllProfiles'] |= ProfileFlag
+	LMProfileIndex['ProfileCount'] += 1
+	return ProfileNr
+
+def GetProfilesContainingLMProfile(LMProfileIndex, ProfileBits):
+	"""
+	Get indexed profiles that contain the given profile (superset query):
+	Intersection of the inverted index bitsets of all bits of the profile.
+
+	Returns: ContainingProfiles, bitset of ProfileNr's (0 if none)
+	"""
+	ProfilesPerBit = LMProfileIndex['ProfilesPerBit']
+	ContainingProfiles = LMProfileIndex['AllProfiles']
+
+	bits = ProfileBits
+	while bits and ContainingProfiles:
+		LowestBit = bits & -bits
+		ContainingProfiles &= ProfilesPerBit[LowestBit.bit_length() - 1]
+		bits ^= LowestBit
+	return ContainingProfiles
+
+def RemoveDominatedRoutes(RouteInfoList, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq=None, 
+	RouteCosts=None, LMCoveragePerRoute=None, MaxCoverageLevel=None):
+	"""
+	Remove dominated routes: A route is dominated, if another route with lower or equal cost
+	contains its LM profile (same or more measurements for every LineKey). 
+	Of routes with equal costs and LM profiles, the first one in RouteInfoList is kept.
+
+	Routes are processed in the order of increasing costs; each route is checked against the
+	index of already kept (cheaper) routes with a superset query, see GetProfilesContainingLMProfile.
+
+	RouteCosts: Cost of each route; route durations in minutes if None
+	LMCoveragePerRoute: List of LMCoveragePerLineKey per route (see GetLMCoverageOfRoute);
+		calculated if None.
+	MaxCoverageLevel: Coverage above this level (like MultiplicityLimit) doesn't make a route better
+
+	Returns: (NonDominatedRoutes, NonDominatedIndices)
+		NonDominatedIndices: Indices of non-dominated routes in RouteInfoList, in ascending order
+
+	Required globals:
+	- TimeWindows
+	- WeekDayGroups
+	"""
+	if LMCoveragePerRoute == None:
+		LMCoveragePerRoute = []
+		for RouteInfo in RouteInfoList:
+			(LMCoverageOfRoutePerSegment, LMCoverageOfRoutePerLineKey) = \
+				GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq)
+			LMCoveragePerRoute.append(LMCoverageOfRoutePerLineKey)
+
+	if RouteCosts == None:
+		RouteCosts = []
+		for RouteInfo in RouteInfoList:
+			departure_first_station = RouteInfo[0][ConnInfoInd['departure_hour']]*60 + RouteInfo[0][ConnInfoInd['departure_min']]
+			arrival_last_station = RouteInfo[-1][ConnInfoInd['arrival_hour']]*60 + RouteInfo[-1][ConnInfoInd['arrival_min']]
+			RouteCosts.append(arrival_last_station - departure_first_station)
+
+	LMProfileIndex = InitLMProfileIndex(LineMeasurementReq, MaxCoverageLevel)
+	ProfileBitsPerRoute = [GetLMProfileBitset(LMProfileIndex, LMCoverage) for LMCoverage in LMCoveragePerRoute]
+
+	# increasing costs; more measurements first for equal costs
+	RouteOrder = sorted(range(0, len(RouteInfoList)), 
+		key=lambda r: (RouteCosts[r], -bin(ProfileBitsPerRoute[r]).count('1'), r))
+
+	NonDominatedIndices = []
+	for r in RouteOrder:
+		if GetProfilesContainingLMProfile(LMProfileIndex, ProfileBitsPerRoute[r]):
+			continue
+		AddProfileToLMProfileIndex(LMProfileIndex, ProfileBitsPerRoute[r])
+		NonDominatedIndices.append(r)
+
+	NonDominatedIndices.sort()
+	NonDominatedRoutes = [RouteInfoList[r] for r in NonDominatedIndices]
+	return (NonDominatedRoutes, NonDominatedIndices)
+
+# **************************************************************************************
+# Lazy greedy route selection (CELF)
+# **************************************************************************************
+
+def GetMarginalLMGainOfRoute(LMCoveragePerLineKey, TotalLMCoverage, MultiplicityLimit):
+	"""
+	Get marginal LM gain of a route w.r.t. already selected routes: Number of measurements
+	that add to LineKeys whose total coverage is below MultiplicityLimit (saturation cap).
+
+	The gain can only decrease when more routes are selected (submodular coverage).
+
+	Returns: MarginalGain (int)
+	"""
+	MarginalGain = 0
+	for LineKey in LMCoveragePerLineKey:
+		ResidualCapacity = MultiplicityLimit - TotalLMCoverage.get(LineKey, 0)
+		if ResidualCapacity > 0:
+			MarginalGain += min(LMCoveragePerLineKey[LineKey], ResidualCapacity)
+	return MarginalGain
+
+def InitLazyGreedyRouteSelector(MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq=None):
+	"""
+	Initiate lazy greedy (CELF) route selector; see AddRoutesToLazyGreedySelector
+	and RunLazyGreedySelection.
+
+	Selector['Heap']: Max-heap of marginal gains, with entries
+		(-gain, insertion number, route number, selection count at gain evaluation)
+	Selector['CoveragePerRoute'][r]: LMCoveragePerLineKey of route r, evaluated once per route
+
+	Returns: Selector (dictionary)
+	"""
+	Selector = {
+		'MultiplicityLimit': 		MultiplicityLimit,
+		'ReqLineMeasureTime': 		ReqLineMeasureTime,
+		'FirstDayOfPeriod': 		FirstDayOfPeriod,
+		'LastDayOfPeriod': 			LastDayOfPeriod,
+		'LineMeasurementReq': 		LineMeasurementReq,
+		'Routes': 					[],
+		'CoveragePerRoute': 		[],
+		'CostPerRoute': 			[],
+		'RouteKeys': 				set(),
+		'Heap': 					[],
+		'SelectedRoutes': 			[],
+		'TotalLMCoverage': 			{},
+		'GainEvaluationCount': 		0,
+		}
+	return Selector
+
+def GetLazyGreedyPriority(Selector, r):
+	"""
+	Get current priority (marginal gain per route cost) of route r in selector.
+
+	Returns: Priority (float)
+	"""
+	Selector['GainEvaluationCount'] += 1
+	MarginalGain = GetMarginalLMGainOfRoute(Selector['CoveragePerRoute'][r], Selector['TotalLMCoverage'], Selector['MultiplicityLimit'])
+	return float(MarginalGain) / Selector['CostPerRoute'][r]
+
+def AddRoutesToLazyGreedySelector(Selector, RouteInfoList, RouteCosts=None):
+	"""
+	Add routes to the candidates of a lazy greedy route selector, without rebuilding it;
+	routes can be added before or after RunLazyGreedySelection.
+	LM coverage of a route is evaluated once; duplicate routes are ignored (see GetRouteKey).
+
+	RouteInfoList: Candidate routes; among routes with equal priority, the route added first
+		is selected first (i.e. add routes sorted after value in descending order).
+	RouteCosts: Cost of each route (like duration) for cost-effective selection
+		(marginal gain per cost); all costs are 1 if None.
+
+	Returns: Number of added routes
+	"""
+	AddedCount = 0
+	SelectionCount = len(Selector['SelectedRoutes'])
+
+	for i in range(0, len(RouteInfoList)):
+		RouteInfo = RouteInfoList[i]
+		RouteKey = GetRouteKey(RouteInfo)
+		if RouteKey in Selector['RouteKeys']: continue
+
+		RouteCost = 1.0
+		if RouteCosts != None:
+			RouteCost = float(RouteCosts[i])
+			if RouteCost <= 0:
+				raise Exception("Route costs must be positive for lazy greedy route selection!")
+
+		(LMCoverageOfRoutePerSegment, LMCoverageOfRoutePerLineKey) = \
+			GetLMCoverageOfRoute(RouteInfo, Selector['ReqLineMeasureTime'], Selector['FirstDayOfPeriod'], Selector['LastDayOfPeriod'], 
+				Selector['LineMeasurementReq'])
+
+		r = len(Selector['Routes'])
+		Selector['Routes'].append(RouteInfo)
+		Selector['CoveragePerRoute'].append(LMCoverageOfRoutePerLineKey)
+		Selector['CostPerRoute'].append(RouteCost)
+		Selector['RouteKeys'].add(RouteKey)
+		AddedCount += 1
+
+		Priority = GetLazyGreedyPriority(Selector, r)
+		if Priority > 0:
+			heapq.heappush(Selector['Heap'], (-Priority, r, r, SelectionCount))
+
+	return AddedCount
+
+def RunLazyGreedySelection(Selector, MaxSelectedRoutes=None):
+	"""
+	Select routes with lazy greedy (CELF, cost-effective lazy forward selection):
+	Pop the route with the highest (possibly outdated) priority from the heap; recalculate
+	its marginal gain only if routes were selected after its last evaluation, and push it back
+	if its priority decreased. A route is selected if its up-to-date priority is at the top.
+
+	Routes without marginal gain (all their LineKeys saturated) are dropped, as gains never increase.
+
+	MaxSelectedRoutes: Upper limit for the total number of selected routes (None: no limit)
+
+	Returns: NewSelectedRoutes (routes selected in this run)
+		All selected routes and their total LM coverage are in
+		Selector['SelectedRoutes'] and Selector['TotalLMCoverage']
+	"""
+	NewSelectedRoutes = []
+	Heap = Selector['Heap']
+	TotalLMCoverage = Selector['TotalLMCoverage']
+
+	while Heap:
+		if MaxSelectedRoutes != None and len(Selector['SelectedRoutes']) >= MaxSelectedRoutes:
+			break
+		(NegPriority, InsertNr, r, EvaluatedAt) = heapq.heappop(Heap)
+		SelectionCount = len(Selector['SelectedRoutes'])
+
+		if EvaluatedAt < SelectionCount:
+			# outdated gain: recalculate and push back
+			Priority = GetLazyGreedyPriority(Selector, r)
+			if Priority > 0:
+				heapq.heappush(Heap, (-Priority, InsertNr, r, SelectionCount))
+			continue
+
+		# select route
+		RouteInfo = Selector['Routes'][r]
+		LMCoveragePerLineKey = Selector['CoveragePerRoute'][r]
+		for LineKey in LMCoveragePerLineKey:
+			TotalLMCoverage[LineKey] = TotalLMCoverage.get(LineKey, 0) + LMCoveragePerLineKey[LineKey]
+		Selector['SelectedRoutes'].append(RouteInfo)
+		NewSelectedRoutes.append(RouteInfo)
+
+	return NewSelectedRoutes
+
+def SelectBestRoutesByLazyGreedy(RouteInfoList, MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, 
+	LineMeasurementReq=None, RouteCosts=None, MaxSelectedRoutes=None):
+	"""
+	Select routes with the highest marginal LM gain (per route cost) up to MultiplicityLimit 
+	for a LineKey (line, TW, WG), with lazy greedy (CELF) selection. 
+	Alternative to SelectBestRoutesForLineMeasurement, which selects in the order of route values.
+
+	For adding new routes later without rebuilding, use the selector functions directly:
+	InitLazyGreedyRouteSelector, AddRoutesToLazyGreedySelector, RunLazyGreedySelection
+
+	Returns: (SelectedRoutes, TotalLMCoverage)
+			TotalLMCoverage: Total LM coverage of selected routes
+
+	Required globals:
+	- TimeWindows
+	- WeekDayGroups
+	"""
+	Selector = InitLazyGreedyRouteSelector(MultiplicityLimit, ReqLineMeasureTime, FirstDayOfPeriod, LastDayOfPeriod, LineMeasurementReq)
+	AddRoutesToLazyGreedySelector(Selector, RouteInfoList, RouteCosts)
+	RunLazyGreedySelection(Selector, MaxSelectedRoutes)
+	return (Selector['SelectedRoutes'], Selector['TotalLMCoverage'])
 
 # **************************************************************************************
 # Availability and Weekday functions (Verkehrstage und Werktage)
@@ -2847,7 +3584,7 @@ def GetAvailableWeekDays(AvailableDaysOrd):
 	AvailableWeekDays = set()
 
 	for DayOrd in AvailableDaysOrd:
-		WeekDay = date.fromordinal(DayOrd).isoweekday()
+		WeekDay = (DayOrd - 1) % 7 + 1 		# isoweekday; date.fromordinal(1) is a Monday
 		AvailableWeekDays.add(WeekDay)
 		if len(AvailableWeekDays) == 7: 
 			awd = list(AvailableWeekDays)
@@ -3037,8 +3774,6 @@ def CondStrSelectedTripDays_bitfeld(DayList):
 
 	return SQLcond
 
-CondStrSelectedTripDays = CondStrSelectedTripDays_hex
-
 def CondStrExcludeGattungs(GattungList):
 	"""
 	Return SQL condition string for excluded Gattungs.
@@ -3117,7 +3852,572 @@ def CondStrOneOfSelectedTripDays_hex(DayOrdList):
 	# print SQLcond
 	return SQLcond
 
-CondStrOneOfSelectedTripDays = CondStrOneOfSelectedTripDays_hex
+
+# **************************************************************************************
+# Traffic day bit columns (single-predicate traffic day conditions)
+# **************************************************************************************
+
+# number of bits of column trafficdays_bits; day ref (days after FPLAN_BeginDate) is at bit position ref+3,
+# like in the hex code conditions (CondStrSelectedTripDays_hex)
+TrafficDayBitLength = (FPLAN_EndDate - FPLAN_BeginDate).days + 3
+
+def GetTrafficDayBitMask(DayOrdList):
+	"""
+	Get bit string (like '0010011...') of length TrafficDayBitLength with set bits 
+	for the given ordinal dates; see column trafficdays_bits.
+
+	Returns: BitMaskStr
+	"""
+	StartDayRef = FPLAN_BeginDate.toordinal()
+	EndDayRef = FPLAN_EndDate.toordinal()
+
+	Bits = ['0'] * TrafficDayBitLength
+	for day in DayOrdList:
+		ref = day - StartDayRef
+		if ref < 0 or ref > (EndDayRef - StartDayRef):
+			raise Exception("All dates in DayList must be between FPLAN START and END days!")
+		Bits[ref + 2] = '1'
+	return ''.join(Bits)
+
+def GetWeekdayMask(WeekDayList):
+	"""
+	Get weekday bit mask for column weekdays_mask: bit (WeekDay - 1) is set for each WeekDay (1-7).
+
+	Returns: WeekdayMask (int)
+	"""
+	WeekdayMask = 0
+	for WeekDay in WeekDayList:
+		WeekdayMask |= 1 << (WeekDay - 1)
+	return WeekdayMask
+
+def PrepareTimetableTrafficDayColumns(dbcon, TableName=tbl_TimeTable):
+	"""
+	Timetable preparation: Add generated (stored) columns for traffic day conditions 
+	with a single predicate per condition, without text/bit casts for each row and day:
+
+	trafficdays_bits: 	Traffic days as bit(TrafficDayBitLength), all days if trafficdays_hexcode is null
+	weekdays_mask: 		Weekdays (1-7) with at least one traffic day in the FPLAN year,
+						bit (WeekDay - 1), see GetWeekdayMask
+
+	Requires PostgreSQL 12 or later (generated columns). 
+	Set TimetableHasTrafficDayBits = True after preparation, to use the columns in route search.
+	"""
+	L = TrafficDayBitLength
+	BitsExpr = "coalesce(('x' || trafficdays_hexcode)::bit(%s), repeat('1', %s)::bit(%s))" % (L, L, L)
+	ZeroBits = "B'" + '0' * L + "'"
+
+	# weekday mask from traffic days: bit pattern of all days of each weekday
+	StartDayOrd = FPLAN_BeginDate.toordinal()
+	DayOrds = range(StartDayOrd, FPLAN_EndDate.toordinal()+1)
+	WeekdayTerms = []
+	for WeekDay in range(1, 8):
+		DaysOfWeekday = [d for d in DayOrds if GetWeekdayOfDate(d) == WeekDay]
+		WeekdayPattern = "B'" + GetTrafficDayBitMask(DaysOfWeekday) + "'"
+		WeekdayTerms.append("(CASE WHEN (%s & %s) <> %s THEN %s ELSE 0 END)" % (BitsExpr, WeekdayPattern, ZeroBits, 1 << (WeekDay - 1)))
+
+	dbcur = dbcon.cursor()
+	dbcur.execute("ALTER TABLE %s DROP COLUMN IF EXISTS weekdays_mask;" % TableName)
+	dbcur.execute("ALTER TABLE %s DROP COLUMN IF EXISTS trafficdays_bits;" % TableName)
+	dbcur.execute("ALTER TABLE %s ADD COLUMN trafficdays_bits bit(%s) GENERATED ALWAYS AS (%s) STORED;" % (TableName, L, BitsExpr))
+	dbcur.execute("ALTER TABLE %s ADD COLUMN weekdays_mask smallint GENERATED ALWAYS AS (%s) STORED;" % (TableName, " + ".join(WeekdayTerms)))
+	dbcur.execute("ANALYZE %s;" % TableName)
+	dbcon.commit()
+
+def CondStrSelectedTripDays_bits(DayOrdList):
+	"""
+	Return SQL condition string for selected trip days with a single bit mask predicate.
+	Selected connections must be available on ALL listed days.
+
+	works with column trafficdays_bits (see PrepareTimetableTrafficDayColumns)
+	"""
+	BitMask = "B'" + GetTrafficDayBitMask(DayOrdList) + "'"
+	SQLcond = "(trafficdays_bits & %s) = %s" % (BitMask, BitMask)
+	return SQLcond
+
+def CondStrOneOfSelectedTripDays_bits(DayOrdList):
+	"""
+	Return SQL condition string for selected trip days with a single bit mask predicate.
+	Selected connections must be available on at least ONE OF the listed days.
+
+	works with column trafficdays_bits (see PrepareTimetableTrafficDayColumns)
+	"""
+	BitMask = "B'" + GetTrafficDayBitMask(DayOrdList) + "'"
+	SQLcond = "(trafficdays_bits & %s) <> B'%s'" % (BitMask, '0' * TrafficDayBitLength)
+	return SQLcond
+
+def CondStrSelectedWeekDays_mask(WeekDayList):
+	"""
+	Return SQL condition string for selected week days with a single mask predicate.
+	example: WeekDayList = [6,7] --> find all connections that go on both 6. and 7. days of the week
+
+	works with column weekdays_mask (see PrepareTimetableTrafficDayColumns)
+	"""
+	if not WeekDayList:
+		return ""
+	WeekdayMask = GetWeekdayMask(WeekDayList)
+	SQLcond = "(weekdays_mask & %s) = %s" % (WeekdayMask, WeekdayMask)
+	return SQLcond
+
+def CondStrSelectedTripDays(DayOrdList):
+	"""
+	Return SQL condition string for selected trip days; see CondStrSelectedTripDays_hex
+	and CondStrSelectedTripDays_bits (if TimetableHasTrafficDayBits).
+	"""
+	if TimetableHasTrafficDayBits:
+		return CondStrSelectedTripDays_bits(DayOrdList)
+	return CondStrSelectedTripDays_hex(DayOrdList)
+
+def CondStrOneOfSelectedTripDays(DayOrdList):
+	"""
+	Return SQL condition string for ONE OF the selected trip days; see CondStrOneOfSelectedTripDays_hex
+	and CondStrOneOfSelectedTripDays_bits (if TimetableHasTrafficDayBits).
+	"""
+	if TimetableHasTrafficDayBits:
+		return CondStrOneOfSelectedTripDays_bits(DayOrdList)
+	return CondStrOneOfSelectedTripDays_hex(DayOrdList)
+
+# **************************************************************************************
+# Parameterized SQL conditions (bind variables, prepared statements)
+# **************************************************************************************
+
+# Parameterized variants of CondStr... functions: Return (SQLcond, SQLparams) with psycopg2
+# placeholders (%s), such that the SQL text depends only on the shape of the conditions
+
+def CondSQLRouteStartAndDuration(StartHour, StartMin, LatestArrivalIn):
+	"""
+	Parameterized SQL condition for route start and max duration in minutes,
+	see CondStrRouteStartAndDuration.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	StartMin = StartHour*60 + StartMin
+	SQLcond = "departure_totalmin >= %s AND departure_totalmin <= %s AND arrival_totalmin <= %s"
+	return (SQLcond, [StartMin, StartMin+LatestArrivalIn, StartMin+LatestArrivalIn])
+
+def CondSQLSelectedWeekDays(WeekDayList):
+	"""
+	Parameterized SQL condition for selected week days, see CondStrSelectedWeekDays
+	and CondStrSelectedWeekDays_mask (if TimetableHasTrafficDayBits).
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	if not WeekDayList:
+		return ("", [])
+	wds = sorted(set(WeekDayList))
+	if TimetableHasTrafficDayBits:
+		WeekdayMask = GetWeekdayMask(wds)
+		return ("(weekdays_mask & %s) = %s", [WeekdayMask, WeekdayMask])
+	return ("wochentage LIKE %s", ["%" + "%".join([str(e) for e in wds]) + "%"])
+
+def CondSQLSelectedVerwaltungs(VerwaltungList):
+	"""
+	Parameterized SQL condition for selected Verwaltungs, see CondStrSelectedVerwaltungs.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	return ("management = ANY(%s)", [list(VerwaltungList)])
+
+def CondSQLSelectedGattung(GattungList):
+	"""
+	Parameterized SQL condition for selected Gattungs, see CondStrSelectedGattung.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	return ("line_category = ANY(%s)", [list(GattungList)])
+
+def CondSQLExcludeGattungs(GattungList):
+	"""
+	Parameterized SQL condition for excluded Gattungs, see CondStrExcludeGattungs.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	return ("line_category <> ALL(%s)", [list(GattungList)])
+
+def CondSQLSelectedStations(StationList):
+	"""
+	Parameterized SQL condition for selected stations, see CondStrSelectedStations.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	return ("station_from = ANY(%s) AND station_to = ANY(%s)", [list(StationList), list(StationList)])
+
+def CondSQLSelectedTripDays(DayOrdList):
+	"""
+	Parameterized SQL condition for selected trip days (available on ALL listed days)
+	with a single bit mask predicate, independent of the number of days;
+	see CondStrSelectedTripDays_hex and CondStrSelectedTripDays_bits.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	L = TrafficDayBitLength
+	BitMask = GetTrafficDayBitMask(DayOrdList)
+	if TimetableHasTrafficDayBits:
+		SQLcond = "(trafficdays_bits & %%s::bit(%s)) = %%s::bit(%s)" % (L, L)
+	else:
+		SQLcond = "(trafficdays_hexcode is null OR (('x' || trafficdays_hexcode)::bit(%s) & %%s::bit(%s)) = %%s::bit(%s))" % (L, L, L)
+	return (SQLcond, [BitMask, BitMask])
+
+def ConvertIntervalListToParameterizedSQL(IntervalList, VariableName):
+	"""
+	Parameterized variant of ConvertIntervalListToSQLCondition: 
+	"(x >= %s and x <= %s) or ..." with interval bounds as SQL parameters.
+
+	Returns: (SQLcond, SQLparams)
+	"""
+	ANDList = []
+	SQLparams = []
+	for intv in IntervalList:
+		ANDList.append("(%s >= %%s and %s <= %%s)" % (VariableName, VariableName))
+		SQLparams.extend([intv[0], intv[1]])
+	return (" or ".join(ANDList), SQLparams)
+
+# prepared statement names per (connection, SQL text)
+PreparedStatementNames = {}
+
+def ConvertToPreparedStatementSQL(SQL):
+	"""
+	Convert psycopg2 placeholders (%s) to positional parameters ($1, $2, ...) of PREPARE.
+
+	Returns: (PrepSQL, ParameterCount)
+	"""
+	Parts = SQL.split('%s')
+	PrepSQL = Parts[0]
+	for i in range(1, len(Parts)):
+		PrepSQL += '$' + str(i) + Parts[i]
+	return (PrepSQL, len(Parts) - 1)
+
+def ExecutePreparedQuery(dbcur, SQL, SQLparams):
+	"""
+	Execute parameterized query (psycopg2 placeholders) as a server-side prepared statement,
+	prepared once per connection and SQL text; PostgreSQL can then reuse the query plan
+	for repeated searches (clusters, months) with the same condition shape.
+	"""
+	con = dbcur.connection
+	StatementKey = (id(con), con.get_backend_pid(), SQL)
+
+	if not StatementKey in PreparedStatementNames:
+		StatementName = "tsq_%s" % len(PreparedStatementNames)
+		(PrepSQL, ParameterCount) = ConvertToPreparedStatementSQL(SQL)
+		if ParameterCount != len(SQLparams):
+			raise Exception("Number of SQL parameters (%s) does not match the placeholders in SQL (%s)!" % (len(SQLparams), ParameterCount))
+		dbcur.execute("PREPARE %s AS %s" % (StatementName, PrepSQL))
+		PreparedStatementNames[StatementKey] = StatementName
+
+	StatementName = PreparedStatementNames[StatementKey]
+	if SQLparams:
+		dbcur.execute("EXECUTE %s (%s)" % (StatementName, ",".join(['%s'] * len(SQLparams))), SQLparams)
+	else:
+		dbcur.execute("EXECUTE %s" % StatementName)
+
+def GetTimetableQueryKey(SQL, SQLparams):
+	"""
+	Get key of a parameterized timetable query, like for caching query results on disk.
+
+	Returns: QueryKey (hex string)
+	"""
+	return hashlib.md5(SQL + '|' + repr(SQLparams)).hexdigest()
+
+# **************************************************************************************
+# Station-specific line change times
+# **************************************************************************************
+
+# line change times per station as dense list, indexed by station number - LineChangeTimeStationOffset;
+# -1 for stations without specific line change time; None if not set (see SetLineChangeTimesPerStation)
+LineChangeTimeArray = None
+LineChangeTimeStationOffset = 0
+
+def SetLineChangeTimesPerStation(LineChangeTimePerStation):
+	"""
+	Set station-specific minimum line change times for route search (CheckIfEnoughTimeForLineChange);
+	they replace the default line change time (Cond.DefaultTimeForLineChange) at these stations.
+	The times are stored in a dense list indexed by station number (minus the smallest station number),
+	such that the line change check costs a list read instead of a dictionary or function lookup.
+
+	LineChangeTimePerStation[station] = minimum line change time in minutes, like from ReadUMSTEIGBFile;
+	None or empty: no station-specific line change times.
+	"""
+	global LineChangeTimeArray, LineChangeTimeStationOffset
+
+	if not LineChangeTimePerStation:
+		LineChangeTimeArray = None
+		LineChangeTimeStationOffset = 0
+		return
+
+	FirstStation = min(LineChangeTimePerStation)
+	LastStation = max(LineChangeTimePerStation)
+	ChangeTimes = [-1] * (LastStation - FirstStation + 1)
+	for station in LineChangeTimePerStation:
+		ChangeTimes[station - FirstStation] = LineChangeTimePerStation[station]
+
+	LineChangeTimeStationOffset = FirstStation
+	LineChangeTimeArray = ChangeTimes
+
+def GetLineChangeTimeAtStation(station, GeneralLineChangeTime):
+	"""
+	Get minimum line change time at station; GeneralLineChangeTime if no station-specific
+	line change time is set (see SetLineChangeTimesPerStation).
+
+	Returns: MinChangeTime in minutes
+	"""
+	if LineChangeTimeArray:
+		ind = station - LineChangeTimeStationOffset
+		if ind >= 0 and ind < len(LineChangeTimeArray) and LineChangeTimeArray[ind] >= 0:
+			return LineChangeTimeArray[ind]
+	return GeneralLineChangeTime
+
+def ReadUMSTEIGBFile(FilePath):
+	"""
+	Read station-specific line change times from hafas text file UMSTEIGB; a line contains
+	station number, line change time between IC trains and line change time between all other
+	connections (like '8503000 07 05 Zürich HB'). The latter (general) time is used.
+	Station number 0000000 (default line change time) is skipped, see Cond.DefaultTimeForLineChange.
+
+	Returns: LineChangeTimePerStation[station] = minimum line change time in minutes
+	"""
+	LineChangeTimePerStation = {}
+	f = open(FilePath, 'r')
+	try:
+		for line in f:
+			parts = line.split()
+			if len(parts) < 3 or not (parts[0].isdigit() and parts[1].isdigit() and parts[2].isdigit()):
+				continue
+			station = int(parts[0])
+			if station == 0:
+				continue
+			LineChangeTimePerStation[station] = int(parts[2])
+	finally:
+		f.close()
+	return LineChangeTimePerStation
+
+# **************************************************************************************
+# Footpaths (on-foot station passages)
+# **************************************************************************************
+
+# footpaths between nearby stations, list of (Station1, Station2, WalkMinutes, gattung); see SetFootpaths
+Footpaths = []
+
+def SetFootpaths(FootpathList):
+	"""
+	Set footpaths for on-foot station passages in route search (Cond.MaxNumberOfSubsequentStationPassagesOnFoot).
+
+	FootpathList: List of (Station1, Station2, WalkMinutes, gattung), like from ReadMETABHFFile;
+	gattung is one of TrWay.values() like 'ZF'
+	"""
+	global Footpaths
+	Footpaths = list(FootpathList)
+
+def ReadMETABHFFile(FilePath):
+	"""
+	Read footpaths from hafas text file METABHF; a transfer line contains station 1, station 2 and
+	walking time in minutes (like '8503000 8503006 005'), an attribute line '*A Y' following
+	a transfer line sets its way attribute (see TrWay; 'ZF' if not given).
+	Station group lines (with ':') are skipped.
+
+	Returns: FootpathList, list of (Station1, Station2, WalkMinutes, gattung)
+	"""
+	FootpathList = []
+	f = open(FilePath, 'r')
+	try:
+		for line in f:
+			parts = line.split()
+			if not parts:
+				continue
+			if parts[0] == '*A' and len(parts) > 1 and FootpathList:
+				(Station1, Station2, WalkMinutes, gattung) = FootpathList[-1]
+				FootpathList[-1] = (Station1, Station2, WalkMinutes, TrWay.get(parts[1], TrWay['Y']))
+			elif len(parts) >= 3 and parts[0].isdigit() and parts[1].isdigit() and parts[2].isdigit():
+				FootpathList.append((int(parts[0]), int(parts[1]), int(parts[2]), TrWay['Y']))
+	finally:
+		f.close()
+	return FootpathList
+
+def BuildFootpathGraph(FootpathList, Stations=None):
+	"""
+	Build adjacency of footpaths, with a connection template per footpath. Footpaths are taken in both
+	directions, the shorter walking time is kept for duplicate station pairs.
+
+	Stations: Footpaths between these stations only (like stations of timetable); all if None
+
+	Returns: FootpathGraph[station] = tuple of (Neighbor, WalkMinutes, ConnectionTemplate),
+		ordered by WalkMinutes; ConnectionTemplate is a ConnectionInfo list without times
+	"""
+	WalkMinutesPerPair = {}
+	GattungPerPair = {}
+	for (Station1, Station2, WalkMinutes, gattung) in FootpathList:
+		if Station1 == Station2:
+			continue
+		if Stations != None and not (Station1 in Stations and Station2 in Stations):
+			continue
+		for pair in [(Station1, Station2), (Station2, Station1)]:
+			if not pair in WalkMinutesPerPair or WalkMinutes < WalkMinutesPerPair[pair]:
+				WalkMinutesPerPair[pair] = WalkMinutes
+				GattungPerPair[pair] = gattung
+
+	NeighborsPerStation = {}
+	for (FootpathNr, pair) in enumerate(sorted(WalkMinutesPerPair)):
+		(Station1, Station2) = pair
+
+		# negative conn_id and travel_id: unique per footpath, distinct from timetable trips
+		ConnectionTemplate = [None] * len(ConnInfoInd)
+		ConnectionTemplate[ConnInfoInd['station_from']] = Station1
+		ConnectionTemplate[ConnInfoInd['station_to']] = Station2
+		ConnectionTemplate[ConnInfoInd['conn_id']] = -(FootpathNr + 1)
+		ConnectionTemplate[ConnInfoInd['travel_id']] = -(FootpathNr + 1)
+		ConnectionTemplate[ConnInfoInd['line_category']] = GattungPerPair[pair]
+
+		NeighborsPerStation.setdefault(Station1, []).append((Station2, WalkMinutesPerPair[pair], ConnectionTemplate))
+
+	FootpathGraph = {}
+	for station in NeighborsPerStation:
+		FootpathGraph[station] = tuple(sorted(NeighborsPerStation[station], key=lambda n: n[1]))
+	return FootpathGraph
+
+def GetOnFootConnections(FootpathGraph, station, DepartureTime, ExcludedStation=None):
+	"""
+	Generate on-foot connections (ConnectionInfo) from station to its neighbors in FootpathGraph,
+	departing at DepartureTime (total minutes); connections are created only when requested.
+
+	ExcludedStation: No on-foot connection to this station (like the previous station of a walk)
+	"""
+	for (Neighbor, WalkMinutes, ConnectionTemplate) in FootpathGraph[station]:
+		if Neighbor == ExcludedStation:
+			continue
+		ArrivalTime = DepartureTime + WalkMinutes
+		l = list(ConnectionTemplate)
+		l[ConnInfoInd['departure_hour']] = DepartureTime // 60
+		l[ConnInfoInd['departure_min']] = DepartureTime % 60
+		l[ConnInfoInd['departure_totalmin']] = DepartureTime
+		l[ConnInfoInd['arrival_hour']] = ArrivalTime // 60
+		l[ConnInfoInd['arrival_min']] = ArrivalTime % 60
+		l[ConnInfoInd['arrival_totalmin']] = ArrivalTime
+		yield tuple(l)
+
+def MergeConnectionsByDepartureTime(ConnectionInfoList, OnFootConnections):
+	"""
+	Merge list of next connections and on-foot connections (both ordered by departure time)
+	into a single stream ordered by departure time; on-foot connections come first at equal times.
+	"""
+	hour = ConnInfoInd['departure_hour']
+	minute = ConnInfoInd['departure_min']
+
+	NextOnFoot = next(OnFootConnections, None)
+	for ConnectionInfo in ConnectionInfoList:
+		DepartureTime = 60*ConnectionInfo[hour] + ConnectionInfo[minute]
+		while NextOnFoot and 60*NextOnFoot[hour] + NextOnFoot[minute] <= DepartureTime:
+			yield NextOnFoot
+			NextOnFoot = next(OnFootConnections, None)
+		yield ConnectionInfo
+	while NextOnFoot:
+		yield NextOnFoot
+		NextOnFoot = next(OnFootConnections, None)
+
+# **************************************************************************************
+# Trip station-chain index (direct-line conditions)
+# **************************************************************************************
+
+# station-chain index of trips in timetable, see BuildTripChainIndex (set in FindAllRoutes)
+global_TripChainIndex = None
+
+def BuildTripChainIndex(TimeTableList):
+	"""
+	Build station-chain index of all trips (travel_id) in timetable, with arrays in CSR layout:
+	the stops of the i-th trip are at positions TripOffsets[i] to TripOffsets[i+1]-1
+	of Stations, ArrivalTimes and DepartureTimes, in the order of station_order.
+	A stop is added if a trip continues from another station than its last arrival station.
+
+	Returns: TripChainIndex (dictionary)
+		TripChainIndex['TripIDs'] = travel_id per trip (array)
+		TripChainIndex['TripOffsets'] = position of first stop per trip (array, number of trips + 1)
+		TripChainIndex['Stations'] = station per stop (array)
+		TripChainIndex['ArrivalTimes'] = arrival time (total minutes) per stop, -1 if none
+		TripChainIndex['DepartureTimes'] = departure time (total minutes) per stop, -1 if none
+		TripChainIndex['Position'][(travel_id, station)] = position of (first) stop of trip at station
+	"""
+	travel_id = ConnInfoInd['travel_id']
+	station_order = ConnInfoInd['station_order']
+	station_from = ConnInfoInd['station_from']
+	station_to = ConnInfoInd['station_to']
+	departure = ConnInfoInd['departure_totalmin']
+	arrival = ConnInfoInd['arrival_totalmin']
+
+	Connections = sorted(TimeTableList, key=lambda c: (c[travel_id], c[station_order]))
+
+	TripIDs = []
+	TripOffsets = []
+	Stations = []
+	ArrivalTimes = []
+	DepartureTimes = []
+	Position = {}
+
+	PrevTrip = None
+	for c in Connections:
+		trip = c[travel_id]
+		if trip != PrevTrip or Stations[-1] != c[station_from]:
+			if trip != PrevTrip:
+				TripIDs.append(trip)
+				TripOffsets.append(len(Stations))
+				PrevTrip = trip
+			Position.setdefault((trip, c[station_from]), len(Stations))
+			Stations.append(c[station_from])
+			ArrivalTimes.append(-1)
+			DepartureTimes.append(-1)
+		DepartureTimes[-1] = c[departure]
+
+		Position.setdefault((trip, c[station_to]), len(Stations))
+		Stations.append(c[station_to])
+		ArrivalTimes.append(c[arrival])
+		DepartureTimes.append(-1)
+	TripOffsets.append(len(Stations))
+
+	TripChainIndex = {
+		'TripIDs': 			np.array(TripIDs),
+		'TripOffsets': 		np.array(TripOffsets, int),
+		'Stations': 		np.array(Stations, int),
+		'ArrivalTimes': 	np.array(ArrivalTimes, int),
+		'DepartureTimes': 	np.array(DepartureTimes, int),
+		'Position': 		Position,
+		}
+	return TripChainIndex
+
+def GetStationChainOfTrip(TripChainIndex, TripNr):
+	"""
+	Get stops of the TripNr-th trip of index (see BuildTripChainIndex).
+
+	Returns: (StationChain, ArrivalTimeChain, DepartureTimeChain), arrays
+	"""
+	first = TripChainIndex['TripOffsets'][TripNr]
+	last = TripChainIndex['TripOffsets'][TripNr+1]
+	return (TripChainIndex['Stations'][first:last], TripChainIndex['ArrivalTimes'][first:last], \
+		TripChainIndex['DepartureTimes'][first:last])
+
+def GetTripArrivalAtLaterStation(TripChainIndex, TripID, FromStation, ToStation):
+	"""
+	Check if trip TripID (travel_id) reaches ToStation after FromStation, with two lookups
+	in position hash of index (see BuildTripChainIndex).
+
+	Returns: Arrival time (total minutes) of trip at ToStation, or None
+	"""
+	Position = TripChainIndex['Position']
+	FromPos = Position.get((TripID, FromStation))
+	ToPos = Position.get((TripID, ToStation))
+	if FromPos == None or ToPos == None or ToPos <= FromPos:
+		return None
+	return int(TripChainIndex['ArrivalTimes'][ToPos])
+
+def GetDirectLineStationPairs(RouteConditions):
+	"""
+	Get station pairs (Station1, Station2) of direct-line conditions
+	Cond.TakeADirectLineConnectionFromStation1ToStation2 and Cond.ConnectStationPairsWithASingleLine.
+
+	Returns: StationPairs, list of (Station1, Station2); empty list if no direct-line conditions
+	"""
+	StationPairs = []
+	if RouteConditions.has_key(Cond.TakeADirectLineConnectionFromStation1ToStation2):
+		(Station1, Station2) = RouteConditions[Cond.TakeADirectLineConnectionFromStation1ToStation2][:2]
+		StationPairs.append((Station1, Station2))
+	if RouteConditions.has_key(Cond.ConnectStationPairsWithASingleLine):
+		StationPairs += list(RouteConditions[Cond.ConnectStationPairsWithASingleLine][0])
+	return StationPairs
 
 # **************************************************************************************
 # Condition to be applied on ConnectionInfo functions for selecting connections
@@ -3361,6 +4661,8 @@ def CheckIfEnoughTimeForLineChange(ConnectionInfo, PathInfo, MinChangeTime=5):
 	"""
 	Check if there is enough time for changing the line.
 	A line is uniquely defined by last_fahrtid.
+	MinChangeTime is the default line change time; a station-specific line change time
+	of the change station replaces it, if set (see SetLineChangeTimesPerStation).
 	"""
 	if len(PathInfo) <= 1: return True 	# no change time is required at starting station
 
@@ -3395,6 +4697,12 @@ def CheckIfEnoughTimeForLineChange(ConnectionInfo, PathInfo, MinChangeTime=5):
 	if next_fahrtid == last_fahrtid:
 		return True
 	else:
+		# station-specific line change time (array read)
+		if LineChangeTimeArray:
+			ind = ConnectionInfo[ConnInfoInd['station_from']] - LineChangeTimeStationOffset
+			if ind >= 0 and ind < len(LineChangeTimeArray) and LineChangeTimeArray[ind] >= 0:
+				MinChangeTime = LineChangeTimeArray[ind]
+
 		if ( NextAbfahrtMin - LastAnkunftMin) >= MinChangeTime:
 			return True
 		else:
@@ -3729,20 +5037,56 @@ def CheckIfOnFootPassageFromStation1ToStation2WasAlreadyTaken(PathInfo, Station1
 	# all checks passed
 	return True
 
-def CheckIfStationPairsAreConnectedWithASingleLine(ConnectionInfo, PathInfo, RouteConditions, ListOfStationPairs):
+def CheckIfPathDepartsFromStation(PathInfo, Station):
+	"""
+	Return true if a connection of path (PathInfo, without the first dummy connection)
+	departs from Station; otherwise false.
 	"""
-	Check if station pairs ListOfStationPairs are connected with a single line, in given order,
-	without line changes between the stations in a pair.
+	station_from = ConnInfoInd['station_from']
+	for i in range(1, len(PathInfo)):
+		if PathInfo[i][station_from] == Station:
+			return True
+	return False
 
-	Builds AggregatePath based on ListOfStationPairs and calls CheckIfAggregatePathIsFollowedRelatively
+def CheckIfStationPairsAreConnectedWithASingleLine(ConnectionInfo, PathInfo, StationPairs, TripChainIndex):
 	"""
-	# build AggregatePath
-	AggregatePath = []
-	for (station1, station2) in ListOfStationPairs:
-		AggrConn = CreateAggregateConnection(haltestelle_ab=station1, haltestelle_an=station2)
-		AggregatePath.append(AggrConn)
-	
-	return CheckIfAggregatePathIsFollowedRelatively(ConnectionInfo, PathInfo, RouteConditions, AggregatePath)
+	Check direct-line conditions of station pairs (Station1, Station2) with the next connection,
+	for the first departure of path from Station1 (later departures from Station1 are free):
+	1) The first departure from Station1 must be with a trip that reaches Station2 later
+	2) The trip of the first departure from Station1 must not be left before it reaches Station2
+
+	Trips serving Station1 and Station2 are found with hash lookups in TripChainIndex
+	(see BuildTripChainIndex); PathInfo is only scanned at departures from Station1,
+	and at line changes from such trips (backwards over the connections of the trip).
+	"""
+	travel_id = ConnInfoInd['travel_id']
+	station_from = ConnInfoInd['station_from']
+	station_to = ConnInfoInd['station_to']
+
+	NextTrip = ConnectionInfo[travel_id]
+	NextStation = ConnectionInfo[station_from]
+	LastTrip = PathInfo[-1][travel_id]
+	Position = TripChainIndex['Position']
+
+	for (Station1, Station2) in StationPairs:
+		# 1) departure from Station1
+		if NextStation == Station1 and GetTripArrivalAtLaterStation(TripChainIndex, NextTrip, Station1, Station2) == None:
+			if not CheckIfPathDepartsFromStation(PathInfo, Station1):
+				return False
+
+		# 2) line change from a trip serving Station1 and Station2
+		if NextTrip != LastTrip and (LastTrip, Station1) in Position and (LastTrip, Station2) in Position:
+			i = len(PathInfo) - 1
+			while i >= 1 and PathInfo[i][travel_id] == LastTrip:
+				if PathInfo[i][station_to] == Station2:
+					break
+				if PathInfo[i][station_from] == Station1:
+					# trip taken from Station1 is left before Station2
+					if not CheckIfPathDepartsFromStation(PathInfo[:i], Station1):
+						return False
+					break
+				i -= 1
+	return True
 
 def CheckIfStationsAreVisitedInGivenOrder(ConnectionInfo, PathInfo, RouteConditions, OrderedStationList):
 	"""
@@ -3861,6 +5205,16 @@ def CheckIfRouteExludesAllStationInList(PathInfo, ExcludedStations):
 	else:
 		return False
 
+def CheckIfRouteHasPositiveReducedCost(PathInfo, DualPricePerLineKey, RouteCostPerMinute, MinReducedCost=0):
+	"""
+	Return true if the reduced cost of the route is greater than MinReducedCost 
+	(see GetReducedCostOfRoute); otherwise false.
+	"""
+	if not DualPricePerLineKey:
+		return False
+	RouteInfo = ApplyAllRouteInfoCorrections(PathInfo)
+	return GetReducedCostOfRoute(RouteInfo, DualPricePerLineKey, RouteCostPerMinute) > MinReducedCost
+
 def CheckIfAllLinesCanBeMeasured(PathInfo, TimeIntervalsForLineMeasurement, TimeRequiredForMeasurement):
 	"""
 	Return true if all the lines in dictionary TimeIntervalsForLineMeasurement 
@@ -20,6 +20,8 @@ from datetime import datetime
 from datetime import timedelta
 import calendar
 import random
+import multiprocessing
+import bisect
 # import Combinations as cmb
 import itertools as it
 from timeit import default_timer
@@ -168,6 +170,37 @@ def obj_TotalIncome(TDVlist, CoveredLMRequirements):
 # HELPER FUNCTIONS
 #######################################################################################
 
+def GetTimeIntervalIndexOfRoutes(RouteList, TimeIntervalPerRoute):
+	"""
+	Index of routes sorted by time interval (StartMin, EndMin), for fast queries of
+	routes within a time window (see GetRoutesWithinTimeWindow).
+
+	Returns: (StartMinutes, SortedRoutes)
+		SortedRoutes: list of (StartMin, EndMin, r) sorted by (StartMin, EndMin)
+		StartMinutes: StartMin of SortedRoutes (for bisection)
+	"""
+	SortedRoutes = [(TimeIntervalPerRoute[r][0], TimeIntervalPerRoute[r][1], r) for r in RouteList]
+	SortedRoutes.sort()
+	StartMinutes = [x[0] for x in SortedRoutes]
+	return (StartMinutes, SortedRoutes)
+
+def GetRoutesWithinTimeWindow(TimeIntervalIndex, StartMinTW, EndMinTW):
+	"""
+	Get routes of time interval index (see GetTimeIntervalIndexOfRoutes) that lie
+	within the time window, i.e. StartMinTW <= StartMin and EndMin <= EndMinTW.
+	Only routes starting within the time window are scanned.
+
+	Returns: List of routes r
+	"""
+	(StartMinutes, SortedRoutes) = TimeIntervalIndex
+	RouteList = []
+	i = bisect.bisect_left(StartMinutes, StartMinTW)
+	while i < len(SortedRoutes) and SortedRoutes[i][0] <= EndMinTW:
+		if SortedRoutes[i][1] <= EndMinTW:
+			RouteList.append(SortedRoutes[i][2])
+		i += 1
+	return RouteList
+
 def MapFittingRoutesToDaysAndTCs(TCList, DayList, TKavailability, TimeIntervalPerRoute, UnvailableDaysPerRoute, RoutesPerTC):
 	"""
 	Map fitting Routes to Days and Test Customers:
@@ -188,6 +221,10 @@ def MapFittingRoutesToDaysAndTCs(TCList, DayList, TKavailability, TimeIntervalPe
 	Wenn kein Eintrag hat der Testkunde an diesem Tag KEINE Einschraenkungen
 
 	returns: (RoutesPerTCAndDay, FittingRoutes, FittingDays, FittingTCs)
+
+	Routes of each TC are indexed by time interval (TCs with the same routes, like the same
+	start station, share an index) and unavailable days are inverted to routes per day,
+	so that only fitting candidates are scanned for each (t,d).
 	"""
 	RoutesPerTCAndDay = {}
 	R = len(TimeIntervalPerRoute)
@@ -197,34 +234,51 @@ def MapFittingRoutesToDaysAndTCs(TCList, DayList, TKavailability, TimeIntervalPe
 	FittingDays = set()
 	FittingTCs = set()
 
+	# routes (1..R) of TCs, and their time interval index
+	RouteListPerTC = {}
+	TimeIntervalIndexPerRouteList = {}
+	for t in TCList:
+		RouteList = []
+		if t in RoutesPerTC: 
+			RouteList = sorted(set([r for r in RoutesPerTC[t] if 1 <= r <= R]))
+		RouteListPerTC[t] = RouteList
+		if not tuple(RouteList) in TimeIntervalIndexPerRouteList:
+			TimeIntervalIndexPerRouteList[tuple(RouteList)] = GetTimeIntervalIndexOfRoutes(RouteList, TimeIntervalPerRoute)
+
+	# unavailable routes per day, for routes of TCs only
+	DaySet = set(DayList)
+	UnavailableRoutesPerDay = {}
+	RoutesOfTCs = set()
+	for t in RouteListPerTC:
+		RoutesOfTCs.update(RouteListPerTC[t])
+	for r in sorted(RoutesOfTCs):
+		for d in UnvailableDaysPerRoute[r]:
+			if not d in DaySet: continue
+			if not d in UnavailableRoutesPerDay: UnavailableRoutesPerDay[d] = set()
+			UnavailableRoutesPerDay[d].add(r)
+
 	for t in TCList:
+		TimeIntervalIndex = TimeIntervalIndexPerRouteList[tuple(RouteListPerTC[t])]
 		for d in DayList:
 			RoutesPerTCAndDay[(t,d)] = []
 			if (t,d) in TKavailability and TKavailability[(t,d)] == None: 
 				continue
-			for r in range(1, R+1):
-				RouteList = []
-				if t in RoutesPerTC: RouteList = RoutesPerTC[t]
-				if r in RouteList:
-					if d not in UnvailableDaysPerRoute[r]:
-						if (t,d) not in TKavailability:
-							RoutesPerTCAndDay[(t,d)].append(r)
-							FittingRoutes.add(r)
-							FittingDays.add(d)
-							FittingTCs.add(t)
-						else:
-							StartMinRoute = TimeIntervalPerRoute[r][0]
-							EndMinRoute = TimeIntervalPerRoute[r][1]
-							# there can be multiple availability intervals in a day
-							for TimeIntv in TKavailability[(t,d)]:
-								StartMinTW = TimeIntv[0]
-								EndMinTW = TimeIntv[1]
-								if StartMinTW <= StartMinRoute and EndMinTW >= EndMinRoute:
-									RoutesPerTCAndDay[(t,d)].append(r)
-									FittingRoutes.add(r)
-									FittingDays.add(d)
-									FittingTCs.add(t)
-									break 
+			UnavailableRoutes = UnavailableRoutesPerDay.get(d, set())
+
+			if (t,d) not in TKavailability:
+				RouteList = [r for r in RouteListPerTC[t] if not r in UnavailableRoutes]
+			else:
+				# there can be multiple availability intervals in a day
+				RouteSet = set()
+				for (StartMinTW, EndMinTW) in TKavailability[(t,d)]:
+					RouteSet.update(GetRoutesWithinTimeWindow(TimeIntervalIndex, StartMinTW, EndMinTW))
+				RouteList = sorted([r for r in RouteSet if not r in UnavailableRoutes])
+
+			if RouteList:
+				RoutesPerTCAndDay[(t,d)] = RouteList
+				FittingRoutes.update(RouteList)
+				FittingDays.add(d)
+				FittingTCs.add(t)
 
 	FittingRoutes = list(FittingRoutes)
 	FittingRoutes.sort()
@@ -398,6 +452,9 @@ def GetAllTDVtupleCombinationsOfDayForUncoveredRequirements(day, AllTDVtuplesOfD
 
 	A TDV tuple with v = None may also be included in a TDV combination.
 	day value must be same in all TDV tuples.
+
+	Number of combinations grows exponentially with the number of test customers;
+	see FindOptimalTDRCombinationOfDay for the best combination with branch-and-bound.
 	"""
 	# group TDV tuples w.r.t test customers
 	TDVtuplesPerTC = {}
@@ -533,7 +590,7 @@ def GetSolutionValue(NewTDRs, SolutionTDRlist, LMCounterPerLineKey, LMRequiremen
 		LMReq = 0 
 		if LineKey in LMRequirementsAll:
 			LMReq = LMRequirementsAll[LineKey]
-		LineMeasurementRevenue += min(LMCounter[LineKey], LineKey) * RevenueLineMeasure 
+		LineMeasurementRevenue += min(LMCounter[LineKey], LMReq) * RevenueLineMeasure 
 
 	# Route duration costs considering special hours and weekdays
 	TripDurationCosts = 0
@@ -555,15 +612,17 @@ def IncrementLMCounter(TDRlist, LMCounter, LMCoverage_PerDayRoute):
 	Increment Line Measurement Counter by the total LM coverage of TDRlist (list of (t,d,r))
 	LMCoverage_PerDayRoute[d,r] = LMCoveragePerLineKey
 	"""
+	LMCoveragePerLineKey = LMCounter
 	for tdr in TDRlist:
 		(t,d,r) = tdr
+		if r == None: continue
 		LMCoverage = LMCoverage_PerDayRoute[d,r]
-		LMCoveragePerLineKey = AddDicValues(LMCounter, LMCoverage)
+		LMCoveragePerLineKey = AddDicValues(LMCoveragePerLineKey, LMCoverage)
 	return LMCoveragePerLineKey
 
 # created on 9.3.2020 by Tunc
 def GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustomer, ReqLineMeasureTime,
-	FirstDayOfMonth=PeriodBegin, LastDayOfMonth=PeriodEnd, LMRequirements=None):
+	FirstDayOfMonth=PeriodBegin, LastDayOfMonth=PeriodEnd, LMRequirements=None, AssignmentPlanningVariables=None):
 	"""
 	Generate all in-memory variables required for assignment planning (TDR --> (t,d,r)):
 	- LMCoveragePerDayRoute[d,r] = LMCoverage (per LineKey)
@@ -576,41 +635,60 @@ def GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustom
 		1: 8507000, 		# Murtaza --> Bern
 		2: 8504300, 		# Hatice --> Biel
 		... }
+
+	AssignmentPlanningVariables: Variables generated before for the first routes of RouteInfoList
+		(same period, test customers and requirements); if not None, the variables are 
+		extended for the additional routes only (for a growing route pool).
 	"""
-	AssignmentPlanningVariables = {}
 	DayList = range(FirstDayOfMonth.toordinal(), LastDayOfMonth.toordinal()+1)
 	TestCustomerList = StartStationPerTestCustomer.keys()
 
+	if AssignmentPlanningVariables == None:
+		AssignmentPlanningVariables = {
+			'TimeIntervalOfRoute': 			{},
+			'LMCoveragePerDayRoute': 		{},
+			'AvailableRoutesPerTCAndDay': 	{},
+			'TravelIDListOfRoute': 			{},
+		}
+		for t in TestCustomerList:
+			for d in DayList:
+				AssignmentPlanningVariables['AvailableRoutesPerTCAndDay'][(t,d)] = []
+
+	# routes without variables
+	NewRoutes = range(len(AssignmentPlanningVariables['TimeIntervalOfRoute']), len(RouteInfoList))
+
 	# TimeIntervalOfRoute
-	TimeIntervalOfRoute = {}
+	TimeIntervalOfRoute = AssignmentPlanningVariables['TimeIntervalOfRoute']
 
-	for r in range(0, len(RouteInfoList)):
+	for r in NewRoutes:
 		RouteInfo = RouteInfoList[r]
 		DepartureTime = GetDepartureTimeOfTour(RouteInfo)
 		ArrivalTime = GetArrivalTimeOfTour(RouteInfo)
 		TimeIntervalOfRoute[r] = (DepartureTime, ArrivalTime)
 
-	AssignmentPlanningVariables['TimeIntervalOfRoute'] = TimeIntervalOfRoute
-
 	# LMCoveragePerDayRoute (for a given date)
-	LMCoveragePerDayRoute = {}
+	# potential coverage of route is evaluated once for the period, and then 
+	# restricted to the WeekdayGroup of each day (see GetLMCoverageOfRouteForGivenDay)
+	LMCoveragePerDayRoute = AssignmentPlanningVariables['LMCoveragePerDayRoute']
+	WeekdayGroupPerDay = {}
+	for d in DayList:
+		WeekdayGroupPerDay[d] = GetWeekdayGroupsOfDate(WD, d)[0]
 
-	for r in range(0, len(RouteInfoList)):
+	for r in NewRoutes:
 		RouteInfo = RouteInfoList[r]
+		(LMCoverageOfRoutePerSegment, PotentialLMCoverage) = GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, 
+			FirstDayOfMonth, LastDayOfMonth, LMRequirements)
 		for d in DayList:
-			LMCoverage = GetLMCoverageOfRouteForGivenDay(RouteInfo, d, ReqLineMeasureTime, 
-				FirstDayOfMonth, LastDayOfMonth, LMRequirements)
+			LMCoverage = {}
+			for LineKey in PotentialLMCoverage:
+				if LineKey[2] == WeekdayGroupPerDay[d]:
+					LMCoverage[LineKey] = 1
 			LMCoveragePerDayRoute[(d,r)] = LMCoverage
 
-	AssignmentPlanningVariables['LMCoveragePerDayRoute'] = LMCoveragePerDayRoute
-
 	# AvailableRoutesPerTCAndDay
-	AvailableRoutesPerTCAndDay = {}
-	for t in TestCustomerList:
-		for d in DayList:
-			AvailableRoutesPerTCAndDay[(t,d)] = []
+	AvailableRoutesPerTCAndDay = AssignmentPlanningVariables['AvailableRoutesPerTCAndDay']
 
-	for r in range(0, len(RouteInfoList)):
+	for r in NewRoutes:
 		RouteInfo = RouteInfoList[r]
 		StartStation = RouteInfo[1][ConnInfoInd['station_from']]
 		(AvailableDaysRoute, UnavailableDaysRoute) = GetAvailabilityOfRoute(RouteInfo, FirstDayOfMonth, LastDayOfMonth)
@@ -619,12 +697,10 @@ def GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustom
 				if StartStation == StartStationPerTestCustomer[t] and d in AvailableDaysRoute:
 					AvailableRoutesPerTCAndDay[(t,d)].append(r)
 
-	AssignmentPlanningVariables['AvailableRoutesPerTCAndDay'] = AvailableRoutesPerTCAndDay
-
 	# TravelIDListOfRoute
-	TravelIDListOfRoute = {}
+	TravelIDListOfRoute = AssignmentPlanningVariables['TravelIDListOfRoute']
 
-	for r in range(0, len(RouteInfoList)):
+	for r in NewRoutes:
 		RouteInfo = RouteInfoList[r]
 		TravelIDListOfRoute[r] = []
 		for ConnInfo in RouteInfo:
@@ -632,10 +708,61 @@ def GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustom
 			if not TravelID in TravelIDListOfRoute[r]:
 				TravelIDListOfRoute[r].append(TravelID)
 
-	AssignmentPlanningVariables['TravelIDListOfRoute'] = TravelIDListOfRoute
-
 	return AssignmentPlanningVariables
 
+def CheckIfRouteFitsAvailability(TimeIntervalOfRoute, AvailabilityOfDay):
+	"""
+	Check if the time interval (DepartureMin, ArrivalMin) of a route lies within one of the
+	time windows of a test customer's availability on a day.
+
+	AvailabilityOfDay: None (not available for the whole day), or a list of time windows 
+		in minutes like [(8*60, 14*60),(16*60, 22*60)]
+
+	Returns: True if route fits
+	"""
+	if AvailabilityOfDay == None:
+		return False
+	(DepartureMin, ArrivalMin) = TimeIntervalOfRoute
+	for (m1, m2) in AvailabilityOfDay:
+		if m1 <= DepartureMin and ArrivalMin <= m2:
+			return True
+	return False
+
+def UpdateAvailableRoutesForAvailability(Params, Availability):
+	"""
+	Restrict the available routes AvailableRoutesPerTCAndDay of assignment parameters 
+	(see GenerateAssignmentPlanningVariables) to the availability of test customers,
+	for the (t,d) keys of Availability only; other (t,d) entries remain unchanged.
+
+	Availability[(t,d)] = [(m1,m2),(m3,m4), ...] or None (not available for the whole day);
+		[(0, 24*60)] for no time limits, like an availability delta of a single TC.
+
+	Unrestricted route lists are kept in Params['AllRoutesPerTCAndDay'] (created on the 
+	first call), so that availability can also be extended later.
+
+	Returns: ChangedTCDays, list of (t,d) with changed route lists
+	"""
+	AvailableRoutesPerTCAndDay = Params['AvailableRoutesPerTCAndDay']
+	TimeIntervalOfRoute = Params['TimeIntervalOfRoute']
+
+	if not Params.has_key('AllRoutesPerTCAndDay'):
+		Params['AllRoutesPerTCAndDay'] = {}
+	AllRoutesPerTCAndDay = Params['AllRoutesPerTCAndDay']
+
+	ChangedTCDays = []
+	for (t,d) in Availability:
+		if not AvailableRoutesPerTCAndDay.has_key((t,d)): continue
+		if not AllRoutesPerTCAndDay.has_key((t,d)):
+			AllRoutesPerTCAndDay[(t,d)] = AvailableRoutesPerTCAndDay[(t,d)]
+
+		RouteList = [r for r in AllRoutesPerTCAndDay[(t,d)] \
+			if CheckIfRouteFitsAvailability(TimeIntervalOfRoute[r], Availability[(t,d)])]
+		if RouteList != AvailableRoutesPerTCAndDay[(t,d)]:
+			ChangedTCDays.append((t,d))
+		AvailableRoutesPerTCAndDay[(t,d)] = RouteList
+
+	return ChangedTCDays
+
 
 #######################################################################################
 # ROUTE & MSPEC VALUE
@@ -683,35 +810,99 @@ def GetDurationCostOfRoute(RouteInfo, TripCostPerTimeInterval):
 	(DurationCost, SegmentsPerInterval) = GetTotalValueOfInterval(TripCostPerTimeInterval, TripInterval)
 	return DurationCost
 
+#######################################################################################
+# TEST CUSTOMER (TC) STATE TABLE
+#######################################################################################
+
+# StateTablePerTC[t] = [TripCount, LastDay, BlockDays]
+TCStateInd = {
+	'TripCount': 	0, 		# number of trips assigned to t so far
+	'LastDay': 		1, 		# last assigned day (ordinal date) of t, None if no trips yet
+	'BlockDays': 	2, 		# length of the current block of subsequent trip days ending at LastDay
+}
+
+def InitStateTablePerTC(TCList):
+	"""
+	Initiate an empty state table for all test customers in TCList.
+
+	Returns: StateTablePerTC[t] = [TripCount, LastDay, BlockDays], see TCStateInd
+	"""
+	StateTablePerTC = {}
+	for t in TCList:
+		StateTablePerTC[t] = [0, None, 0]
+	return StateTablePerTC
+
+def UpdateStateTablePerTC(StateTablePerTC, TDR):
+	"""
+	Update state table of test customer t with the committed TDR tuple (t,d,r), in O(1).
+
+	TDR tuples of a TC must be committed in ascending day order.
+	TDR tuples with r = None (no trip) are ignored.
+	"""
+	(t,d,r) = TDR
+	if r == None:
+		return StateTablePerTC
+
+	if not t in StateTablePerTC:
+		StateTablePerTC[t] = [0, None, 0]
+	State = StateTablePerTC[t]
+
+	LastDay = State[TCStateInd['LastDay']]
+	if LastDay == d:
+		pass 		# another trip on the same day, block remains unchanged
+	elif LastDay != None and LastDay == d-1:
+		State[TCStateInd['BlockDays']] += 1
+	else:
+		State[TCStateInd['BlockDays']] = 1
+
+	State[TCStateInd['TripCount']] += 1
+	State[TCStateInd['LastDay']] = d
+	return StateTablePerTC
+
+def GetStateTablePerTC(TDRlist):
+	"""
+	Build the state table of test customers from a complete solution (TDRlist).
+
+	Returns: StateTablePerTC[t] = [TripCount, LastDay, BlockDays], see TCStateInd
+	"""
+	StateTablePerTC = {}
+	for TDR in sorted(TDRlist, key=lambda tdr: tdr[1]):
+		UpdateStateTablePerTC(StateTablePerTC, TDR)
+	return StateTablePerTC
+
+def GetTripCountOfTC(StateTablePerTC, t):
+	"""
+	Return number of trips assigned to test customer t so far.
+	"""
+	if not t in StateTablePerTC:
+		return 0
+	return StateTablePerTC[t][TCStateInd['TripCount']]
+
 #######################################################################################
 # BOOLEAN TDRtupleCombOfDay & SOLUTION VALIDATION FUNCTIONS
 #######################################################################################
 
 # updated: 8.3.2020 by Tunc
-def CheckNumberOfTripsForEachTC(TDRlist, MinTripCountPerTC):
+def CheckNumberOfTripsForEachTC(TDRlist, MinTripCountPerTC, StateTablePerTC=None):
 	"""
 	Check if a minimum number of trips assigned to each test customer (TC):
 	PlannedTripCount(t) >= MinTripCount(t) for each test customer t
 
+	StateTablePerTC: Running state table of TDRlist (see InitStateTablePerTC); 
+		built from TDRlist if None.
+
 	Return False if PlannedTripCount <  MinTripCountPerTC[t] for any test customer t
 	"""
-	PlannedTripCountPerTC = {}
-
-	for TDR in TDRlist:
-		(t,d,r) = TDR
-		if not PlannedTripCountPerTC.has_key(t): PlannedTripCountPerTC[t] = 0
-		PlannedTripCountPerTC[t] += 1
+	if StateTablePerTC == None:
+		StateTablePerTC = GetStateTablePerTC(TDRlist)
 
 	for t in MinTripCountPerTC:
-		PlannedTripCount = 0 
-		if PlannedTripCountPerTC.has_key(t): 
-			PlannedTripCount = PlannedTripCountPerTC[t]
-		if  PlannedTripCount < MinTripCountPerTC[t]:
+		if GetTripCountOfTC(StateTablePerTC, t) < MinTripCountPerTC[t]:
 			return False
 	return True
 
 # updated: 8.3.2020 by Tunc
-def CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCountPerTC):
+def CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCountPerTC, StateTablePerTC=None):
 	"""
 	Return True if TDR contributes to the satisfaction of the solution (TDRlist) selection 
 	condition as described below.
@@ -724,17 +915,10 @@ def CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCoun
 	Return True if t is a key of MinTripCountPerTC AND PlannedTripCount(t) < MinTripCount(t)
 
 	TDRlist does not include TDR (TDRlist before TDR)
+	StateTablePerTC: Running state table of TDRlist; built from TDRlist if None.
 
 	Created on 29.04.2017 By Tunc, Feldmeilen
 	"""
-	PlannedTripCountPerTC = {}
-	for tdr in TDRlist:
-		(t,d,r) = tdr
-		if r == None: 
-			continue
-		if not PlannedTripCountPerTC.has_key(t): PlannedTripCountPerTC[t] = 0
-		PlannedTripCountPerTC[t] += 1
-
 	(t,d,r) = TDR
 	if r == None:
 		return False 
@@ -742,54 +926,59 @@ def CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCoun
 	if not t in MinTripCountPerTC:
 		return False 
 
-	if t in PlannedTripCountPerTC:
-		# LowerLimit for t not yet reached
-		if PlannedTripCountPerTC[t] < MinTripCountPerTC[t]:
-			return True 
-		else:
-			return False
+	if StateTablePerTC == None:
+		StateTablePerTC = GetStateTablePerTC(TDRlist)
 
-	# t NOT in PlannedTripCountPerTC
+	# LowerLimit for t not yet reached
+	if GetTripCountOfTC(StateTablePerTC, t) < MinTripCountPerTC[t]:
+		return True 
 	else:
-		if MinTripCountPerTC[t] > 0:
-			return True 
-		else:
-			return False
+		return False
+
+def CheckMaxBlockDaysOfTDR(TDR, MaxBlockDaysPerTC, StateTablePerTC):
+	"""
+	Check if TDR (t,d,r) would extend the current block of subsequent trip days
+	of test customer t beyond MaxBlockDaysPerTC[t], in O(1).
+
+	A missing t in MaxBlockDaysPerTC means there is no block days limit for t.
+	Return False if max block days limit is exceeded.
+	"""
+	(t,d,r) = TDR
+	if r == None: return True
+	if not t in MaxBlockDaysPerTC: return True
+	if not t in StateTablePerTC: return True
 
+	State = StateTablePerTC[t]
+	LastDay = State[TCStateInd['LastDay']]
+
+	# new block, or another trip on the same day
+	if LastDay == None or LastDay != d-1:
+		return True
+
+	if State[TCStateInd['BlockDays']] + 1 > MaxBlockDaysPerTC[t]:
+		return False
+	return True
 
 # updated: 8.3.2020 by Tunc
-def CheckMaxBlockDaysForEachTC(TDRtupleCombOfDay, TDRlist, MaxBlockDaysPerTC):
+def CheckMaxBlockDaysForEachTC(TDRtupleCombOfDay, TDRlist, MaxBlockDaysPerTC, StateTablePerTC=None):
 	"""
 	Check if max number of allowed subsequent days with trips is not exceeded.
 	Return False if max block days limit is exceeded.
 
+	TDRlist: All TDR-tuples of preceding days, without TDRtupleCombOfDay
+	StateTablePerTC: Running state table of TDRlist; built from TDRlist if None.
+
 	see: MaxBlockDaysPerTC[t] = 3
 	"""
-	SubsequentTrips = 0
-
 	# shortcuts
 	if len(TDRtupleCombOfDay) == 0:
 		return True
 
-	# check if there are MaxBlockDaysPerTC[t] times preceeding TDRtuple's 
-	for TDR in TDRtupleCombOfDay:
-		(t,d,r) = TDR
-		if r == None: continue
-		TDRlist_t = [tdr for tdr in TDRlist if tdr[0] == t and tdr[1] < d]
-		
-		# shortcut
-		if len(TDRlist_t) < MaxBlockDaysPerTC[t]:
-			continue
+	if StateTablePerTC == None:
+		StateTablePerTC = GetStateTablePerTC(TDRlist)
 
-		TRVlist_t.sort()
-		IfBlockDaysLimitExceeded = True
-		for i in range(1, MaxBlockDaysPerTC[t]+1):
-			tdr = TDRlist_t[-i]
-			(tx,dx,rx) = tdr 
-			# if not (dx == d-1 and rx != None):
-			if not (dx == d-i and rx != None):
-				IfBlockDaysLimitExceeded = False
-		if IfBlockDaysLimitExceeded:
+	for TDR in TDRtupleCombOfDay:
+		if not CheckMaxBlockDaysOfTDR(TDR, MaxBlockDaysPerTC, StateTablePerTC):
 			return False
 	return True
 
@@ -886,6 +1075,7 @@ class AssignCond:
 
 	IfTestSolutionSearch = False 
 	MaxTotalLMReached = 0 					# max LM count reached so far
+	StateTablePerTC = None 					# running TC states of solution, see InitStateTablePerTC
 
 	# class constants
 	MaxNumberOfTrips = 1 
@@ -1019,6 +1209,7 @@ class AssignCond:
 		cls.MaxSolutionValue = None 	
 		IfTestRouteSearch = False 
 		cls.MaxTotalLMReached = 0 		
+		cls.StateTablePerTC = None
 
 		return (StatusReport, TerminationReasons)
 
@@ -1063,6 +1254,21 @@ class AssignCond:
 					if IfTest: print "--------- SingleFahrtIDMeasurementPerDay violated ---------"
 					return False
 
+		# MaxAllowedBlockDaysPerTC
+		if AssignConditions.has_key(cls.MaxAllowedBlockDaysPerTC):
+			cond = cls.MaxAllowedBlockDaysPerTC
+			parameters = AssignConditions[cond]
+			MaxBlockDaysPerTC = parameters[0]
+
+			StateTablePerTC = cls.StateTablePerTC
+			if StateTablePerTC == None:
+				StateTablePerTC = GetStateTablePerTC(TDRlist)
+
+			if not CheckMaxBlockDaysOfTDR(TDR, MaxBlockDaysPerTC, StateTablePerTC):
+				IncrementDicValue(cls.TerminationReasonsDic, 'MaxAllowedBlockDaysPerTC')
+				if IfTest: print "--------- MaxAllowedBlockDaysPerTC exceeded ---------"
+				return False
+
 		# MaxNumberOfMeasurementsPerLineKey
 		if AssignConditions.has_key(cls.MaxNumberOfMeasurementsPerLineKey):
 			cond = cls.MaxNumberOfMeasurementsPerLineKey
@@ -1093,7 +1299,7 @@ class AssignCond:
 			parameters = AssignConditions[cond]
 			MinTripCountPerTC = parameters[0]
 
-			if not CheckNumberOfTripsForEachTC(TDRlist, Params['MinTripCountPerTC']):
+			if not CheckNumberOfTripsForEachTC(TDRlist, Params['MinTripCountPerTC'], cls.StateTablePerTC):
 				IncrementDicValue(cls.TerminationReasonsDic, 'MinNumberOfTripsPerTC')
 				if IfTest: print "--------- MinNumberOfTripsPerTC not satisfied ---------"
 				return False
@@ -1123,7 +1329,7 @@ class AssignCond:
 			parameters = AssignConditions[cond]
 			MinTripCountPerTC = parameters[0]
 
-			if CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCountPerTC):
+			if CheckIfTDRContributes_TO_MinNumberOfTripsForEachTC(TDR, TDRlist, MinTripCountPerTC, cls.StateTablePerTC):
 				return True 
 
 		# MinNumberOfMeasurementsPerLineKey
@@ -1135,13 +1341,16 @@ class AssignCond:
 		# no contribution so far
 		return False
 
-def FindOptimalAssignmentSolution(AssignmentCond, Params):
+def FindOptimalAssignmentSolution(AssignmentCond, Params, RandomSeed=100, Verbose=True):
 	"""
 	Finds optimal assigment solution by adding the most valuable TDR (t,d,r) assignments 
 	to SolutionList one by one.
 
 	AssignmentCond: Dictionary of all assignment conditions 
 	Params: 	Dictionary of all parameters required for assignment planning
+	RandomSeed: Seed for the random TC order of each day (same seed --> same solution),
+		see FindOptimalAssignmentSolutionMultiStart
+	Verbose: 	If True, print assignment results of each day
 
 	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR)
 	"""
@@ -1180,20 +1389,23 @@ def FindOptimalAssignmentSolution(AssignmentCond, Params):
 	# incremental value of selected TDR
 	IncrementalValuePerTDR = {}
 
-	# pseudo-random --> deterministic solutions
-	random.seed(100)
+	# running trip count and block days per TC, updated with each selected TDR
+	AssignCond.StateTablePerTC = InitStateTablePerTC(TCList)
+
+	# pseudo-random --> deterministic solutions for a given seed
+	RandomGen = random.Random(RandomSeed)
 	IfTerminatedSuccessfully = False
 
 	for d in range(BeginDateOrd, EndDateOrd+1):
 		DayNr = d - BeginDateOrd + 1
-		print "\nDay-%s: %s, DayOrd: %s ---------" % (DayNr, ConvertDateOrdinalToDateString(d), d)
+		if Verbose: print "\nDay-%s: %s, DayOrd: %s ---------" % (DayNr, ConvertDateOrdinalToDateString(d), d)
 		# TDR tuples of day = d
 		TDRsOfDay = []
 		ContribCount = 0 
 
 		# shuffle TC list, in order not to assign most valuable tours always to same TCs
 		TCListOfDay = list(TCList)
-		shuffle(TCListOfDay)
+		RandomGen.shuffle(TCListOfDay)
 
 		for t in TCListOfDay:
 			# get available routes for (t,d)
@@ -1271,6 +1483,9 @@ def FindOptimalAssignmentSolution(AssignmentCond, Params):
 			
 			IncrementalValuePerTDR[SelectedTDR] = ValueOfSelectedTDR
 
+			# update TC states
+			UpdateStateTablePerTC(AssignCond.StateTablePerTC, SelectedTDR)
+
 			# update LM counter
 			LMCounterPerLineKey = IncrementLMCounter([SelectedTDR], LMCounterPerLineKey, LMCoveragePerDayRoute)
 
@@ -1281,23 +1496,532 @@ def FindOptimalAssignmentSolution(AssignmentCond, Params):
 				break
 
 		# test
-		print "Assignment results of day:"
-		print "Current Solution: %s" % str(AssignmentSolution) 
-		print "Current Solution Value: %s" % CurrentSolutionValue
-		print "Current LMCounterPerLineKey (#LineKeys: %s)" % len(LMCounterPerLineKey)
-		# PrintDictionaryContent(LMCounterPerLineKey)
-		print "Total Number of Line Measurements: %s" % sum(LMCounterPerLineKey.values())
-		print "ContribCount: %s" % ContribCount
+		if Verbose:
+			print "Assignment results of day:"
+			print "Current Solution: %s" % str(AssignmentSolution) 
+			print "Current Solution Value: %s" % CurrentSolutionValue
+			print "Current LMCounterPerLineKey (#LineKeys: %s)" % len(LMCounterPerLineKey)
+			# PrintDictionaryContent(LMCounterPerLineKey)
+			print "Total Number of Line Measurements: %s" % sum(LMCounterPerLineKey.values())
+			print "ContribCount: %s" % ContribCount
 
 		if IfTerminatedSuccessfully:
 			break
 		
-	if IfTerminatedSuccessfully:
-		print "Successfull termination! Assignment plan is complete."
-	else:
-		print "NOT terminated successfully! All termination/measurement requirements are not satisfied."
+	if Verbose:
+		if IfTerminatedSuccessfully:
+			print "Successfull termination! Assignment plan is complete."
+		else:
+			print "NOT terminated successfully! All termination/measurement requirements are not satisfied."
+
+	# TC states are only valid during the search
+	AssignCond.StateTablePerTC = None
 	
-	return (AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR)
+	return (AssignmentSolution, CurrentSolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR)
+
+#######################################################################################
+# MULTI-START ASSIGNMENT
+#######################################################################################
+
+# assignment conditions and parameters of multi-start worker processes (read-only),
+# set once per process by InitMultiStartWorker
+MultiStartAssignmentCond = None
+MultiStartParams = None
+
+def InitMultiStartWorker(AssignmentCond, Params):
+	"""
+	Initialize a worker process of multi-start assignment: share assignment 
+	conditions and parameters, instead of passing them with each start.
+	"""
+	global MultiStartAssignmentCond, MultiStartParams
+	MultiStartAssignmentCond = AssignmentCond
+	MultiStartParams = Params
+
+def RunAssignmentWithSeed(RandomSeed):
+	"""
+	Run a single randomized greedy assignment (FindOptimalAssignmentSolution) in a 
+	worker process with the given seed.
+
+	Returns: (RandomSeed, AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR, Duration)
+	"""
+	st = default_timer()
+	(AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR) = \
+		FindOptimalAssignmentSolution(MultiStartAssignmentCond, MultiStartParams, RandomSeed, Verbose=False)
+	return (RandomSeed, AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR, default_timer() - st)
+
+def GetSeedsOfMultiStart(MasterSeed, NumberOfStarts):
+	"""
+	Get reproducible list of distinct seeds for each start, derived from MasterSeed.
+
+	Returns: SeedList
+	"""
+	return random.Random(MasterSeed).sample(xrange(2**31), NumberOfStarts)
+
+def FindOptimalAssignmentSolutionMultiStart(AssignmentCond, Params, NumberOfStarts=8, MasterSeed=100, ProcessCount=None):
+	"""
+	Multi-start assignment: Run NumberOfStarts randomized greedy assignments 
+	(FindOptimalAssignmentSolution) with different seeds (random TC order per day) 
+	on a process pool, and select the solution with the highest value.
+
+	Results are reproducible for a given MasterSeed, independent of ProcessCount.
+
+	NumberOfStarts: Number of greedy runs, each with its own seed (see GetSeedsOfMultiStart)
+	MasterSeed: Seed for generating the seeds of all starts
+	ProcessCount: Number of worker processes; number of CPUs if None; 
+		1: run all starts sequentially in the current process
+
+	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR, MultiStartStatistics)
+		MultiStartStatistics: Dictionary with solution quality statistics across starts:
+		'SolutionValuePerSeed', 'BestSeed', 'MinValue', 'MaxValue', 'MeanValue', 'StdDevValue', 
+		'TotalDuration', 'MeanDurationPerStart'
+	"""
+	if NumberOfStarts < 1:
+		raise Exception("NumberOfStarts must be at least 1!")
+
+	SeedList = GetSeedsOfMultiStart(MasterSeed, NumberOfStarts)
+	st = default_timer()
+
+	if ProcessCount == 1:
+		InitMultiStartWorker(AssignmentCond, Params)
+		Results = map(RunAssignmentWithSeed, SeedList)
+	else:
+		if ProcessCount == None:
+			ProcessCount = multiprocessing.cpu_count()
+		pool = multiprocessing.Pool(min(ProcessCount, NumberOfStarts), InitMultiStartWorker, (AssignmentCond, Params))
+		try:
+			# results in the order of SeedList
+			Results = pool.map(RunAssignmentWithSeed, SeedList)
+		finally:
+			pool.close()
+			pool.join()
+
+	TotalDuration = default_timer() - st
+
+	# best solution; first start wins for equal values
+	BestResult = Results[0]
+	for Result in Results[1:]:
+		if Result[2] > BestResult[2]:
+			BestResult = Result
+
+	(BestSeed, AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR, Duration) = BestResult
+
+	# statistics
+	Values = [Result[2] for Result in Results]
+	MeanValue = sum(Values) / float(len(Values))
+	StdDevValue = math.sqrt(sum((v - MeanValue)**2 for v in Values) / float(len(Values)))
+
+	MultiStartStatistics = {
+		'SolutionValuePerSeed': 	[(Result[0], Result[2]) for Result in Results],
+		'BestSeed': 				BestSeed,
+		'MinValue': 				min(Values),
+		'MaxValue': 				max(Values),
+		'MeanValue': 				MeanValue,
+		'StdDevValue': 				StdDevValue,
+		'TotalDuration': 			TotalDuration,
+		'MeanDurationPerStart': 	sum(Result[5] for Result in Results) / float(len(Results)),
+	}
+
+	print "Multi-start assignment: %s starts in %.2f seconds, best value: %s (seed %s), mean: %.2f, std: %.2f, min: %s" \
+		% (NumberOfStarts, TotalDuration, SolutionValue, BestSeed, MeanValue, StdDevValue, min(Values))
+
+	return (AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR, MultiStartStatistics)
+
+#######################################################################################
+# PER-DAY JOINT ASSIGNMENT (BRANCH-AND-BOUND)
+#######################################################################################
+
+def GetMarginalValueOfDayRoute(d, r, LMCounter, Params, DurationCostOfRoute):
+	"""
+	Get marginal (incremental) value of a trip with route r on day d, w.r.t. the
+	current line measurement counter LMCounter (see GetSolutionValue).
+
+	DurationCostOfRoute[r] = cost (cache, updated if r is missing)
+	"""
+	LMRequirements = Params['LMRequirements']
+	RevenueLineMeasure = Params['RevenueLineMeasure']
+	CostLineMeasure = Params['CostLineMeasure']
+
+	if not r in DurationCostOfRoute:
+		(StartTimeMin, EndTimeMin) = Params['TimeIntervalOfRoute'][r]
+		(TotalIntervalValue, SegmentsPerInterval) = GetTotalValueOfInterval(Params['TripCostPerTimeInterval'], (StartTimeMin, EndTimeMin))
+		DurationCostOfRoute[r] = TotalIntervalValue
+
+	MarginalValue = -DurationCostOfRoute[r]
+	LMCoverage = Params['LMCoveragePerDayRoute'][(d,r)]
+	for LineKey in LMCoverage:
+		x = LMCoverage[LineKey]
+		count = LMCounter.get(LineKey, 0)
+		LMReq = LMRequirements.get(LineKey, 0)
+		MarginalValue += (min(count + x, LMReq) - min(count, LMReq)) * RevenueLineMeasure - x * CostLineMeasure
+	return MarginalValue
+
+def FindOptimalTDRCombinationOfDay(d, CandidateTDRsPerTC, LMCounter, Params, TDRsOfDay=None, IfSingleFahrtID=True,
+	UpperLimitLMperLineKey=None, PriorityTCs=None, MaxNodeCount=None):
+	"""
+	Find the best joint set of TDR tuples (t,d,r) of a day, at most one per test customer,
+	with branch-and-bound instead of enumerating all combinations (see 
+	GetAllTDVtupleCombinationsOfDayForUncoveredRequirements, k^TCs combinations).
+
+	Constraints: A FahrtID can be measured only once per day (if IfSingleFahrtID), 
+	line measurements per LineKey can not exceed UpperLimitLMperLineKey.
+
+	Search: Test customers are branched one after the other (route or no trip).
+	- Upper bound: sum of the best marginal values of remaining TCs w.r.t. LMCounter; valid
+		as the value of additional line measurements can only decrease (min with requirements).
+		Revenue of the residual requirements and the sum of the best marginal values w.r.t. 
+		the current LM counter (not blocked candidates only) are tighter bounds.
+	- Conflict graph: candidates of different TCs with common FahrtIDs; a selected candidate 
+		blocks its neighbors.
+	- Memo: upper bound of the best completion value per residual state (TC level, 
+		LM counts of LineKeys and blocked candidates relevant for the remaining TCs).
+
+	CandidateTDRsPerTC[t] = [(t,d,r1), (t,d,r2), ...]: TDR tuples of day, valid w.r.t. other 
+		assignment conditions (see AssignCond.CheckIfTDRtupleShouldBeSelected)
+	LMCounter: Line measurements per LineKey so far (without day d)
+	TDRsOfDay: Already fixed TDR tuples of day d (FahrtIDs of them can not be measured again)
+	PriorityTCs: Trips of these TCs are preferred to all other trips (like TCs below 
+		MinTripCountPerTC), i.e. the number of their trips is maximized first.
+	MaxNodeCount: Limit for the number of search nodes (None: no limit); the best combination 
+		found so far is returned if the limit is exceeded.
+
+	Returns: (BestTDRs, BestValue, IfOptimal, SearchStatistics)
+		BestValue: Total marginal value of BestTDRs
+		SearchStatistics: Dictionary with 'NodeCount', 'PrunedNodes', 'MemoPrunedNodes', 'CandidateCount', 'ConflictCount'
+	"""
+	if TDRsOfDay == None: TDRsOfDay = []
+	if PriorityTCs == None: PriorityTCs = []
+	if UpperLimitLMperLineKey == None: UpperLimitLMperLineKey = {}
+
+	TravelIDListOfRoute = Params['TravelIDListOfRoute']
+	LMCoveragePerDayRoute = Params['LMCoveragePerDayRoute']
+	DurationCostOfRoute = {}
+
+	# FahrtIDs of fixed TDR tuples
+	FixedFahrtIDs = set()
+	for (t,dx,r) in TDRsOfDay:
+		if r == None: continue
+		FixedFahrtIDs.update([fid for fid in TravelIDListOfRoute[r] if fid != None])
+
+	# candidates: (t, r, FahrtIDs, LMCoverage, RootValue)
+	CandidatesPerTC = {}
+	for t in CandidateTDRsPerTC:
+		for (tx,dx,r) in CandidateTDRsPerTC[t]:
+			if r == None: continue
+			if dx != d:
+				raise Exception("Day value must be same in all TDR tuples!")
+
+			FahrtIDList = [fid for fid in TravelIDListOfRoute[r] if fid != None]
+			FahrtIDs = set(FahrtIDList)
+			if IfSingleFahrtID and (len(FahrtIDs) < len(FahrtIDList) or FahrtIDs.intersection(FixedFahrtIDs)):
+				continue
+
+			LMCoverage = LMCoveragePerDayRoute[(d,r)]
+			IfExceeded = False
+			for LineKey in LMCoverage:
+				if LineKey in UpperLimitLMperLineKey and LMCounter.get(LineKey, 0) + LMCoverage[LineKey] > UpperLimitLMperLineKey[LineKey]:
+					IfExceeded = True
+			if IfExceeded: continue
+
+			RootValue = GetMarginalValueOfDayRoute(d, r, LMCounter, Params, DurationCostOfRoute)
+			if not t in CandidatesPerTC: CandidatesPerTC[t] = []
+			CandidatesPerTC[t].append((t, r, FahrtIDs, LMCoverage, RootValue))
+
+	# priority bonus: larger than any difference between total values of the day
+	# (marginal value of a trip is between -(duration cost + LM cost) and RootValue)
+	PriorityBonus = 0
+	if PriorityTCs:
+		PriorityBonus = 1.0
+		for t in CandidatesPerTC:
+			PriorityBonus += max(abs(cand[4]) + DurationCostOfRoute[cand[1]] + Params['CostLineMeasure'] * sum(cand[3].values()) \
+				for cand in CandidatesPerTC[t])
+	PriorityTCSet = set(PriorityTCs)
+
+	# TC levels: most valuable TCs first; candidates of a TC in descending value order
+	def BestRootValueOfTC(t):
+		return max(cand[4] for cand in CandidatesPerTC[t]) + PriorityBonus * (t in PriorityTCSet)
+
+	LevelTCs = sorted(CandidatesPerTC.keys(), key=BestRootValueOfTC, reverse=True)
+	Candidates = []
+	CandidatesPerLevel = []
+	for t in LevelTCs:
+		CandidatesOfTC = sorted(CandidatesPerTC[t], key=lambda cand: cand[4], reverse=True)
+		CandidatesPerLevel.append(range(len(Candidates), len(Candidates) + len(CandidatesOfTC)))
+		Candidates.extend(CandidatesOfTC)
+	LevelCount = len(LevelTCs)
+
+	# conflict graph: candidates of different TCs with common FahrtIDs
+	Conflicts = [[] for i in range(0, len(Candidates))]
+	ConflictCount = 0
+	if IfSingleFahrtID:
+		CandidatesPerFahrtID = {}
+		for i in range(0, len(Candidates)):
+			for fid in Candidates[i][2]:
+				if not fid in CandidatesPerFahrtID: CandidatesPerFahrtID[fid] = []
+				CandidatesPerFahrtID[fid].append(i)
+		for fid in CandidatesPerFahrtID:
+			for i in CandidatesPerFahrtID[fid]:
+				for j in CandidatesPerFahrtID[fid]:
+					if Candidates[i][0] != Candidates[j][0] and not j in Conflicts[i]:
+						Conflicts[i].append(j)
+						ConflictCount += 1
+
+	# upper bounds of remaining levels, relevant keys and candidates of residual state
+	SuffixBound = [0] * (LevelCount + 1)
+	PriorityLevelCount = [0] * (LevelCount + 1)
+	RelevantKeys = [()] * (LevelCount + 1)
+	RemainingCandidates = [()] * (LevelCount + 1)
+	Keys = set()
+	for i in range(LevelCount-1, -1, -1):
+		t = LevelTCs[i]
+		SuffixBound[i] = SuffixBound[i+1] + max(0, BestRootValueOfTC(t))
+		PriorityLevelCount[i] = PriorityLevelCount[i+1] + (t in PriorityTCSet)
+		for j in CandidatesPerLevel[i]:
+			Keys.update(Candidates[j][3].keys())
+		RelevantKeys[i] = tuple(sorted(Keys))
+		RemainingCandidates[i] = tuple(CandidatesPerLevel[i]) + RemainingCandidates[i+1]
+
+	Ctx = {
+		'd': 					d,
+		'Params': 				Params,
+		'Candidates': 			Candidates,
+		'CandidatesPerLevel': 	CandidatesPerLevel,
+		'Conflicts': 			Conflicts,
+		'BlockCount': 			[0] * len(Candidates),
+		'SuffixBound': 			SuffixBound,
+		'PriorityLevelCount': 	PriorityLevelCount,
+		'RelevantKeys': 		RelevantKeys,
+		'RemainingCandidates': 	RemainingCandidates,
+		'UpperLimitLMperLineKey': UpperLimitLMperLineKey,
+		'PriorityTCSet': 		PriorityTCSet,
+		'PriorityBonus': 		PriorityBonus,
+		'DurationCostOfRoute': 	DurationCostOfRoute,
+		'LMCounter': 			dict(LMCounter),
+		'Chosen': 				[],
+		'BestValue': 			None,
+		'BestChosen': 			[],
+		'Memo': 				{},
+		'MaxNodeCount': 		MaxNodeCount,
+		'IfComplete': 			True,
+		'NodeCount': 			0,
+		'PrunedNodes': 			0,
+		'MemoPrunedNodes': 		0,
+	}
+	SearchTDRCombinationsOfDay(0, 0, Ctx)
+
+	BestTDRs = [(Candidates[j][0], d, Candidates[j][1]) for j in Ctx['BestChosen']]
+	BestTDRs.sort()
+
+	# value without priority bonus
+	BestValue = Ctx['BestValue'] - PriorityBonus * len([tdr for tdr in BestTDRs if tdr[0] in PriorityTCSet])
+
+	SearchStatistics = {
+		'NodeCount': 		Ctx['NodeCount'],
+		'PrunedNodes': 		Ctx['PrunedNodes'],
+		'MemoPrunedNodes': 	Ctx['MemoPrunedNodes'],
+		'CandidateCount': 	len(Candidates),
+		'ConflictCount': 	ConflictCount / 2,
+	}
+	return (BestTDRs, BestValue, Ctx['IfComplete'], SearchStatistics)
+
+def SearchTDRCombinationsOfDay(i, Value, Ctx):
+	"""
+	Recursive depth-first branch-and-bound search of FindOptimalTDRCombinationOfDay
+	for TC level i; Value is the total marginal value of the candidates chosen so far.
+	Search context Ctx is updated in place (best combination, counters, memo).
+	"""
+	Ctx['NodeCount'] += 1
+	if Ctx['MaxNodeCount'] != None and Ctx['NodeCount'] > Ctx['MaxNodeCount']:
+		Ctx['IfComplete'] = False
+		return
+
+	if i == len(Ctx['CandidatesPerLevel']):
+		if Ctx['BestValue'] == None or Value > Ctx['BestValue']:
+			Ctx['BestValue'] = Value
+			Ctx['BestChosen'] = list(Ctx['Chosen'])
+		return
+
+	LMCounter = Ctx['LMCounter']
+	BlockCount = Ctx['BlockCount']
+
+	# residual state of remaining levels
+	StateKey = (i, tuple([LMCounter.get(LineKey, 0) for LineKey in Ctx['RelevantKeys'][i]]),
+		tuple([j for j in Ctx['RemainingCandidates'][i] if BlockCount[j]]))
+
+	# bounding
+	if Ctx['BestValue'] != None and StateKey in Ctx['Memo'] and Value + Ctx['Memo'][StateKey] <= Ctx['BestValue'] + 1e-9:
+		Ctx['MemoPrunedNodes'] += 1
+		return
+
+	UpperBound = Ctx['SuffixBound'][i]
+	if Ctx['BestValue'] != None and Value + UpperBound > Ctx['BestValue'] + 1e-9:
+		# revenue of residual LM requirements
+		LMRequirements = Ctx['Params']['LMRequirements']
+		ResidualRequirements = 0
+		for LineKey in Ctx['RelevantKeys'][i]:
+			ResidualRequirements += max(0, LMRequirements.get(LineKey, 0) - LMCounter.get(LineKey, 0))
+		UpperBound = min(UpperBound, ResidualRequirements * Ctx['Params']['RevenueLineMeasure'] \
+			+ Ctx['PriorityLevelCount'][i] * Ctx['PriorityBonus'])
+
+	if Ctx['BestValue'] != None and Value + UpperBound > Ctx['BestValue'] + 1e-9:
+		# best marginal values of remaining (not blocked) candidates w.r.t. current LM counter
+		DynamicBound = 0
+		for k in range(i, len(Ctx['CandidatesPerLevel'])):
+			BestMarginalValue = 0
+			for j in Ctx['CandidatesPerLevel'][k]:
+				if BlockCount[j]: continue
+				(t, r, FahrtIDs, LMCoverage, RootValue) = Ctx['Candidates'][j]
+				MarginalValue = GetMarginalValueOfDayRoute(Ctx['d'], r, LMCounter, Ctx['Params'], Ctx['DurationCostOfRoute'])
+				if t in Ctx['PriorityTCSet']:
+					MarginalValue += Ctx['PriorityBonus']
+				BestMarginalValue = max(BestMarginalValue, MarginalValue)
+			DynamicBound += BestMarginalValue
+		UpperBound = min(UpperBound, DynamicBound)
+
+	if Ctx['BestValue'] != None:
+		if Value + UpperBound <= Ctx['BestValue'] + 1e-9:
+			Ctx['PrunedNodes'] += 1
+			return
+
+	Candidates = Ctx['Candidates']
+	UpperLimitLMperLineKey = Ctx['UpperLimitLMperLineKey']
+
+	for j in Ctx['CandidatesPerLevel'][i]:
+		if BlockCount[j]: continue
+		(t, r, FahrtIDs, LMCoverage, RootValue) = Candidates[j]
+
+		# residual capacity of LineKeys
+		IfExceeded = False
+		for LineKey in LMCoverage:
+			if LineKey in UpperLimitLMperLineKey and LMCounter.get(LineKey, 0) + LMCoverage[LineKey] > UpperLimitLMperLineKey[LineKey]:
+				IfExceeded = True
+				break
+		if IfExceeded: continue
+
+		MarginalValue = GetMarginalValueOfDayRoute(Ctx['d'], r, LMCounter, Ctx['Params'], Ctx['DurationCostOfRoute'])
+		if t in Ctx['PriorityTCSet']:
+			MarginalValue += Ctx['PriorityBonus']
+
+		# select candidate
+		for LineKey in LMCoverage:
+			LMCounter[LineKey] = LMCounter.get(LineKey, 0) + LMCoverage[LineKey]
+		for n in Ctx['Conflicts'][j]:
+			BlockCount[n] += 1
+		Ctx['Chosen'].append(j)
+
+		SearchTDRCombinationsOfDay(i+1, Value + MarginalValue, Ctx)
+
+		# undo selection
+		Ctx['Chosen'].pop()
+		for n in Ctx['Conflicts'][j]:
+			BlockCount[n] -= 1
+		for LineKey in LMCoverage:
+			LMCounter[LineKey] -= LMCoverage[LineKey]
+
+	# no trip for TC of level i
+	SearchTDRCombinationsOfDay(i+1, Value, Ctx)
+
+	# best completion from this state can not exceed BestValue - Value (all prunings used valid bounds)
+	if Ctx['IfComplete']:
+		Bound = Ctx['BestValue'] - Value
+		if not StateKey in Ctx['Memo'] or Bound < Ctx['Memo'][StateKey]:
+			Ctx['Memo'][StateKey] = Bound
+
+def FindOptimalAssignmentSolutionPerDay(AssignmentCond, Params, MaxNodeCountPerDay=None, Verbose=True):
+	"""
+	Assignment planning day by day: the best joint set of TDR tuples (t,d,r) of each day is 
+	found with branch-and-bound (see FindOptimalTDRCombinationOfDay), instead of assigning
+	test customers one by one (FindOptimalAssignmentSolution).
+
+	Like the greedy, trips of TCs that have not yet reached MinTripCountPerTC are preferred
+	to other trips.
+
+	MaxNodeCountPerDay: Limit for the search nodes of a day (None: optimal daily assignments)
+
+	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR)
+	"""
+	AvailableRoutesPerTCAndDay = 	Params['AvailableRoutesPerTCAndDay']
+	LMCoveragePerDayRoute = 		Params['LMCoveragePerDayRoute']
+	TimeIntervalOfRoute = 			Params['TimeIntervalOfRoute']
+	StartStationPerTestCustomer = 	Params['StartStationPerTestCustomer'] 
+	LMRequirements = 				Params['LMRequirements']
+	RevenueLineMeasure = 			Params['RevenueLineMeasure']
+	CostLineMeasure = 				Params['CostLineMeasure']
+	TripCostPerTimeInterval = 		Params['TripCostPerTimeInterval']
+
+	(BeginDateOrd, EndDateOrd) = AssignmentCond[AssignCond.FirstAndLastDaysOfMeasurementPeriod]
+	TCList = StartStationPerTestCustomer.keys()
+
+	IfSingleFahrtID = False
+	if AssignmentCond.has_key(AssignCond.SingleFahrtIDMeasurementPerDay):
+		IfSingleFahrtID = AssignmentCond[AssignCond.SingleFahrtIDMeasurementPerDay][0]
+
+	UpperLimitLMperLineKey = None
+	if AssignmentCond.has_key(AssignCond.MaxNumberOfMeasurementsPerLineKey):
+		UpperLimitLMperLineKey = Params['UpperLimitLMperLineKey']
+
+	MinTripCountPerTC = {}
+	if AssignmentCond.has_key(AssignCond.MinNumberOfTripsPerTC):
+		MinTripCountPerTC = Params['MinTripCountPerTC']
+
+	AssignmentSolution = []
+	CurrentSolutionValue = 0
+	LMCounterPerLineKey = {}
+	IncrementalValuePerTDR = {}
+	AssignCond.StateTablePerTC = InitStateTablePerTC(TCList)
+	IfTerminatedSuccessfully = False
+
+	for d in range(BeginDateOrd, EndDateOrd+1):
+		# valid candidates of day w.r.t. single TDR conditions
+		CandidateTDRsPerTC = {}
+		IfLastDayReached = False
+		for t in TCList:
+			CandidateTDRsPerTC[t] = []
+			for r in AvailableRoutesPerTCAndDay[(t,d)]:
+				IfValidTDR = AssignCond.CheckIfTDRtupleShouldBeSelected(d, (t,d,r), [], AssignmentSolution, AssignmentCond,
+					Params, LMCounterPerLineKey)
+				if IfValidTDR == None:
+					IfLastDayReached = True
+					break
+				if IfValidTDR:
+					CandidateTDRsPerTC[t].append((t,d,r))
+			if IfLastDayReached: break
+		if IfLastDayReached: break
+
+		PriorityTCs = [t for t in TCList if t in MinTripCountPerTC \
+			and GetTripCountOfTC(AssignCond.StateTablePerTC, t) < MinTripCountPerTC[t]]
+
+		(TDRsOfDay, ValueOfDay, IfOptimal, SearchStatistics) = FindOptimalTDRCombinationOfDay(d, CandidateTDRsPerTC, 
+			LMCounterPerLineKey, Params, [], IfSingleFahrtID, UpperLimitLMperLineKey, PriorityTCs, MaxNodeCountPerDay)
+
+		if Verbose:
+			print "Day %s: %s trips, value of day: %s, optimal: %s, search nodes: %s, pruned: %s" \
+				% (ConvertDateOrdinalToDateString(d), len(TDRsOfDay), ValueOfDay, IfOptimal, 
+				SearchStatistics['NodeCount'], SearchStatistics['PrunedNodes'] + SearchStatistics['MemoPrunedNodes'])
+
+		# commit TDR tuples of day
+		for TDR in TDRsOfDay:
+			SolutionValue = GetSolutionValue([TDR], AssignmentSolution, LMCounterPerLineKey, LMRequirements, LMCoveragePerDayRoute,
+				TimeIntervalOfRoute, RevenueLineMeasure, CostLineMeasure, TripCostPerTimeInterval)
+			IncrementalValuePerTDR[TDR] = SolutionValue - CurrentSolutionValue
+			CurrentSolutionValue = SolutionValue
+
+			AssignmentSolution.append(TDR)
+			UpdateStateTablePerTC(AssignCond.StateTablePerTC, TDR)
+			LMCounterPerLineKey = IncrementLMCounter([TDR], LMCounterPerLineKey, LMCoveragePerDayRoute)
+
+		if AssignCond.CheckIfTDRlistShouldBeSelected(AssignmentSolution, AssignmentCond, Params, LMCounterPerLineKey):
+			IfTerminatedSuccessfully = True
+			break
+
+	if Verbose:
+		if IfTerminatedSuccessfully:
+			print "Successfull termination! Assignment plan is complete."
+		else:
+			print "NOT terminated successfully! All termination/measurement requirements are not satisfied."
+
+	AssignCond.StateTablePerTC = None
+
+	return (AssignmentSolution, CurrentSolutionValue, LMCounterPerLineKey, IncrementalValuePerTDR)
 
 #######################################################################################
 # SOLUTION (TDVlist) EVALUATION FUNCTIONS
@@ -1309,37 +2033,16 @@ def GetMaxBlockDaysPerTC(TDVlist):
 
 	Returns: MaxBlockDaysPerTC[t] = MaxBlockDays 
 	"""
-	# get all assigned TCs per day
-	TCsPerDay = {}
-	TCList = []
-	for tdv in TDVlist:
-		(t,d,v) = tdv 
-		if v == None: continue 
-		if not d in TCsPerDay: TCsPerDay[d] = []
-		if not t in TCsPerDay[d]:
-			TCsPerDay[d].append(t)
-		if not t in TCList:
-			TCList.append(t)
-
-	# get sorted day numbers 
-	DayList = TCsPerDay.keys()
-	DayList.sort()
-
-	# count MaxBlock size for each TC 
 	MaxBlock = {}
-	CurrentBlock = {}
-	for t in TCList:
-		MaxBlock[t] = 0 
-		CurrentBlock[t] = 0
+	StateTablePerTC = {}
 
-	for d in DayList:
-		for t in TCList:
-			if t in TCsPerDay[d]:
-				CurrentBlock[t] += 1 
-			else:
-				if CurrentBlock[t] > MaxBlock[t]:
-					MaxBlock[t] = CurrentBlock[t] 
-				CurrentBlock[t] = 0
+	for tdv in sorted(TDVlist, key=lambda tdr: tdr[1]):
+		(t,d,v) = tdv 
+		if v == None: continue 
+		UpdateStateTablePerTC(StateTablePerTC, tdv)
+		BlockDays = StateTablePerTC[t][TCStateInd['BlockDays']]
+		if not t in MaxBlock or BlockDays > MaxBlock[t]:
+			MaxBlock[t] = BlockDays
 
 	return MaxBlock
 
@@ -0,0 +1,668 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local search improvement of assignment solutions (list of TDR tuples (t,d,r)),
+like the solution of the greedy FindOptimalAssignmentSolution, which can not
+revise early (myopic) choices.
+
+Move types:
+- Swap: 	exchange the routes of two TCs on a day (or hand a trip over to a free TC)
+- Relocate:	move a trip of a TC to another day
+- Replace:	replace the route of a trip by the route with the highest marginal value
+- Drop: 	remove a trip without positive value
+- Insert: 	add a trip for a free (t,d) pair
+
+Search methods: Simulated annealing ('SA') or tabu search ('Tabu'), within a time budget.
+
+Moves are evaluated incrementally (delta evaluation): only the LineKeys covered by the
+changed TDR tuples and their duration costs are considered. Every move is checked
+against the assignment conditions (see AssignCond) before it is applied.
+
+The same state and move evaluation is used for the incremental re-planning of a
+solution after changes of test customer availability.
+"""
+import math
+import random
+from timeit import default_timer
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+from BU2020_AssignmentFunctions import *
+
+#######################################################################################
+# LOCAL SEARCH STATE
+#######################################################################################
+
+def InitLocalSearchState(AssignmentSolution, AssignmentCond, Params):
+	"""
+	Build the local search state of an assignment solution; indices for delta
+	evaluation and feasibility checks of moves.
+
+	Returns: State dictionary with keys:
+		'RouteOfTCAndDay'[(t,d)] = r
+		'TripDaysPerTC'[t] = set of days with trips
+		'FahrtIDCountPerDay'[d][FahrtID] = n
+		'LMCounter'[LineKey] = n
+		'TripCount': Total number of trips
+		'Value': Solution value (see GetSolutionValue)
+		'DurationCostOfRoute'[r] = cost (cache)
+		'TCList', 'DayList': Test customers and days of measurement period
+	"""
+	(FirstDay, LastDay) = AssignmentCond[AssignCond.FirstAndLastDaysOfMeasurementPeriod]
+
+	State = {
+		'RouteOfTCAndDay': 		{},
+		'TripDaysPerTC': 		{},
+		'FahrtIDCountPerDay': 	{},
+		'LMCounter': 			{},
+		'TripCount': 			0,
+		'Value': 				0,
+		'DurationCostOfRoute': 	{},
+		'TCList': 				list(Params['StartStationPerTestCustomer'].keys()),
+		'DayList': 				range(FirstDay, LastDay), 	# last day is excluded, see CheckIfTDRtupleShouldBeSelected
+	}
+	for t in State['TCList']:
+		State['TripDaysPerTC'][t] = set()
+
+	for TDR in AssignmentSolution:
+		(t,d,r) = TDR
+		if r == None: continue
+		AddTDRToState(State, TDR, Params)
+
+	State['Value'] = GetSolutionValue([], [TDR for TDR in AssignmentSolution if TDR[2] != None], State['LMCounter'],
+		Params['LMRequirements'], Params['LMCoveragePerDayRoute'], Params['TimeIntervalOfRoute'],
+		Params['RevenueLineMeasure'], Params['CostLineMeasure'], Params['TripCostPerTimeInterval'])
+	return State
+
+def AddTDRToState(State, TDR, Params):
+	"""
+	Add TDR tuple (t,d,r) to the indices of the local search state (value is not updated).
+	"""
+	(t,d,r) = TDR
+	State['RouteOfTCAndDay'][(t,d)] = r
+	if not t in State['TripDaysPerTC']: State['TripDaysPerTC'][t] = set()
+	State['TripDaysPerTC'][t].add(d)
+	State['TripCount'] += 1
+
+	if not d in State['FahrtIDCountPerDay']: State['FahrtIDCountPerDay'][d] = {}
+	FahrtIDCount = State['FahrtIDCountPerDay'][d]
+	for fid in Params['TravelIDListOfRoute'][r]:
+		if fid == None: continue
+		FahrtIDCount[fid] = FahrtIDCount.get(fid, 0) + 1
+
+	LMCounter = State['LMCounter']
+	LMCoverage = Params['LMCoveragePerDayRoute'][(d,r)]
+	for LineKey in LMCoverage:
+		LMCounter[LineKey] = LMCounter.get(LineKey, 0) + LMCoverage[LineKey]
+
+def RemoveTDRFromState(State, TDR, Params):
+	"""
+	Remove TDR tuple (t,d,r) from the indices of the local search state (value is not updated).
+	"""
+	(t,d,r) = TDR
+	del State['RouteOfTCAndDay'][(t,d)]
+	State['TripDaysPerTC'][t].discard(d)
+	State['TripCount'] -= 1
+
+	FahrtIDCount = State['FahrtIDCountPerDay'][d]
+	for fid in Params['TravelIDListOfRoute'][r]:
+		if fid == None: continue
+		FahrtIDCount[fid] -= 1
+		if FahrtIDCount[fid] == 0: del FahrtIDCount[fid]
+
+	LMCounter = State['LMCounter']
+	LMCoverage = Params['LMCoveragePerDayRoute'][(d,r)]
+	for LineKey in LMCoverage:
+		LMCounter[LineKey] -= LMCoverage[LineKey]
+		if LMCounter[LineKey] == 0: del LMCounter[LineKey]
+
+def GetAssignmentSolutionOfState(State):
+	"""
+	Returns: AssignmentSolution, list of TDR tuples (t,d,r) sorted by day and TC
+	"""
+	TDRlist = [(t,d,r) for ((t,d),r) in State['RouteOfTCAndDay'].items()]
+	TDRlist.sort(key=lambda tdr: (tdr[1], tdr[0]))
+	return TDRlist
+
+#######################################################################################
+# DELTA EVALUATION & FEASIBILITY OF MOVES
+#######################################################################################
+
+# A move is a tuple (MoveType, RemovedTDRs, AddedTDRs); removals are applied before additions.
+
+def GetDurationCostOfTDRRoute(State, r, Params):
+	"""
+	Get (cached) duration cost of route r, see GetSolutionValue.
+	"""
+	DurationCostOfRoute = State['DurationCostOfRoute']
+	if not r in DurationCostOfRoute:
+		(StartTimeMin, EndTimeMin) = Params['TimeIntervalOfRoute'][r]
+		(TotalIntervalValue, SegmentsPerInterval) = GetTotalValueOfInterval(Params['TripCostPerTimeInterval'], (StartTimeMin, EndTimeMin))
+		DurationCostOfRoute[r] = TotalIntervalValue
+	return DurationCostOfRoute[r]
+
+def GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params):
+	"""
+	Returns: LMCounterChange[LineKey] = x, change of line measurement counts by the move
+	"""
+	LMCoveragePerDayRoute = Params['LMCoveragePerDayRoute']
+	LMCounterChange = {}
+	for (t,d,r) in RemovedTDRs:
+		LMCoverage = LMCoveragePerDayRoute[(d,r)]
+		for LineKey in LMCoverage:
+			LMCounterChange[LineKey] = LMCounterChange.get(LineKey, 0) - LMCoverage[LineKey]
+	for (t,d,r) in AddedTDRs:
+		LMCoverage = LMCoveragePerDayRoute[(d,r)]
+		for LineKey in LMCoverage:
+			LMCounterChange[LineKey] = LMCounterChange.get(LineKey, 0) + LMCoverage[LineKey]
+	return LMCounterChange
+
+def GetDeltaValueOfMove(State, RemovedTDRs, AddedTDRs, Params, LMCounterChange=None):
+	"""
+	Incremental (delta) evaluation of a move: change of solution value (see GetSolutionValue),
+	considering only the LineKeys and routes of the changed TDR tuples.
+
+	Returns: DeltaValue
+	"""
+	if LMCounterChange == None:
+		LMCounterChange = GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params)
+
+	LMRequirements = Params['LMRequirements']
+	RevenueLineMeasure = Params['RevenueLineMeasure']
+	CostLineMeasure = Params['CostLineMeasure']
+	LMCounter = State['LMCounter']
+
+	DeltaValue = 0
+	for LineKey in LMCounterChange:
+		change = LMCounterChange[LineKey]
+		if change == 0: continue
+		LMReq = LMRequirements.get(LineKey, 0)
+		count = LMCounter.get(LineKey, 0)
+		DeltaValue += (min(count + change, LMReq) - min(count, LMReq)) * RevenueLineMeasure - change * CostLineMeasure
+
+	for (t,d,r) in RemovedTDRs:
+		DeltaValue += GetDurationCostOfTDRRoute(State, r, Params)
+	for (t,d,r) in AddedTDRs:
+		DeltaValue -= GetDurationCostOfTDRRoute(State, r, Params)
+
+	return DeltaValue
+
+def GetBlockLengthOfDay(TripDays, d):
+	"""
+	Returns: Number of subsequent trip days in TripDays (set of days) including day d
+	"""
+	BlockLength = 1
+	day = d - 1
+	while day in TripDays:
+		BlockLength += 1
+		day -= 1
+	day = d + 1
+	while day in TripDays:
+		BlockLength += 1
+		day += 1
+	return BlockLength
+
+def CheckIfMoveIsFeasible(State, RemovedTDRs, AddedTDRs, AssignmentCond, Params, LMCounterChange=None):
+	"""
+	Check if the solution after the move satisfies all assignment conditions of AssignmentCond
+	(see AssignCond.CheckIfTDRtupleShouldBeSelected and AssignCond.CheckIfTDRlistShouldBeSelected):
+	- a single trip per (t,d), with an available route, within measurement period
+	- SingleFahrtIDMeasurementPerDay
+	- MaxAllowedBlockDaysPerTC
+	- MaxNumberOfMeasurementsPerLineKey
+	- MaxNumberOfTrips
+	- MinNumberOfTripsPerTC: trip count of a TC may not fall below its minimum
+		(or decrease further, if the minimum is not yet reached)
+
+	Returns: True if feasible
+	"""
+	if LMCounterChange == None:
+		LMCounterChange = GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params)
+
+	(FirstDay, LastDay) = AssignmentCond[AssignCond.FirstAndLastDaysOfMeasurementPeriod]
+	AvailableRoutesPerTCAndDay = Params['AvailableRoutesPerTCAndDay']
+	TravelIDListOfRoute = Params['TravelIDListOfRoute']
+	RouteOfTCAndDay = State['RouteOfTCAndDay']
+
+	RemovedTDs = set((t,d) for (t,d,r) in RemovedTDRs)
+	AddedTDs = set()
+
+	# single trip per (t,d), available route
+	for (t,d,r) in AddedTDRs:
+		if d < FirstDay or d >= LastDay: return False
+		if (t,d) in AddedTDs: return False
+		if (t,d) in RouteOfTCAndDay and not (t,d) in RemovedTDs: return False
+		if not r in AvailableRoutesPerTCAndDay.get((t,d), []): return False
+		AddedTDs.add((t,d))
+
+	# SingleFahrtIDMeasurementPerDay
+	if AssignmentCond.has_key(AssignCond.SingleFahrtIDMeasurementPerDay) and AssignmentCond[AssignCond.SingleFahrtIDMeasurementPerDay][0]:
+		FahrtIDChangePerDay = {}
+		for (t,d,r) in RemovedTDRs:
+			for fid in TravelIDListOfRoute[r]:
+				if fid == None: continue
+				FahrtIDChangePerDay[(d,fid)] = FahrtIDChangePerDay.get((d,fid), 0) - 1
+		for (t,d,r) in AddedTDRs:
+			for fid in TravelIDListOfRoute[r]:
+				if fid == None: continue
+				FahrtIDChangePerDay[(d,fid)] = FahrtIDChangePerDay.get((d,fid), 0) + 1
+		for (d,fid) in FahrtIDChangePerDay:
+			if FahrtIDChangePerDay[(d,fid)] <= 0: continue
+			if State['FahrtIDCountPerDay'].get(d, {}).get(fid, 0) + FahrtIDChangePerDay[(d,fid)] > 1:
+				return False
+
+	# MaxNumberOfMeasurementsPerLineKey
+	if AssignmentCond.has_key(AssignCond.MaxNumberOfMeasurementsPerLineKey):
+		UpperLimitLMperLineKey = Params['UpperLimitLMperLineKey']
+		for LineKey in LMCounterChange:
+			if LMCounterChange[LineKey] <= 0 or not LineKey in UpperLimitLMperLineKey: continue
+			if State['LMCounter'].get(LineKey, 0) + LMCounterChange[LineKey] > UpperLimitLMperLineKey[LineKey]:
+				return False
+
+	# MaxNumberOfTrips
+	NewTripCount = State['TripCount'] - len(RemovedTDRs) + len(AddedTDRs)
+	if AssignmentCond.has_key(AssignCond.MaxNumberOfTrips) and len(AddedTDRs) > len(RemovedTDRs):
+		if NewTripCount > AssignmentCond[AssignCond.MaxNumberOfTrips][0]:
+			return False
+
+	# trip days of changed TCs
+	ChangedTCs = set([tdr[0] for tdr in RemovedTDRs] + [tdr[0] for tdr in AddedTDRs])
+	NewTripDaysPerTC = {}
+	for t in ChangedTCs:
+		TripDays = set(State['TripDaysPerTC'].get(t, set()))
+		for (tx,d,r) in RemovedTDRs:
+			if tx == t: TripDays.discard(d)
+		for (tx,d,r) in AddedTDRs:
+			if tx == t: TripDays.add(d)
+		NewTripDaysPerTC[t] = TripDays
+
+	# MaxAllowedBlockDaysPerTC
+	if AssignmentCond.has_key(AssignCond.MaxAllowedBlockDaysPerTC):
+		MaxBlockDaysPerTC = AssignmentCond[AssignCond.MaxAllowedBlockDaysPerTC][0]
+		for (t,d,r) in AddedTDRs:
+			if not t in MaxBlockDaysPerTC: continue
+			if GetBlockLengthOfDay(NewTripDaysPerTC[t], d) > MaxBlockDaysPerTC[t]:
+				return False
+
+	# MinNumberOfTripsPerTC
+	if AssignmentCond.has_key(AssignCond.MinNumberOfTripsPerTC):
+		MinTripCountPerTC = Params['MinTripCountPerTC']
+		for t in ChangedTCs:
+			if not t in MinTripCountPerTC: continue
+			OldCount = len(State['TripDaysPerTC'].get(t, set()))
+			NewCount = len(NewTripDaysPerTC[t])
+			if NewCount < OldCount and NewCount < MinTripCountPerTC[t]:
+				return False
+
+	return True
+
+def ApplyMove(State, RemovedTDRs, AddedTDRs, DeltaValue, Params):
+	"""
+	Apply move to the local search state.
+	"""
+	for TDR in RemovedTDRs:
+		RemoveTDRFromState(State, TDR, Params)
+	for TDR in AddedTDRs:
+		AddTDRToState(State, TDR, Params)
+	State['Value'] += DeltaValue
+
+#######################################################################################
+# MOVE GENERATION
+#######################################################################################
+
+def GetRandomSwapMove(State, RandomGen, Params):
+	"""
+	Swap: exchange the routes of two TCs on a day; if the second TC has no trip on that
+	day, the trip is handed over to it.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	if not State['RouteOfTCAndDay']: return None
+	(t1,d) = RandomGen.choice(State['RouteOfTCAndDay'].keys())
+	t2 = RandomGen.choice(State['TCList'])
+	if t2 == t1: return None
+
+	r1 = State['RouteOfTCAndDay'][(t1,d)]
+	if (t2,d) in State['RouteOfTCAndDay']:
+		r2 = State['RouteOfTCAndDay'][(t2,d)]
+		return ('Swap', [(t1,d,r1), (t2,d,r2)], [(t1,d,r2), (t2,d,r1)])
+	return ('Swap', [(t1,d,r1)], [(t2,d,r1)])
+
+def GetRandomRelocateMove(State, RandomGen, Params):
+	"""
+	Relocate: move a trip of a TC to another free day of the same TC; the same route
+	if available on the new day, a random available route otherwise.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	if not State['RouteOfTCAndDay']: return None
+	(t,d1) = RandomGen.choice(State['RouteOfTCAndDay'].keys())
+	d2 = RandomGen.choice(State['DayList'])
+	if (t,d2) in State['RouteOfTCAndDay']: return None
+
+	AvailableRoutes = Params['AvailableRoutesPerTCAndDay'].get((t,d2), [])
+	if not AvailableRoutes: return None
+
+	r1 = State['RouteOfTCAndDay'][(t,d1)]
+	r2 = r1
+	if not r1 in AvailableRoutes:
+		r2 = RandomGen.choice(AvailableRoutes)
+	return ('Relocate', [(t,d1,r1)], [(t,d2,r2)])
+
+def GetBestReplaceMove(State, RandomGen, AssignmentCond, Params):
+	"""
+	Replace: replace the route of a random trip (t,d,r) by the feasible available
+	route of (t,d) with the highest marginal value.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	if not State['RouteOfTCAndDay']: return None
+	(t,d) = RandomGen.choice(State['RouteOfTCAndDay'].keys())
+	r = State['RouteOfTCAndDay'][(t,d)]
+
+	BestMove = None
+	BestDelta = None
+	for rx in Params['AvailableRoutesPerTCAndDay'].get((t,d), []):
+		if rx == r: continue
+		RemovedTDRs = [(t,d,r)]
+		AddedTDRs = [(t,d,rx)]
+		LMCounterChange = GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params)
+		if not CheckIfMoveIsFeasible(State, RemovedTDRs, AddedTDRs, AssignmentCond, Params, LMCounterChange):
+			continue
+		DeltaValue = GetDeltaValueOfMove(State, RemovedTDRs, AddedTDRs, Params, LMCounterChange)
+		if BestDelta == None or DeltaValue > BestDelta:
+			BestMove = ('Replace', RemovedTDRs, AddedTDRs)
+			BestDelta = DeltaValue
+	return BestMove
+
+def GetRandomDropMove(State, RandomGen, Params):
+	"""
+	Drop: remove a random trip; only trips without positive value are dropped.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	if not State['RouteOfTCAndDay']: return None
+	(t,d) = RandomGen.choice(State['RouteOfTCAndDay'].keys())
+	RemovedTDRs = [(t,d,State['RouteOfTCAndDay'][(t,d)])]
+	if GetDeltaValueOfMove(State, RemovedTDRs, [], Params) < 0:
+		return None
+	return ('Drop', RemovedTDRs, [])
+
+def GetRandomInsertMove(State, RandomGen, Params):
+	"""
+	Insert: add a trip with a random available route for a random free (t,d) pair.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	t = RandomGen.choice(State['TCList'])
+	d = RandomGen.choice(State['DayList'])
+	if (t,d) in State['RouteOfTCAndDay']: return None
+
+	AvailableRoutes = Params['AvailableRoutesPerTCAndDay'].get((t,d), [])
+	if not AvailableRoutes: return None
+	return ('Insert', [], [(t,d,RandomGen.choice(AvailableRoutes))])
+
+# relative frequencies of move types
+DefaultMoveWeights = {
+	'Swap': 		2,
+	'Relocate': 	3,
+	'Replace': 		3,
+	'Drop': 		1,
+	'Insert': 		2,
+}
+
+def GetRandomMove(State, RandomGen, AssignmentCond, Params, MoveWeights):
+	"""
+	Get a random move, with move type selected w.r.t. MoveWeights.
+
+	Returns: (MoveType, RemovedTDRs, AddedTDRs) or None
+	"""
+	MoveTypes = sorted(MoveWeights.keys())
+	x = RandomGen.random() * sum(MoveWeights.values())
+	for MoveType in MoveTypes:
+		x -= MoveWeights[MoveType]
+		if x < 0: break
+
+	if MoveType == 'Swap':
+		return GetRandomSwapMove(State, RandomGen, Params)
+	elif MoveType == 'Relocate':
+		return GetRandomRelocateMove(State, RandomGen, Params)
+	elif MoveType == 'Replace':
+		return GetBestReplaceMove(State, RandomGen, AssignmentCond, Params)
+	elif MoveType == 'Drop':
+		return GetRandomDropMove(State, RandomGen, Params)
+	elif MoveType == 'Insert':
+		return GetRandomInsertMove(State, RandomGen, Params)
+	else:
+		raise Exception("Undefined move type %s!" % MoveType)
+
+#######################################################################################
+# LOCAL SEARCH (SIMULATED ANNEALING, TABU SEARCH)
+#######################################################################################
+
+def ImproveAssignmentSolutionByLocalSearch(AssignmentSolution, AssignmentCond, Params, Method='SA', TimeBudget=30,
+	RandomSeed=100, InitialTemperature=None, FinalTemperature=None, TabuTenure=20, NeighborhoodSize=20, MoveWeights=None):
+	"""
+	Improve assignment solution (list of TDR tuples (t,d,r)) by local search within
+	a time budget. Every move satisfies all assignment conditions (see CheckIfMoveIsFeasible);
+	the returned solution is never worse than the given solution.
+
+	Method: 'SA' (simulated annealing) or 'Tabu' (tabu search)
+	TimeBudget: Search time in seconds
+	RandomSeed: Seed of random move generation (same seed and iteration count --> same solution)
+	InitialTemperature, FinalTemperature: Temperature range (geometric cooling over time budget)
+		for SA; RevenueLineMeasure and 1% of it if None
+	TabuTenure: Number of iterations, a changed (t,d) pair remains tabu
+	NeighborhoodSize: Number of random moves evaluated per iteration of tabu search
+	MoveWeights: Relative frequencies of move types, see DefaultMoveWeights
+
+	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, LocalSearchStatistics)
+		LocalSearchStatistics: Dictionary with 'InitialValue', 'FinalValue', 'Iterations',
+		'AcceptedMovesPerType', 'ImprovingMovesPerType', 'Duration'
+	"""
+	if not Method in ('SA', 'Tabu'):
+		raise Exception("Undefined local search method %s! Use 'SA' or 'Tabu'." % Method)
+
+	if MoveWeights == None:
+		MoveWeights = DefaultMoveWeights
+	if InitialTemperature == None:
+		InitialTemperature = float(Params['RevenueLineMeasure'])
+	if FinalTemperature == None:
+		FinalTemperature = 0.01 * InitialTemperature
+
+	RandomGen = random.Random(RandomSeed)
+	State = InitLocalSearchState(AssignmentSolution, AssignmentCond, Params)
+
+	InitialValue = State['Value']
+	BestValue = State['Value']
+	BestSolution = GetAssignmentSolutionOfState(State)
+
+	AcceptedMovesPerType = {}
+	ImprovingMovesPerType = {}
+	TabuUntilIteration = {} 		# TabuUntilIteration[(t,d)] = iteration
+	iteration = 0
+
+	StartTime = default_timer()
+	ElapsedTime = 0
+
+	while ElapsedTime < TimeBudget:
+		iteration += 1
+
+		if Method == 'SA':
+			Temperature = InitialTemperature * (FinalTemperature / InitialTemperature) ** (ElapsedTime / float(TimeBudget))
+
+			Move = GetRandomMove(State, RandomGen, AssignmentCond, Params, MoveWeights)
+			SelectedMove = None
+			if Move != None:
+				(MoveType, RemovedTDRs, AddedTDRs) = Move
+				LMCounterChange = GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params)
+				if CheckIfMoveIsFeasible(State, RemovedTDRs, AddedTDRs, AssignmentCond, Params, LMCounterChange):
+					DeltaValue = GetDeltaValueOfMove(State, RemovedTDRs, AddedTDRs, Params, LMCounterChange)
+					if DeltaValue >= 0 or RandomGen.random() < math.exp(DeltaValue / Temperature):
+						SelectedMove = (MoveType, RemovedTDRs, AddedTDRs, DeltaValue)
+
+		else:
+			# best non-tabu move of neighborhood; tabu moves only if they improve the best solution
+			SelectedMove = None
+			for i in range(0, NeighborhoodSize):
+				Move = GetRandomMove(State, RandomGen, AssignmentCond, Params, MoveWeights)
+				if Move == None: continue
+				(MoveType, RemovedTDRs, AddedTDRs) = Move
+				LMCounterChange = GetLMCounterChangeOfMove(RemovedTDRs, AddedTDRs, Params)
+				if not CheckIfMoveIsFeasible(State, RemovedTDRs, AddedTDRs, AssignmentCond, Params, LMCounterChange):
+					continue
+				DeltaValue = GetDeltaValueOfMove(State, RemovedTDRs, AddedTDRs, Params, LMCounterChange)
+
+				IfTabu = False
+				for (t,d,r) in AddedTDRs:
+					if TabuUntilIteration.get((t,d), 0) >= iteration: IfTabu = True
+				if IfTabu and State['Value'] + DeltaValue <= BestValue:
+					continue
+
+				if SelectedMove == None or DeltaValue > SelectedMove[3]:
+					SelectedMove = (MoveType, RemovedTDRs, AddedTDRs, DeltaValue)
+
+			if SelectedMove != None:
+				for (t,d,r) in SelectedMove[1]:
+					TabuUntilIteration[(t,d)] = iteration + TabuTenure
+
+		if SelectedMove != None:
+			(MoveType, RemovedTDRs, AddedTDRs, DeltaValue) = SelectedMove
+			ApplyMove(State, RemovedTDRs, AddedTDRs, DeltaValue, Params)
+			IncrementDicValue(AcceptedMovesPerType, MoveType)
+
+			if State['Value'] > BestValue + 1e-9:
+				IncrementDicValue(ImprovingMovesPerType, MoveType)
+				BestValue = State['Value']
+				BestSolution = GetAssignmentSolutionOfState(State)
+
+		ElapsedTime = default_timer() - StartTime
+
+	LMCounterPerLineKey = IncrementLMCounter(BestSolution, {}, Params['LMCoveragePerDayRoute'])
+
+	LocalSearchStatistics = {
+		'InitialValue': 			InitialValue,
+		'FinalValue': 				BestValue,
+		'Iterations': 				iteration,
+		'AcceptedMovesPerType': 	AcceptedMovesPerType,
+		'ImprovingMovesPerType': 	ImprovingMovesPerType,
+		'Duration': 				ElapsedTime,
+	}
+
+	print "Local search (%s): %s iterations in %.2f seconds, solution value improved from %s to %s" \
+		% (Method, iteration, ElapsedTime, InitialValue, BestValue)
+
+	return (BestSolution, BestValue, LMCounterPerLineKey, LocalSearchStatistics)
+
+#######################################################################################
+# INCREMENTAL RE-PLANNING (AVAILABILITY CHANGES)
+#######################################################################################
+
+def GetBestRepairMove(State, CandidateTCDays, AssignmentCond, Params):
+	"""
+	Get the best insertion of a trip for one of the free (t,d) pairs in CandidateTCDays.
+	Trips of TCs below their minimum trip count (MinTripCountPerTC) are preferred,
+	other trips must have a positive value.
+
+	Returns: (TDR, DeltaValue), or None if there is no such trip
+	"""
+	MinTripCountPerTC = {}
+	if AssignmentCond.has_key(AssignCond.MinNumberOfTripsPerTC):
+		MinTripCountPerTC = Params['MinTripCountPerTC']
+
+	BestMove = None
+	BestKey = None
+	for (t,d) in CandidateTCDays:
+		if (t,d) in State['RouteOfTCAndDay']: continue
+		IfTripDeficit = len(State['TripDaysPerTC'].get(t, set())) < MinTripCountPerTC.get(t, 0)
+
+		for r in Params['AvailableRoutesPerTCAndDay'].get((t,d), []):
+			LMCounterChange = GetLMCounterChangeOfMove([], [(t,d,r)], Params)
+			if not CheckIfMoveIsFeasible(State, [], [(t,d,r)], AssignmentCond, Params, LMCounterChange):
+				continue
+			DeltaValue = GetDeltaValueOfMove(State, [], [(t,d,r)], Params, LMCounterChange)
+			if not IfTripDeficit and DeltaValue <= 1e-9:
+				continue
+			if BestKey == None or (IfTripDeficit, DeltaValue) > BestKey:
+				BestKey = (IfTripDeficit, DeltaValue)
+				BestMove = ((t,d,r), DeltaValue)
+
+	return BestMove
+
+def ReplanAssignmentSolutionForAvailabilityDelta(AssignmentSolution, AvailabilityDelta, AssignmentCond, Params,
+	LocalSearchTime=0, RandomSeed=100):
+	"""
+	Incremental re-planning of an assignment solution after changes of test customer 
+	availability, instead of planning the whole month from scratch:
+
+	1) Update available routes of the changed (t,d) pairs only (see UpdateAvailableRoutesForAvailability);
+		Params['AvailableRoutesPerTCAndDay'] is updated in place.
+	2) Remove trips whose routes are not available anymore.
+	3) Repair: Reassign the freed days to the test customers that are free on these days, 
+		and give affected TCs below MinTripCountPerTC new trips on other days (best trip first).
+	4) Optionally, improve the repaired solution by local search (LocalSearchTime in seconds).
+
+	AvailabilityDelta[(t,d)] = [(m1,m2), ...] or None; new availability of (t,d), see Availability
+
+	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, ReplanDiff)
+		ReplanDiff: dictionary with keys 
+			'RemovedTDRs', 'AddedTDRs': trips removed from/added to the previous solution
+			'ChangedTCDays': (t,d) pairs with changed available routes
+			'ValueChange': change of solution value, 'ReplanTime': duration in seconds
+	"""
+	StartTime = default_timer()
+
+	ChangedTCDays = UpdateAvailableRoutesForAvailability(Params, AvailabilityDelta)
+	State = InitLocalSearchState(AssignmentSolution, AssignmentCond, Params)
+	InitialValue = State['Value']
+
+	# remove invalidated trips
+	RouteOfTCAndDay = State['RouteOfTCAndDay']
+	InvalidTDRs = [(t,d,RouteOfTCAndDay[(t,d)]) for (t,d) in ChangedTCDays \
+		if (t,d) in RouteOfTCAndDay and not RouteOfTCAndDay[(t,d)] in Params['AvailableRoutesPerTCAndDay'][(t,d)]]
+
+	for TDR in InvalidTDRs:
+		DeltaValue = GetDeltaValueOfMove(State, [TDR], [], Params)
+		ApplyMove(State, [TDR], [], DeltaValue, Params)
+
+	# repair: freed days for all TCs, all days for affected TCs
+	DayList = State['DayList']
+	RepairDays = set([d for (t,d) in ChangedTCDays] + [d for (t,d,r) in InvalidTDRs])
+	AffectedTCs = set([t for (t,d) in ChangedTCDays])
+
+	CandidateTCDays = set()
+	for d in RepairDays:
+		if not d in DayList: continue
+		for t in State['TCList']:
+			CandidateTCDays.add((t,d))
+	for t in AffectedTCs:
+		for d in DayList:
+			CandidateTCDays.add((t,d))
+
+	while True:
+		RepairMove = GetBestRepairMove(State, CandidateTCDays, AssignmentCond, Params)
+		if RepairMove == None: break
+		(TDR, DeltaValue) = RepairMove
+		ApplyMove(State, [], [TDR], DeltaValue, Params)
+
+	AssignmentSolutionNew = GetAssignmentSolutionOfState(State)
+	SolutionValue = State['Value']
+
+	if LocalSearchTime > 0:
+		(AssignmentSolutionNew, SolutionValue, LMCounterPerLineKey, LocalSearchStatistics) = ImproveAssignmentSolutionByLocalSearch(
+			AssignmentSolutionNew, AssignmentCond, Params, TimeBudget=LocalSearchTime, RandomSeed=RandomSeed)
+
+	LMCounterPerLineKey = IncrementLMCounter(AssignmentSolutionNew, {}, Params['LMCoveragePerDayRoute'])
+
+	PreviousTDRs = set([TDR for TDR in AssignmentSolution if TDR[2] != None])
+	NewTDRs = set(AssignmentSolutionNew)
+
+	ReplanDiff = {
+		'RemovedTDRs': 		sorted(PreviousTDRs - NewTDRs, key=lambda tdr: (tdr[1], tdr[0])),
+		'AddedTDRs': 		sorted(NewTDRs - PreviousTDRs, key=lambda tdr: (tdr[1], tdr[0])),
+		'ChangedTCDays': 	ChangedTCDays,
+		'ValueChange': 		SolutionValue - InitialValue,
+		'ReplanTime': 		default_timer() - StartTime,
+	}
+	return (AssignmentSolutionNew, SolutionValue, LMCounterPerLineKey, ReplanDiff)
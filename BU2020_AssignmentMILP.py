@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Assignment Planning (allocation of routes to days and test customers) as a
+mixed-integer linear program (MILP), solved with an open-source solver.
+
+Alternative to the greedy heuristic FindOptimalAssignmentSolution; the greedy
+solution can be given as a warm start.
+
+Variables:
+	x[t,d,r] in {0,1}: 		Route r is assigned to test customer t on day d
+	y[LineKey] >= 0: 		Revenue-bearing line measurements of LineKey (Line, TW, WG),
+							capped by LMRequirements[LineKey]
+
+Objective (maximize):
+	RevenueLineMeasure * sum(y) - sum((CostLineMeasure * LMCount[d,r] + DurationCost[r]) * x[t,d,r])
+
+Constraints (depending on AssignCond conditions):
+	- At most one trip per test customer and day
+	- y[LineKey] <= line measurements of LineKey
+	- MaxNumberOfMeasurementsPerLineKey, MaxLineMeasurementSurplus: upper limits per LineKey
+	- SingleFahrtIDMeasurementPerDay: a FahrtID is measured at most once in a day
+	- MinNumberOfTripsPerTC: lower limit for the number of trips per TC
+	- MaxAllowedBlockDaysPerTC: max subsequent days with trips per TC
+	- MaxNumberOfTrips: upper limit for the total number of trips
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2020_AssignmentFunctions import *
+from BU2020_MILPSolverInterface import *
+
+#######################################################################################
+# MILP MODEL GENERATION
+#######################################################################################
+
+def GetAssignmentCandidates(AssignmentCond, Params):
+	"""
+	Get all candidate TDR tuples (t,d,r) for the assignment MILP; one binary variable
+	per candidate.
+
+	The last day of the measurement period is excluded, as in the greedy search
+	(see AssignCond.CheckIfTDRtupleShouldBeSelected).
+
+	Returns: (Candidates, TCList, DayList)
+	"""
+	AvailableRoutesPerTCAndDay = 	Params['AvailableRoutesPerTCAndDay']
+	StartStationPerTestCustomer = 	Params['StartStationPerTestCustomer']
+
+	(FirstDay, LastDay) = AssignmentCond[AssignCond.FirstAndLastDaysOfMeasurementPeriod]
+
+	TCList = StartStationPerTestCustomer.keys()
+	TCList.sort()
+	DayList = range(FirstDay, LastDay)
+
+	Candidates = []
+	for t in TCList:
+		for d in DayList:
+			if not (t,d) in AvailableRoutesPerTCAndDay:
+				continue
+			for r in AvailableRoutesPerTCAndDay[(t,d)]:
+				Candidates.append((t,d,r))
+
+	return (Candidates, TCList, DayList)
+
+def GetDurationCostPerRoute(TimeIntervalOfRoute, TripCostPerTimeInterval):
+	"""
+	Get duration cost of each route, considering different costs for different time intervals.
+
+	Returns: DurationCostPerRoute[r] = cost
+	"""
+	DurationCostPerRoute = {}
+	for r in TimeIntervalOfRoute:
+		(TotalIntervalValue, SegmentsPerInterval) = GetTotalValueOfInterval(TripCostPerTimeInterval, TimeIntervalOfRoute[r])
+		DurationCostPerRoute[r] = TotalIntervalValue
+	return DurationCostPerRoute
+
+def GetCoverageMatrixOfCandidates(CandD, CandR, LMCoveragePerDayRoute, LMRequirements):
+	"""
+	Get sparse LM coverage matrix of candidates: Coverage[i,k] = number of measurements
+	of LineKey i by candidate k.
+
+	The coverage of each (d,r) pair is read only once, and then expanded to all
+	candidates (TCs) with the same (d,r) by column indexing.
+
+	Returns: (Coverage, LineKeys), Coverage is a CSR matrix (L x K)
+	"""
+	# distinct (d,r) pairs of candidates
+	PairKeys = CandD.astype(np.int64) * (CandR.max() + 1) + CandR
+	(UniquePairs, CandPair) = np.unique(PairKeys, return_inverse=True)
+
+	# required LineKeys first, then other covered LineKeys (without revenue)
+	LineKeys = sorted(LMRequirements.keys())
+	LineKeyIndex = dict((LineKey, i) for (i, LineKey) in enumerate(LineKeys))
+
+	rows = []
+	cols = []
+	vals = []
+	FirstCandOfPair = np.zeros(len(UniquePairs), dtype=int)
+	FirstCandOfPair[CandPair[::-1]] = np.arange(len(CandPair))[::-1]
+
+	for p in range(0, len(UniquePairs)):
+		k = FirstCandOfPair[p]
+		LMCoverage = LMCoveragePerDayRoute[(CandD[k], CandR[k])]
+		for LineKey in LMCoverage:
+			if not LineKey in LineKeyIndex:
+				LineKeyIndex[LineKey] = len(LineKeys)
+				LineKeys.append(LineKey)
+			rows.append(LineKeyIndex[LineKey])
+			cols.append(p)
+			vals.append(LMCoverage[LineKey])
+
+	CoveragePerPair = sp.csc_matrix((vals, (rows, cols)), shape=(len(LineKeys), len(UniquePairs)))
+	Coverage = CoveragePerPair[:, CandPair].tocsr()
+
+	return (Coverage, LineKeys)
+
+def GetIncidenceRows(RowKeys, K, ColInd=None, Values=None):
+	"""
+	Build a sparse incidence matrix with one row per distinct value in RowKeys.
+
+	RowKeys[i]: Row key of the i-th nonzero entry, in column ColInd[i]
+		(ColInd = 0..K-1 if None); entries have value 1 if Values is None.
+
+	Returns: (A, UniqueRowKeys), A is a CSR matrix (N x K)
+	"""
+	if ColInd is None:
+		ColInd = np.arange(K)
+	if Values is None:
+		Values = np.ones(len(RowKeys))
+	if len(RowKeys) == 0:
+		return (sp.csr_matrix((0, K)), np.zeros(0, dtype=int))
+
+	(UniqueRowKeys, RowInd) = np.unique(RowKeys, return_inverse=True)
+	A = sp.csr_matrix((Values, (RowInd, ColInd)), shape=(len(UniqueRowKeys), K))
+	return (A, UniqueRowKeys)
+
+def GenerateAssignmentMILP(AssignmentCond, Params):
+	"""
+	Generate the assignment MILP in matrix form (see CreateMILPModel) from the
+	assignment parameters (see GenerateAssignmentPlanningVariables) and conditions (AssignCond).
+
+	Columns: x[t,d,r] for all candidates (see GetAssignmentCandidates), followed
+	by y[LineKey] for all LineKeys.
+
+	Returns: Model dictionary, with additional entries:
+		Model['Candidates']: List of TDR tuples, one per x column
+		Model['LineKeys']: List of LineKeys, one per y column
+		Model['Coverage']: Sparse LM coverage matrix of candidates (L x K)
+	"""
+	LMCoveragePerDayRoute = 		Params['LMCoveragePerDayRoute']
+	TimeIntervalOfRoute = 			Params['TimeIntervalOfRoute']
+	TravelIDListOfRoute = 			Params['TravelIDListOfRoute']
+	LMRequirements = 				Params['LMRequirements']
+	RevenueLineMeasure = 			Params['RevenueLineMeasure']
+	CostLineMeasure = 				Params['CostLineMeasure']
+	TripCostPerTimeInterval = 		Params['TripCostPerTimeInterval']
+
+	(Candidates, TCList, DayList) = GetAssignmentCandidates(AssignmentCond, Params)
+	if not Candidates:
+		raise Exception("There are no assignable (t,d,r) candidates for the MILP model!")
+
+	K = len(Candidates)
+	D = len(DayList)
+	TCIndex = dict((t, i) for (i, t) in enumerate(TCList))
+
+	CandT = np.array([TCIndex[tdr[0]] for tdr in Candidates])
+	CandD = np.array([tdr[1] for tdr in Candidates])
+	CandR = np.array([tdr[2] for tdr in Candidates])
+	CandDayInd = CandD - DayList[0]
+
+	# LM coverage
+	(Coverage, LineKeys) = GetCoverageMatrixOfCandidates(CandD, CandR, LMCoveragePerDayRoute, LMRequirements)
+	L = len(LineKeys)
+	Req = np.array([LMRequirements.get(LineKey, 0) for LineKey in LineKeys], dtype=float)
+
+	# objective
+	DurationCostPerRoute = GetDurationCostPerRoute(TimeIntervalOfRoute, TripCostPerTimeInterval)
+	DurationCost = np.array([DurationCostPerRoute[r] for r in CandR], dtype=float)
+	LMCountOfCand = np.asarray(Coverage.sum(axis=0)).ravel()
+
+	c = np.concatenate([-(CostLineMeasure * LMCountOfCand + DurationCost), RevenueLineMeasure * np.ones(L)])
+
+	Blocks = []
+
+	# at most one trip per TC and day
+	(A, Keys) = GetIncidenceRows(CandT * D + CandDayInd, K)
+	Blocks.append((A, -INF * np.ones(A.shape[0]), np.ones(A.shape[0])))
+
+	# upper limits per LineKey
+	UpperLimit = INF * np.ones(L)
+	if AssignCond.MaxNumberOfMeasurementsPerLineKey in AssignmentCond:
+		UpperLimitLMperLineKey = AssignmentCond[AssignCond.MaxNumberOfMeasurementsPerLineKey][0]
+		for i in range(0, L):
+			if LineKeys[i] in UpperLimitLMperLineKey:
+				UpperLimit[i] = UpperLimitLMperLineKey[LineKeys[i]]
+
+	if AssignCond.MaxLineMeasurementSurplus in AssignmentCond:
+		MaxLMSurplus = AssignmentCond[AssignCond.MaxLineMeasurementSurplus][0]
+		UpperLimit = np.minimum(UpperLimit, Req + MaxLMSurplus)
+
+	Limited = np.nonzero(~np.isinf(UpperLimit))[0]
+	Blocks.append((Coverage[Limited, :], -INF * np.ones(len(Limited)), UpperLimit[Limited]))
+
+	# single FahrtID measurement per day
+	if AssignCond.SingleFahrtIDMeasurementPerDay in AssignmentCond and AssignmentCond[AssignCond.SingleFahrtIDMeasurementPerDay][0]:
+		# route x FahrtID incidence; on-foot and artificial connections have no FahrtID
+		FahrtIDIndex = {}
+		rows = []
+		cols = []
+		for r in np.unique(CandR):
+			for fid in TravelIDListOfRoute[r]:
+				if fid == None: continue
+				if not fid in FahrtIDIndex: FahrtIDIndex[fid] = len(FahrtIDIndex)
+				rows.append(FahrtIDIndex[fid])
+				cols.append(r)
+
+		if rows:
+			F = len(FahrtIDIndex)
+			FahrtIDsOfRoute = sp.csc_matrix((np.ones(len(rows)), (rows, cols)), shape=(F, CandR.max() + 1))
+			FahrtIDsOfCand = FahrtIDsOfRoute[:, CandR].tocoo()
+
+			(A, Keys) = GetIncidenceRows(CandDayInd[FahrtIDsOfCand.col].astype(np.int64) * F + FahrtIDsOfCand.row, K,
+				ColInd=FahrtIDsOfCand.col)
+
+			# rows with a single candidate are always satisfied
+			Conflicting = np.nonzero(np.diff(A.indptr) > 1)[0]
+			Blocks.append((A[Conflicting, :], -INF * np.ones(len(Conflicting)), np.ones(len(Conflicting))))
+
+	# lower limit for the number of trips per TC
+	if AssignCond.MinNumberOfTripsPerTC in AssignmentCond:
+		MinTripCountPerTC = AssignmentCond[AssignCond.MinNumberOfTripsPerTC][0]
+		(A, Keys) = GetIncidenceRows(CandT, K)
+		MinTrips = np.array([MinTripCountPerTC.get(TCList[i], 0) for i in Keys], dtype=float)
+		Blocks.append((A, MinTrips, INF * np.ones(A.shape[0])))
+
+	# max block days per TC: at most B trip days in each window of B+1 subsequent days
+	if AssignCond.MaxAllowedBlockDaysPerTC in AssignmentCond:
+		MaxBlockDaysPerTC = AssignmentCond[AssignCond.MaxAllowedBlockDaysPerTC][0]
+		BlockDaysOfCand = np.array([MaxBlockDaysPerTC.get(TCList[i], D) for i in CandT])
+
+		RowKeys = []
+		ColInd = []
+		for offset in range(0, min(BlockDaysOfCand.max(), D-1) + 1):
+			# candidate lies in the window starting on day (CandDayInd - offset)
+			WindowStart = CandDayInd - offset
+			Valid = (offset <= BlockDaysOfCand) & (WindowStart >= 0) & (WindowStart + BlockDaysOfCand < D)
+			RowKeys.append(CandT[Valid].astype(np.int64) * D + WindowStart[Valid])
+			ColInd.append(np.nonzero(Valid)[0])
+
+		RowKeys = np.concatenate(RowKeys)
+		ColInd = np.concatenate(ColInd)
+		(A, Keys) = GetIncidenceRows(RowKeys, K, ColInd=ColInd)
+		BlockDays = np.array([MaxBlockDaysPerTC.get(TCList[i], D) for i in Keys // D], dtype=float)
+		Blocks.append((A, -INF * np.ones(A.shape[0]), BlockDays))
+
+	# upper limit for the total number of trips
+	if AssignCond.MaxNumberOfTrips in AssignmentCond:
+		MaxTripCount = AssignmentCond[AssignCond.MaxNumberOfTrips][0]
+		Blocks.append((sp.csr_matrix(np.ones((1, K))), [-INF], [MaxTripCount]))
+
+	# all blocks above refer to x columns only
+	(Ax, RowLower, RowUpper) = StackConstraintBlocks(Blocks, K)
+	Ax = sp.hstack([Ax, sp.csr_matrix((Ax.shape[0], L))], format='csr')
+
+	# y[LineKey] - sum(Coverage * x) <= 0
+	Ay = sp.hstack([-Coverage, sp.identity(L, format='csr')], format='csr')
+
+	A = sp.vstack([Ax, Ay], format='csr')
+	RowLower = np.concatenate([RowLower, -INF * np.ones(L)])
+	RowUpper = np.concatenate([RowUpper, np.zeros(L)])
+
+	ColLower = np.zeros(K + L)
+	ColUpper = np.concatenate([np.ones(K), Req])
+	Integrality = np.concatenate([np.ones(K, dtype=int), np.zeros(L, dtype=int)])
+
+	Model = CreateMILPModel(c, A, RowLower, RowUpper, ColLower, ColUpper, Integrality, Maximize=True,
+		ColNames=Candidates + LineKeys)
+	Model['Candidates'] = Candidates
+	Model['LineKeys'] = LineKeys
+	Model['Coverage'] = Coverage
+
+	return Model
+
+#######################################################################################
+# WARM START & SOLUTION CONVERSION
+#######################################################################################
+
+def ConvertAssignmentSolutionToMILPStart(Model, AssignmentSolution):
+	"""
+	Convert an assignment solution (list of TDR tuples, like the greedy solution of
+	FindOptimalAssignmentSolution) to a start vector for the MILP model.
+
+	TDR tuples that are not candidates of the model are ignored.
+
+	Returns: Start vector x of length K + L
+	"""
+	Candidates = Model['Candidates']
+	Coverage = Model['Coverage']
+	K = len(Candidates)
+
+	CandIndex = dict((tdr, k) for (k, tdr) in enumerate(Candidates))
+
+	xStart = np.zeros(K)
+	for tdr in AssignmentSolution:
+		if tdr in CandIndex:
+			xStart[CandIndex[tdr]] = 1
+
+	# revenue-bearing measurements, capped by requirements
+	yStart = np.minimum(Coverage.dot(xStart), Model['ColUpper'][K:])
+
+	return np.concatenate([xStart, yStart])
+
+def ConvertMILPSolutionToAssignmentSolution(Model, x):
+	"""
+	Convert MILP solution vector to an assignment solution:
+	List of TDR tuples (t,d,r), sorted by day and TC.
+	"""
+	K = len(Model['Candidates'])
+	AssignmentSolution = [Model['Candidates'][k] for k in np.nonzero(x[:K] > 0.5)[0]]
+	AssignmentSolution.sort(key=lambda tdr: (tdr[1], tdr[0]))
+	return AssignmentSolution
+
+#######################################################################################
+# SOLVE ASSIGNMENT MILP
+#######################################################################################
+
+def FindOptimalAssignmentSolutionMILP(AssignmentCond, Params, Solver=None, WarmStartSolution=None,
+	TimeLimit=None, MipGap=None, Verbose=False):
+	"""
+	Find optimal assigment solution by solving the assignment MILP with a
+	solver backend (see MILPSolvers).
+
+	AssignmentCond: Dictionary of all assignment conditions
+	Params: 	Dictionary of all parameters required for assignment planning
+	Solver: Name of solver backend; default backend if None (see GetDefaultMILPSolver)
+	WarmStartSolution: Optional assignment solution (list of TDR tuples) as start solution,
+		like the solution of FindOptimalAssignmentSolution (greedy)
+
+	Returns: (AssignmentSolution, SolutionValue, LMCounterPerLineKey, SolverStatus)
+		SolverStatus: see MILPStatus
+	"""
+	if Solver == None:
+		Solver = GetDefaultMILPSolver()
+	Model = GenerateAssignmentMILP(AssignmentCond, Params)
+	print "Assignment MILP: %s columns, %s rows, %s nonzeros" % (Model['A'].shape[1], Model['A'].shape[0], Model['A'].nnz)
+
+	WarmStart = None
+	if WarmStartSolution:
+		WarmStart = ConvertAssignmentSolutionToMILPStart(Model, WarmStartSolution)
+
+	(Status, x, ObjValue, SolveTime) = SolveMILP(Model, Solver, WarmStart, TimeLimit, MipGap, Verbose)
+	print "Assignment MILP solved with %s in %.2f seconds, status: %s" % (Solver, SolveTime, Status)
+
+	if x is None:
+		return ([], None, {}, Status)
+
+	AssignmentSolution = ConvertMILPSolutionToAssignmentSolution(Model, x)
+
+	LMCoveragePerDayRoute = Params['LMCoveragePerDayRoute']
+	LMCounterPerLineKey = IncrementLMCounter(AssignmentSolution, {}, LMCoveragePerDayRoute)
+
+	SolutionValue = GetSolutionValue(AssignmentSolution, [], {}, Params['LMRequirements'], LMCoveragePerDayRoute,
+		Params['TimeIntervalOfRoute'], Params['RevenueLineMeasure'], Params['CostLineMeasure'], Params['TripCostPerTimeInterval'])
+
+	return (AssignmentSolution, SolutionValue, LMCounterPerLineKey, Status)
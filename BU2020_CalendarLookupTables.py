@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Precomputed lookup tables for time window (ZF) and weekday group (WD) classification,
+used by FindTimeWindowOfTimePoint, GetMatchingTimeWindows, GetWeekdayGroupsOfDate and
+GetAvailableWeekDays for the central ZF and WD dictionaries.
+
+1) Time window of each minute of two days (2*24*60 = 2880 entries)
+2) Cache of matching time windows per (IntervalStart, IntervalEnd, MeasureTime)
+3) Weekday group lists and bit masks per weekday; the weekday (1-7) of an ordinal date
+	is (DateOrd - 1) % 7 + 1, as date.fromordinal(1) is a Monday.
+
+Tables are built for the central ZF and WD at import; call InitCalendarLookupTables
+after changing ZF or WD. Functions called with other dictionaries are not affected.
+"""
+import numpy as np
+
+from BU2019_CentralParameters import *
+
+# number of minutes covered by time window table (time points of two days)
+MinutesOfTwoDays = 2*24*60
+
+# max number of cached matching time window lists (cache is cleared when exceeded)
+MaxMatchingTimeWindowCacheSize = 10**6
+
+# global lookup tables, see InitCalendarLookupTables
+CalendarLookup = {}
+
+#######################################################################################
+# TABLE GENERATION
+#######################################################################################
+
+def InitCalendarLookupTables(TimeWindows=ZF, WeekdayGroups=WD):
+	"""
+	(Re)build global lookup tables (CalendarLookup) for the given time windows and weekday groups.
+
+	CalendarLookup['TimeWindowPerMinute'][TimePoint] = TW (None if no TW), TimePoint < 2880
+	CalendarLookup['TimeWindowArray']: Same as numpy array, with 0 for no TW
+	CalendarLookup['MatchingTimeWindows'][(IntervalStart, IntervalEnd, MeasureTime)] = list of TWs
+	CalendarLookup['WeekdayGroupsPerWeekday'][Exclude10][WeekDay] = sorted list of WGs
+	CalendarLookup['WeekdayGroupMaskPerWeekday']: Numpy array, bit WeekdayGroupBit[WG] is set
+		if WeekDay (index 1-7) belongs to WG
+	CalendarLookup['WeekdayGroupBit'][WG] = bit number of WG in masks
+
+	Returns: CalendarLookup
+	"""
+	CalendarLookup.clear()
+	CalendarLookup['TimeWindows'] = TimeWindows
+	CalendarLookup['WeekdayGroups'] = WeekdayGroups
+
+	# time window per minute; first matching key like in FindTimeWindowOfTimePoint
+	DMin = 24*60
+	TimeWindowPerMinute = [None] * MinutesOfTwoDays
+	for TimePoint in range(0, MinutesOfTwoDays):
+		for key in TimeWindows:
+			if key == 0: continue
+			(TimeWindowBegin, TimeWindowEnd) = TimeWindows[key]
+			if (TimePoint >= TimeWindowBegin and TimePoint <= TimeWindowEnd) or (TimePoint >= TimeWindowBegin+DMin and TimePoint <= TimeWindowEnd+DMin):
+				TimeWindowPerMinute[TimePoint] = key
+				break
+	CalendarLookup['TimeWindowPerMinute'] = TimeWindowPerMinute
+	CalendarLookup['TimeWindowArray'] = np.array([tw or 0 for tw in TimeWindowPerMinute], dtype=int)
+	CalendarLookup['MatchingTimeWindows'] = {}
+
+	# weekday groups per weekday
+	WeekdayGroupBit = dict((WG, i) for (i, WG) in enumerate(sorted(WeekdayGroups.keys())))
+	WeekdayGroupsPerWeekday = {True: [None] * 8, False: [None] * 8}
+	WeekdayGroupMaskPerWeekday = np.zeros(8, dtype=int)
+	for WeekDay in range(1, 8):
+		WGs = sorted(WG for WG in WeekdayGroups if WeekDay in WeekdayGroups[WG])
+		WeekdayGroupsPerWeekday[False][WeekDay] = WGs
+		WeekdayGroupsPerWeekday[True][WeekDay] = [WG for WG in WGs if WG != 10]
+		for WG in WGs:
+			WeekdayGroupMaskPerWeekday[WeekDay] |= 1 << WeekdayGroupBit[WG]
+	CalendarLookup['WeekdayGroupBit'] = WeekdayGroupBit
+	CalendarLookup['WeekdayGroupsPerWeekday'] = WeekdayGroupsPerWeekday
+	CalendarLookup['WeekdayGroupMaskPerWeekday'] = WeekdayGroupMaskPerWeekday
+
+	return CalendarLookup
+
+InitCalendarLookupTables()
+
+#######################################################################################
+# BATCH (VECTORIZED) LOOKUP
+#######################################################################################
+
+def GetWeekdaysOfDates(DateOrds):
+	"""
+	Get weekdays (1-7) of ordinal dates; 1 is for Monday, 7 is for Sunday.
+
+	Returns: Numpy array of weekdays
+	"""
+	return (np.asarray(DateOrds, dtype=int) - 1) % 7 + 1
+
+def FindTimeWindowsOfTimePoints(TimePoints):
+	"""
+	Get time windows (central ZF) of time points in minutes (0 <= TimePoint < 2880),
+	see FindTimeWindowOfTimePoint.
+
+	Returns: Numpy array of TWs, 0 for time points without TW
+	"""
+	return CalendarLookup['TimeWindowArray'][np.asarray(TimePoints, dtype=int)]
+
+def GetWeekdayGroupMasksOfDates(DateOrds, Exclude10=True):
+	"""
+	Get weekday group (central WD) bit masks of ordinal dates; see CalendarLookup['WeekdayGroupBit']
+	for the bit of a weekday group. If Exclude10 = True, the bit of WG 10 (all weekdays) is not set.
+
+	Returns: Numpy array of bit masks
+	"""
+	Masks = CalendarLookup['WeekdayGroupMaskPerWeekday'][GetWeekdaysOfDates(DateOrds)]
+	if Exclude10 and 10 in CalendarLookup['WeekdayGroupBit']:
+		Masks = Masks & ~(1 << CalendarLookup['WeekdayGroupBit'][10])
+	return Masks
+
+def GetDatesOfWeekdayGroup(DateOrds, WeekdayGroup):
+	"""
+	Select ordinal dates belonging to a weekday group (central WD).
+
+	Returns: Numpy array of ordinal dates
+	"""
+	DateOrds = np.asarray(DateOrds, dtype=int)
+	Flag = 1 << CalendarLookup['WeekdayGroupBit'][WeekdayGroup]
+	return DateOrds[(GetWeekdayGroupMasksOfDates(DateOrds, Exclude10=False) & Flag) > 0]
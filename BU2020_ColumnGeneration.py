@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Column generation for route selection: route search (pricing) coupled with
+the route selection LP over a growing route pool.
+
+1) Solve the LP relaxation of route selection (master LP) over the current route pool.
+2) Get dual prices of LineKeys from the coverage rows of the master LP.
+3) Search routes with positive reduced cost (pricing), i.e. routes whose LM coverage
+	w.r.t. dual prices is worth more than their duration cost, see
+	Cond.SelectRoutesWithPositiveReducedCost.
+4) Add best new routes (columns) to the pool; repeat until no route with positive
+	reduced cost is found.
+5) Solve the route selection MILP over the final route pool (price and branch).
+
+Master problem (uncovered requirements lose their revenue):
+
+	maximize 	Revenue * sum(Req) - sum(Cost[r] * x[r]) - Revenue * sum(s[i])
+	subject to 	sum(Coverage[i,r] * x[r]) + s[i] >= Req[i] 	for each LineKey i
+				x[r] in {0, 1, 2, ...}, 0 <= s[i] <= Req[i]
+"""
+import numpy as np
+import scipy.sparse as sp
+from timeit import default_timer
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+from BU2020_MILPSolverInterface import *
+from BU2020_RouteSelectionMILP import *
+
+#######################################################################################
+# MASTER PROBLEM
+#######################################################################################
+
+def GenerateRouteSelectionMasterModel(Coverage, LineKeys, LMRequirements, RouteCosts, RevenueLineMeasure):
+	"""
+	Generate master model of column generation in matrix form (see CreateMILPModel):
+	route columns x (integer) followed by a slack column s for each required LineKey.
+	Slack columns keep the model feasible for any route pool.
+
+	Coverage: 	Sparse LM coverage matrix (L x R), see GetCoverageMatrixOfRoutes
+	LineKeys: 	List of LineKeys, one per row of Coverage
+	RouteCosts: Cost of each route (array of length R)
+	RevenueLineMeasure: Revenue per required line measurement (cost of an uncovered measurement)
+
+	Returns: Model dictionary, with additional entries:
+		Model['LineKeys']: List of LineKeys, one per coverage row
+		Model['RouteCount']: Number of route columns R
+	"""
+	Coverage = sp.csr_matrix(Coverage)
+	(L, R) = Coverage.shape
+	Req = np.array([LMRequirements.get(LineKey, 0) for LineKey in LineKeys], dtype=float)
+
+	Rows = np.nonzero(Req > 0)[0]
+	K = len(Rows)
+
+	A = sp.hstack([Coverage[Rows, :], sp.identity(K, format='csr')], format='csr')
+	RowLower = Req[Rows]
+	RowUpper = INF * np.ones(K)
+
+	c = np.concatenate([-np.asarray(RouteCosts, dtype=float), -RevenueLineMeasure * np.ones(K)])
+	ColLower = np.zeros(R + K)
+	ColUpper = np.concatenate([INF * np.ones(R), RowLower])
+	Integrality = np.concatenate([np.ones(R, dtype=int), np.zeros(K, dtype=int)])
+
+	Model = CreateMILPModel(c, A, RowLower, RowUpper, ColLower, ColUpper, Integrality, Maximize=True,
+		ObjOffset=RevenueLineMeasure * RowLower.sum())
+	Model['LineKeys'] = [LineKeys[i] for i in Rows]
+	Model['RouteCount'] = R
+
+	return Model
+
+def GetDualPricePerLineKey(Model, RowDuals):
+	"""
+	Get dual prices of LineKeys from the row duals of the master LP:
+	increase of the objective value for one more covered measurement of LineKey.
+
+	Returns: DualPricePerLineKey[LineKey] = price, for positive prices only
+	"""
+	DualPricePerLineKey = {}
+	LineKeys = Model['LineKeys']
+	for i in range(0, len(LineKeys)):
+		price = -RowDuals[i]
+		if price > 1e-9:
+			DualPricePerLineKey[LineKeys[i]] = price
+	return DualPricePerLineKey
+
+#######################################################################################
+# PRICING
+#######################################################################################
+
+def FindRoutesWithPositiveReducedCost(DualPricePerLineKey, RouteCostPerMinute, MinReducedCost, dbcur, RouteConditionsList):
+	"""
+	Pricing route search: Search routes with reduced cost > MinReducedCost for each
+	RouteConditions in RouteConditionsList (like one per start station or cluster).
+
+	Each RouteConditions should limit the search time (Cond.MaxSearchTimeInSeconds).
+
+	Returns: RouteInfoList
+	"""
+	RouteInfoList = []
+	for RouteConditions in RouteConditionsList:
+		PricingConditions = RouteConditions.copy()
+		PricingConditions[Cond.SelectRoutesWithPositiveReducedCost] = (DualPricePerLineKey, RouteCostPerMinute, MinReducedCost)
+		(Routes, StatusReport, TerminationReasons) = FindAllRoutes(dbcur, PricingConditions)
+		RouteInfoList.extend(Routes)
+	return RouteInfoList
+
+#######################################################################################
+# COLUMN GENERATION
+#######################################################################################
+
+def FindRouteSelectionByColumnGeneration(PricingFunc, PricingParameters, LMRequirements, RevenueLineMeasure,
+	RouteCostPerMinute=1.0, InitialRoutes=None, MaxIterations=20, MaxNewRoutesPerIteration=100, MinReducedCost=1e-6,
+	Solver=None, TimeLimit=None, MipGap=None):
+	"""
+	Column generation: Select routes for covering LM requirements, generating new
+	routes by pricing route search until no route with positive reduced cost is found.
+
+	PricingFunc: Pricing route search, called as
+		PricingFunc(DualPricePerLineKey, RouteCostPerMinute, MinReducedCost, *PricingParameters)
+		returning a RouteInfoList, like FindRoutesWithPositiveReducedCost
+	PricingParameters: n-Tuple with additional parameters for PricingFunc,
+		like (dbcur, RouteConditionsList)
+	InitialRoutes: Initial route pool (RouteInfoList); may be empty
+	MaxNewRoutesPerIteration: Max number of routes (with highest reduced costs) added per iteration
+	Solver: Solver backend of master LPs and final MILP (see LPSolvers and MILPSolvers);
+		first available backend with LP duals if None (see GetDefaultMILPSolver)
+	TimeLimit, MipGap: Parameters of the final MILP
+
+	Returns: (SelectionCountPerRoute, RoutePool, ObjValue, LPObjValue, SolverStatus)
+		SelectionCountPerRoute[r] = n, for selected routes RoutePool[r] only
+		LPObjValue: Objective value of the LP relaxation over RoutePool (upper bound for ObjValue)
+	"""
+	if Solver == None:
+		Solver = GetDefaultMILPSolver(LPSolvers)
+
+	RoutePool = []
+	LMCoveragePerRoute = []
+	RouteKeys = set()
+
+	if InitialRoutes:
+		for RouteInfo in InitialRoutes:
+			RouteKey = GetRouteKey(RouteInfo)
+			if RouteKey in RouteKeys: continue
+			(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+				GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements)
+			RoutePool.append(RouteInfo)
+			LMCoveragePerRoute.append(LMCoveragePerLineKey)
+			RouteKeys.add(RouteKey)
+
+	LineKeys = sorted(LMRequirements.keys())
+
+	for iteration in range(1, MaxIterations+1):
+		# master LP
+		(Coverage, LineKeys) = GetCoverageMatrixOfRoutes(LMCoveragePerRoute, LineKeys)
+		RouteCosts = GetDurationOfRoutes(RoutePool) * RouteCostPerMinute
+		Model = GenerateRouteSelectionMasterModel(Coverage, LineKeys, LMRequirements, RouteCosts, RevenueLineMeasure)
+
+		(Status, x, LPObjValue, RowDuals, SolveTime) = SolveLPRelaxation(Model, Solver)
+		if Status != MILPStatus['Optimal']:
+			raise Exception("Master LP of column generation could not be solved (status %s)!" % Status)
+		DualPricePerLineKey = GetDualPricePerLineKey(Model, RowDuals)
+
+		print "Column generation iteration %s: %s routes in pool, LP objective value: %.2f, LineKeys with positive price: %s" \
+			% (iteration, len(RoutePool), LPObjValue, len(DualPricePerLineKey))
+
+		if not DualPricePerLineKey:
+			break
+
+		# pricing: routes with positive reduced cost, best first
+		st = default_timer()
+		NewRoutes = PricingFunc(DualPricePerLineKey, RouteCostPerMinute, MinReducedCost, *PricingParameters)
+
+		DistinctRoutes = []
+		DistinctCoverages = []
+		CandidateKeys = set()
+		for RouteInfo in NewRoutes:
+			RouteKey = GetRouteKey(RouteInfo)
+			if RouteKey in RouteKeys or RouteKey in CandidateKeys: continue
+			(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+				GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements)
+			DistinctRoutes.append(RouteInfo)
+			DistinctCoverages.append(LMCoveragePerLineKey)
+			CandidateKeys.add(RouteKey)
+
+		Candidates = []
+		ReducedCosts = GetReducedCostsOfRoutes(DistinctRoutes, DualPricePerLineKey, RouteCostPerMinute, DistinctCoverages)
+		for i in range(0, len(DistinctRoutes)):
+			if ReducedCosts[i] > MinReducedCost:
+				Candidates.append((ReducedCosts[i], DistinctRoutes[i], DistinctCoverages[i]))
+
+		Candidates.sort(key=lambda cand: cand[0], reverse=True)
+		for (ReducedCost, RouteInfo, LMCoveragePerLineKey) in Candidates[:MaxNewRoutesPerIteration]:
+			RoutePool.append(RouteInfo)
+			LMCoveragePerRoute.append(LMCoveragePerLineKey)
+			RouteKeys.add(GetRouteKey(RouteInfo))
+
+		print "Pricing: %s new routes with positive reduced cost found in %.2f seconds, %s added to pool" \
+			% (len(Candidates), default_timer() - st, min(len(Candidates), MaxNewRoutesPerIteration))
+
+		if not Candidates:
+			break
+
+	# final MILP over route pool
+	(Coverage, LineKeys) = GetCoverageMatrixOfRoutes(LMCoveragePerRoute, LineKeys)
+	RouteCosts = GetDurationOfRoutes(RoutePool) * RouteCostPerMinute
+	Model = GenerateRouteSelectionMasterModel(Coverage, LineKeys, LMRequirements, RouteCosts, RevenueLineMeasure)
+	LPObjValue = SolveLPRelaxation(Model, Solver)[2]
+
+	(Status, x, ObjValue, SolveTime) = SolveMILP(Model, Solver, None, TimeLimit, MipGap)
+	print "Route selection MILP over %s routes solved with %s in %.2f seconds, status: %s, objective value: %s" \
+		% (len(RoutePool), Solver, SolveTime, Status, ObjValue)
+
+	SelectionCountPerRoute = {}
+	if x is not None:
+		for r in np.nonzero(x[:Model['RouteCount']] > 0.5)[0]:
+			SelectionCountPerRoute[r] = int(round(x[r]))
+
+	return (SelectionCountPerRoute, RoutePool, ObjValue, LPObjValue, Status)
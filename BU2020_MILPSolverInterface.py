@@ -0,0 +1,608 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pluggable interface to MILP solvers (HiGHS, CBC, Gurobi) for the
+optimization models of assignment and route selection planning.
+
+A model is a dictionary of arrays in matrix form (see CreateMILPModel):
+	maximize/minimize 	c'x
+	subject to 			RowLower <= A x <= RowUpper
+						ColLower <= x <= ColUpper
+						x[j] integer if Integrality[j] == 1
+
+A is a scipy.sparse CSR matrix; all other entries are numpy arrays.
+
+Default backend is the first available one of DefaultMILPSolverOrder: open-source CBC
+(pulp, also 1.x for Python 2), Gurobi if installed (gurobipy, commercial license),
+HiGHS (highspy, Python 3 only).
+"""
+import numpy as np
+import scipy.sparse as sp
+from timeit import default_timer
+
+# infinite bound for rows and columns
+INF = float('inf')
+
+# solution status codes returned by SolveMILP
+MILPStatus = {
+	'Optimal': 		1, 		# proven optimal solution
+	'Feasible': 	2, 		# feasible solution, optimality not proven (time limit, gap)
+	'Infeasible': 	3, 		# model is infeasible
+	'NoSolution': 	4, 		# no feasible solution found (time limit, error, unbounded)
+}
+
+def CreateMILPModel(c, A, RowLower, RowUpper, ColLower, ColUpper, Integrality, Maximize=True, ColNames=None, ObjOffset=0):
+	"""
+	Create a MILP model dictionary in matrix form.
+
+	c: 				Objective coefficients, length n
+	A: 				Constraint matrix (m x n), any scipy.sparse format (converted to CSR)
+	RowLower: 		Lower row bounds, length m (-INF for no bound)
+	RowUpper: 		Upper row bounds, length m (INF for no bound)
+	ColLower: 		Lower column bounds, length n
+	ColUpper: 		Upper column bounds, length n (INF for no bound)
+	Integrality: 	1 for integer, 0 for continuous columns, length n
+	ColNames: 		Optional list of column keys like (t,d,r), length n
+	ObjOffset: 		Constant part of the objective, added to the objective value of the solution
+
+	Returns: Model dictionary
+	"""
+	A = sp.csr_matrix(A)
+	(m, n) = A.shape
+
+	Model = {
+		'c': 			np.asarray(c, dtype=float),
+		'A': 			A,
+		'RowLower': 	np.asarray(RowLower, dtype=float),
+		'RowUpper': 	np.asarray(RowUpper, dtype=float),
+		'ColLower': 	np.asarray(ColLower, dtype=float),
+		'ColUpper': 	np.asarray(ColUpper, dtype=float),
+		'Integrality': 	np.asarray(Integrality, dtype=int),
+		'Maximize': 	Maximize,
+		'ColNames': 	ColNames,
+		'ObjOffset': 	ObjOffset,
+	}
+
+	# check dimensions
+	if len(Model['c']) != n or len(Model['ColLower']) != n or len(Model['ColUpper']) != n or len(Model['Integrality']) != n:
+		raise Exception("Column arrays of MILP model must have length %s!" % n)
+	if len(Model['RowLower']) != m or len(Model['RowUpper']) != m:
+		raise Exception("Row arrays of MILP model must have length %s!" % m)
+
+	return Model
+
+def StackConstraintBlocks(ConstraintBlocks, n):
+	"""
+	Stack constraint blocks vertically to a single CSR matrix with row bounds.
+
+	ConstraintBlocks: List of tuples (A, RowLower, RowUpper) with n columns each;
+		empty blocks (A with 0 rows) are skipped.
+
+	Returns: (A, RowLower, RowUpper)
+	"""
+	Matrices = []
+	Lower = []
+	Upper = []
+	for (A, RowLower, RowUpper) in ConstraintBlocks:
+		if A.shape[0] == 0:
+			continue
+		if A.shape[1] != n:
+			raise Exception("All constraint blocks must have %s columns!" % n)
+		Matrices.append(sp.csr_matrix(A))
+		Lower.append(np.asarray(RowLower, dtype=float))
+		Upper.append(np.asarray(RowUpper, dtype=float))
+
+	if not Matrices:
+		return (sp.csr_matrix((0, n)), np.zeros(0), np.zeros(0))
+
+	return (sp.vstack(Matrices, format='csr'), np.concatenate(Lower), np.concatenate(Upper))
+
+# **************************************************************************************
+# Solver backends
+# **************************************************************************************
+
+def GetHiGHSModel(Model, LPRelaxation=False):
+	"""
+	Convert MILP model dictionary to a HiGHS model (highspy.HighsLp).
+
+	LPRelaxation: If True, all columns are continuous (integrality is ignored).
+
+	Returns: HighsLp
+	"""
+	try:
+		import highspy
+	except ImportError:
+		raise Exception("Solver backend 'highs' requires the python package highspy!")
+
+	A = Model['A']
+	(m, n) = A.shape
+
+	lp = highspy.HighsLp()
+	lp.num_col_ = n
+	lp.num_row_ = m
+	lp.col_cost_ = Model['c']
+	lp.col_lower_ = Model['ColLower']
+	lp.col_upper_ = Model['ColUpper']
+	lp.row_lower_ = Model['RowLower']
+	lp.row_upper_ = Model['RowUpper']
+	lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+	lp.a_matrix_.start_ = A.indptr
+	lp.a_matrix_.index_ = A.indices
+	lp.a_matrix_.value_ = A.data
+	if not LPRelaxation:
+		lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous for i in Model['Integrality']]
+	if Model['Maximize']:
+		lp.sense_ = highspy.ObjSense.kMaximize
+	else:
+		lp.sense_ = highspy.ObjSense.kMinimize
+	return lp
+
+def SolveMILPWithHiGHS(Model, WarmStart=None, TimeLimit=None, MipGap=None, Verbose=False):
+	"""
+	Solve MILP model with HiGHS (python package highspy).
+
+	WarmStart: Optional start solution (array of length n) for the branch-and-bound.
+
+	Returns: (Status, x, ObjValue), see MILPStatus
+	"""
+	lp = GetHiGHSModel(Model)
+
+	import highspy
+	h = highspy.Highs()
+	h.setOptionValue('output_flag', bool(Verbose))
+	if TimeLimit != None:
+		h.setOptionValue('time_limit', float(TimeLimit))
+	if MipGap != None:
+		h.setOptionValue('mip_rel_gap', float(MipGap))
+	h.passModel(lp)
+
+	if WarmStart is not None:
+		StartSol = highspy.HighsSolution()
+		StartSol.col_value = list(WarmStart)
+		h.setSolution(StartSol)
+
+	h.run()
+	ModelStatus = h.getModelStatus()
+
+	if ModelStatus == highspy.HighsModelStatus.kInfeasible:
+		return (MILPStatus['Infeasible'], None, None)
+
+	Info = h.getInfo()
+	if Info.primal_solution_status != 2: 		# 2: feasible primal solution
+		return (MILPStatus['NoSolution'], None, None)
+
+	x = np.array(h.getSolution().col_value)
+	ObjValue = Info.objective_function_value
+
+	if ModelStatus == highspy.HighsModelStatus.kOptimal:
+		return (MILPStatus['Optimal'], x, ObjValue)
+	return (MILPStatus['Feasible'], x, ObjValue)
+
+def GetPuLPModel(Model, LPRelaxation=False):
+	"""
+	Convert MILP model dictionary to a PuLP problem (python package pulp, 1.x for Python 2 or 2.x);
+	rows are named constraints 'r<i>_e' (equality), 'r<i>_u' (upper bound) and 'r<i>_l' (lower bound).
+
+	LPRelaxation: If True, all columns are continuous (integrality is ignored).
+
+	Returns: (prob, Vars, RowConstraints)
+		RowConstraints: List of (RowIndex, ConstraintName)
+	"""
+	try:
+		import pulp
+	except ImportError:
+		raise Exception("Solver backend 'cbc' requires the python package pulp!")
+
+	A = Model['A']
+	(m, n) = A.shape
+
+	if Model['Maximize']:
+		prob = pulp.LpProblem('MILP', pulp.LpMaximize)
+	else:
+		prob = pulp.LpProblem('MILP', pulp.LpMinimize)
+
+	# columns
+	Vars = []
+	for j in range(0, n):
+		LowBound = Model['ColLower'][j]
+		UpBound = Model['ColUpper'][j]
+		if np.isinf(LowBound): LowBound = None
+		if np.isinf(UpBound): UpBound = None
+		cat = pulp.LpContinuous
+		if Model['Integrality'][j] and not LPRelaxation: cat = pulp.LpInteger
+		Vars.append(pulp.LpVariable('x%s' % j, lowBound=LowBound, upBound=UpBound, cat=cat))
+
+	# objective
+	NonZero = np.nonzero(Model['c'])[0]
+	prob += pulp.LpAffineExpression([(Vars[j], Model['c'][j]) for j in NonZero])
+
+	# rows, read directly from CSR arrays
+	RowConstraints = []
+	for i in range(0, m):
+		(s, e) = (A.indptr[i], A.indptr[i+1])
+		expr = pulp.LpAffineExpression([(Vars[j], v) for (j, v) in zip(A.indices[s:e], A.data[s:e])])
+		RowLower = Model['RowLower'][i]
+		RowUpper = Model['RowUpper'][i]
+		if RowLower == RowUpper:
+			prob += (expr == RowUpper, 'r%s_e' % i)
+			RowConstraints.append((i, 'r%s_e' % i))
+			continue
+		if not np.isinf(RowUpper):
+			prob += (expr <= RowUpper, 'r%s_u' % i)
+			RowConstraints.append((i, 'r%s_u' % i))
+		if not np.isinf(RowLower):
+			prob += (expr >= RowLower, 'r%s_l' % i)
+			RowConstraints.append((i, 'r%s_l' % i))
+	return (prob, Vars, RowConstraints)
+
+def GetCBCSolverCommand(TimeLimit=None, MipGap=None, Verbose=False, WarmStart=False):
+	"""
+	Get the CBC solver command of pulp (CBC binary bundled with pulp), with the keyword
+	arguments of pulp 2.x, or of pulp 1.x for Python 2 (maxSeconds, fracGap; no warm start).
+
+	Returns: (solver, IfWarmStart)
+	"""
+	import pulp
+	if hasattr(pulp, 'LpSolutionOptimal'):
+		return (pulp.PULP_CBC_CMD(msg=bool(Verbose), timeLimit=TimeLimit, gapRel=MipGap, warmStart=WarmStart), WarmStart)
+	return (pulp.PULP_CBC_CMD(msg=int(bool(Verbose)), maxSeconds=TimeLimit, fracGap=MipGap), False)
+
+def GetCBCSolutionStatus(prob, Vars):
+	"""
+	Get solution status of a solved PuLP problem; solution status of pulp 2.x (sol_status),
+	or status and solution values of pulp 1.x.
+
+	Returns: Status, see MILPStatus
+	"""
+	import pulp
+	if prob.status == pulp.LpStatusInfeasible:
+		return MILPStatus['Infeasible']
+
+	if hasattr(prob, 'sol_status'):
+		if prob.sol_status == pulp.LpSolutionOptimal:
+			return MILPStatus['Optimal']
+		if prob.sol_status == pulp.LpSolutionIntegerFeasible:
+			return MILPStatus['Feasible']
+		return MILPStatus['NoSolution']
+
+	# pulp 1.x: values of a stopped run (like time limit) are read as well
+	if prob.status == pulp.LpStatusOptimal:
+		return MILPStatus['Optimal']
+	if Vars and all(v.varValue != None for v in Vars):
+		return MILPStatus['Feasible']
+	return MILPStatus['NoSolution']
+
+def SolveMILPWithCBC(Model, WarmStart=None, TimeLimit=None, MipGap=None, Verbose=False):
+	"""
+	Solve MILP model with COIN-OR CBC (python package pulp, see GetPuLPModel);
+	open-source, also for Python 2 (pulp 1.x).
+
+	WarmStart: Optional start solution (array of length n) for the branch-and-bound;
+		ignored with pulp 1.x.
+
+	Returns: (Status, x, ObjValue), see MILPStatus
+	"""
+	(prob, Vars, RowConstraints) = GetPuLPModel(Model)
+
+	import pulp
+	(solver, IfWarmStart) = GetCBCSolverCommand(TimeLimit, MipGap, Verbose, WarmStart is not None)
+	if IfWarmStart:
+		for j in range(0, len(Vars)):
+			Vars[j].setInitialValue(WarmStart[j])
+
+	prob.solve(solver)
+
+	Status = GetCBCSolutionStatus(prob, Vars)
+	if Status in (MILPStatus['Infeasible'], MILPStatus['NoSolution']):
+		return (Status, None, None)
+
+	x = np.array([v.varValue if v.varValue != None else 0.0 for v in Vars])
+	ObjValue = pulp.value(prob.objective)
+	if ObjValue == None:
+		ObjValue = 0.0
+	return (Status, x, ObjValue)
+
+def GetGurobiModel(Model, LPRelaxation=False, TimeLimit=None, Verbose=False):
+	"""
+	Convert MILP model dictionary to a Gurobi model (python package gurobipy, commercial license required).
+
+	The model is passed in matrix form (addMVar, addMConstr) without building
+	constraints row by row; upper and lower row bounds are two constraint blocks.
+
+	LPRelaxation: If True, all columns are continuous (integrality is ignored).
+
+	Returns: (model, x, RowBlocks)
+		RowBlocks: List of (RowIndices, MConstr) of the upper and lower row bound blocks
+	"""
+	try:
+		import gurobipy as gp
+		from gurobipy import GRB
+	except ImportError:
+		raise Exception("Solver backend 'gurobi' requires the python package gurobipy!")
+
+	A = Model['A']
+	(m, n) = A.shape
+
+	model = gp.Model('MILP')
+	model.Params.OutputFlag = int(bool(Verbose))
+	if TimeLimit != None:
+		model.Params.TimeLimit = TimeLimit
+
+	vtype = np.where(Model['Integrality'] == 1, GRB.INTEGER, GRB.CONTINUOUS)
+	if LPRelaxation:
+		vtype = GRB.CONTINUOUS
+	ColUpper = np.where(np.isinf(Model['ColUpper']), GRB.INFINITY, Model['ColUpper'])
+	x = model.addMVar(n, lb=Model['ColLower'], ub=ColUpper, vtype=vtype)
+
+	sense = GRB.MINIMIZE
+	if Model['Maximize']: sense = GRB.MAXIMIZE
+	model.setMObjective(None, Model['c'], 0.0, xc=x, sense=sense)
+
+	RowBlocks = []
+	Upper = np.nonzero(~np.isinf(Model['RowUpper']))[0]
+	if len(Upper):
+		RowBlocks.append((Upper, model.addMConstr(A[Upper, :], x, GRB.LESS_EQUAL, Model['RowUpper'][Upper])))
+	Lower = np.nonzero(~np.isinf(Model['RowLower']))[0]
+	if len(Lower):
+		RowBlocks.append((Lower, model.addMConstr(A[Lower, :], x, GRB.GREATER_EQUAL, Model['RowLower'][Lower])))
+	return (model, x, RowBlocks)
+
+def SolveMILPWithGurobi(Model, WarmStart=None, TimeLimit=None, MipGap=None, Verbose=False):
+	"""
+	Solve MILP model with Gurobi (python package gurobipy, commercial license required),
+	see GetGurobiModel.
+
+	Returns: (Status, x, ObjValue), see MILPStatus
+	"""
+	(model, x, RowBlocks) = GetGurobiModel(Model, False, TimeLimit, Verbose)
+
+	from gurobipy import GRB
+	if MipGap != None:
+		model.Params.MIPGap = MipGap
+
+	if WarmStart is not None:
+		x.setAttr('Start', np.asarray(WarmStart, dtype=float))
+
+	model.optimize()
+
+	if model.Status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+		return (MILPStatus['Infeasible'], None, None)
+	if model.SolCount == 0:
+		return (MILPStatus['NoSolution'], None, None)
+
+	xValue = np.array(x.X)
+	if model.Status == GRB.OPTIMAL:
+		return (MILPStatus['Optimal'], xValue, model.ObjVal)
+	return (MILPStatus['Feasible'], xValue, model.ObjVal)
+
+# registered solver backends; add new backends with RegisterMILPSolver
+MILPSolvers = {
+	'highs': 	SolveMILPWithHiGHS,
+	'cbc': 		SolveMILPWithCBC,
+	'gurobi': 	SolveMILPWithGurobi,
+}
+
+# python package required by solver backend, see CheckIfMILPSolverIsAvailable
+MILPSolverPackages = {
+	'highs': 	'highspy',
+	'cbc': 		'pulp',
+	'gurobi': 	'gurobipy',
+}
+
+def RegisterMILPSolver(SolverName, SolverFunc, RequiredPackage=None):
+	"""
+	Register a new solver backend.
+
+	SolverFunc(Model, WarmStart, TimeLimit, MipGap, Verbose) must return (Status, x, ObjValue).
+	RequiredPackage: Name of python package required by the backend, like 'gurobipy'
+	"""
+	MILPSolvers[SolverName] = SolverFunc
+	MILPSolverPackages[SolverName] = RequiredPackage
+
+def CheckIfMILPSolverIsAvailable(Solver):
+	"""
+	Return True if the solver backend is registered and its python package can be imported.
+	"""
+	if not Solver in MILPSolvers:
+		return False
+	if not MILPSolverPackages.get(Solver):
+		return True
+	try:
+		__import__(MILPSolverPackages[Solver])
+	except ImportError:
+		return False
+	return True
+
+def GetAvailableMILPSolvers():
+	"""
+	Returns: List of registered solver backends whose python packages can be imported
+	"""
+	return [Solver for Solver in sorted(MILPSolvers) if CheckIfMILPSolverIsAvailable(Solver)]
+
+# order of default solver backends, see GetDefaultMILPSolver
+DefaultMILPSolverOrder = ['cbc', 'gurobi', 'highs']
+
+def GetDefaultMILPSolver(Solvers=None):
+	"""
+	Get the first available solver backend of DefaultMILPSolverOrder.
+
+	Solvers: Registered backends to choose from (like LPSolvers); MILPSolvers if None
+
+	Returns: SolverName
+	"""
+	if Solvers == None:
+		Solvers = MILPSolvers
+	for Solver in DefaultMILPSolverOrder:
+		if Solver in Solvers and CheckIfMILPSolverIsAvailable(Solver):
+			return Solver
+	raise Exception("No MILP solver available! Install one of the python packages %s (like pulp for CBC)." \
+		% [MILPSolverPackages[Solver] for Solver in DefaultMILPSolverOrder])
+
+def CheckMILPSolver(Solver):
+	"""
+	Raise an exception if the solver backend is not registered or its python package is missing,
+	with the names of the available backends.
+	"""
+	if not Solver in MILPSolvers:
+		raise Exception("Undefined MILP solver %s! Registered solvers: %s, available solvers: %s" \
+			% (Solver, sorted(MILPSolvers), GetAvailableMILPSolvers()))
+	if not CheckIfMILPSolverIsAvailable(Solver):
+		raise Exception("MILP solver %s is not available, python package %s cannot be imported! Available solvers: %s" \
+			% (Solver, MILPSolverPackages[Solver], GetAvailableMILPSolvers()))
+
+def SolveMILP(Model, Solver=None, WarmStart=None, TimeLimit=None, MipGap=None, Verbose=False):
+	"""
+	Solve MILP model with the given solver backend (see MILPSolvers); the availability
+	of the backend is checked before solving (see CheckMILPSolver).
+
+	Solver: Name of solver backend; default backend if None (see GetDefaultMILPSolver)
+
+	Returns: (Status, x, ObjValue, SolveTime), see MILPStatus
+	"""
+	if Solver == None:
+		Solver = GetDefaultMILPSolver()
+	CheckMILPSolver(Solver)
+
+	if WarmStart is not None and len(WarmStart) != Model['A'].shape[1]:
+		raise Exception("WarmStart must have a value for each of the %s columns!" % Model['A'].shape[1])
+
+	StartTime = default_timer()
+	(Status, x, ObjValue) = MILPSolvers[Solver](Model, WarmStart, TimeLimit, MipGap, Verbose)
+	SolveTime = default_timer() - StartTime
+
+	# constant part of the objective
+	if ObjValue != None:
+		ObjValue += Model['ObjOffset']
+
+	return (Status, x, ObjValue, SolveTime)
+
+# **************************************************************************************
+# LP relaxation with dual values
+# **************************************************************************************
+
+def SolveLPRelaxationWithHiGHS(Model, TimeLimit=None, Verbose=False):
+	"""
+	Solve the LP relaxation of the MILP model with HiGHS (python package highspy).
+
+	Returns: (Status, x, ObjValue, RowDuals), see SolveLPRelaxation
+	"""
+	lp = GetHiGHSModel(Model, LPRelaxation=True)
+
+	import highspy
+	h = highspy.Highs()
+	h.setOptionValue('output_flag', bool(Verbose))
+	if TimeLimit != None:
+		h.setOptionValue('time_limit', float(TimeLimit))
+	h.passModel(lp)
+
+	h.run()
+	ModelStatus = h.getModelStatus()
+
+	if ModelStatus == highspy.HighsModelStatus.kInfeasible:
+		return (MILPStatus['Infeasible'], None, None, None)
+	if ModelStatus != highspy.HighsModelStatus.kOptimal:
+		return (MILPStatus['NoSolution'], None, None, None)
+
+	Solution = h.getSolution()
+	x = np.array(Solution.col_value)
+	RowDuals = np.array(Solution.row_dual)
+	return (MILPStatus['Optimal'], x, h.getInfo().objective_function_value, RowDuals)
+
+def SolveLPRelaxationWithGurobi(Model, TimeLimit=None, Verbose=False):
+	"""
+	Solve the LP relaxation of the MILP model with Gurobi (see GetGurobiModel);
+	the dual value of a row is the sum of the duals (Pi) of its upper and lower bound constraints.
+
+	Returns: (Status, x, ObjValue, RowDuals), see SolveLPRelaxation
+	"""
+	(model, x, RowBlocks) = GetGurobiModel(Model, True, TimeLimit, Verbose)
+
+	from gurobipy import GRB
+	model.optimize()
+
+	if model.Status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+		return (MILPStatus['Infeasible'], None, None, None)
+	if model.Status != GRB.OPTIMAL:
+		return (MILPStatus['NoSolution'], None, None, None)
+
+	RowDuals = np.zeros(Model['A'].shape[0])
+	for (RowIndices, MConstr) in RowBlocks:
+		RowDuals[RowIndices] += np.asarray(MConstr.Pi)
+	return (MILPStatus['Optimal'], np.array(x.X), model.ObjVal, RowDuals)
+
+def SolveLPRelaxationWithCBC(Model, TimeLimit=None, Verbose=False):
+	"""
+	Solve the LP relaxation of the MILP model with COIN-OR CBC/CLP (python package pulp,
+	see GetPuLPModel), also for Python 2 (pulp 1.x); the dual value of a row is the sum
+	of the duals (pi) of its upper and lower bound constraints.
+
+	Returns: (Status, x, ObjValue, RowDuals), see SolveLPRelaxation
+	"""
+	(prob, Vars, RowConstraints) = GetPuLPModel(Model, LPRelaxation=True)
+
+	import pulp
+	solver = GetCBCSolverCommand(TimeLimit, None, Verbose)[0]
+	prob.solve(solver)
+
+	if prob.status == pulp.LpStatusInfeasible:
+		return (MILPStatus['Infeasible'], None, None, None)
+	if prob.status != pulp.LpStatusOptimal:
+		return (MILPStatus['NoSolution'], None, None, None)
+
+	RowDuals = np.zeros(Model['A'].shape[0])
+	for (i, name) in RowConstraints:
+		pi = prob.constraints[name].pi
+		if pi != None:
+			RowDuals[i] += pi
+
+	x = np.array([v.varValue if v.varValue != None else 0.0 for v in Vars])
+	ObjValue = pulp.value(prob.objective)
+	if ObjValue == None:
+		ObjValue = 0.0
+	return (MILPStatus['Optimal'], x, ObjValue, RowDuals)
+
+# registered solver backends with dual values of the LP relaxation; add new backends with RegisterLPSolver
+LPSolvers = {
+	'cbc': 		SolveLPRelaxationWithCBC,
+	'highs': 	SolveLPRelaxationWithHiGHS,
+	'gurobi': 	SolveLPRelaxationWithGurobi,
+}
+
+def RegisterLPSolver(SolverName, SolverFunc):
+	"""
+	Register a new solver backend for LP relaxations; the backend must also be registered
+	as MILP solver (see RegisterMILPSolver).
+
+	SolverFunc(Model, TimeLimit, Verbose) must return (Status, x, ObjValue, RowDuals).
+	"""
+	LPSolvers[SolverName] = SolverFunc
+
+def SolveLPRelaxation(Model, Solver=None, TimeLimit=None, Verbose=False):
+	"""
+	Solve the LP relaxation of the MILP model (all columns continuous) with the given
+	solver backend (see LPSolvers), and get the dual values of the rows,
+	like for pricing in column generation.
+
+	Solver: Name of LP solver backend; first available of DefaultMILPSolverOrder
+		in LPSolvers if None (open-source CBC with pulp)
+
+	RowDuals[i]: Change of the objective value per unit increase of the
+		active row bound i (shadow price); 0 for non-binding rows.
+
+	Returns: (Status, x, ObjValue, RowDuals, SolveTime), see MILPStatus
+	"""
+	if Solver == None:
+		Solver = GetDefaultMILPSolver(LPSolvers)
+	if not Solver in LPSolvers:
+		raise Exception("No LP relaxation with dual values for solver %s! LP solvers: %s" % (Solver, sorted(LPSolvers)))
+	CheckMILPSolver(Solver)
+
+	StartTime = default_timer()
+	(Status, x, ObjValue, RowDuals) = LPSolvers[Solver](Model, TimeLimit, Verbose)
+	SolveTime = default_timer() - StartTime
+
+	# constant part of the objective
+	if ObjValue != None:
+		ObjValue += Model['ObjOffset']
+
+	return (Status, x, ObjValue, RowDuals, SolveTime)
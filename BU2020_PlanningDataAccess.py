@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Planning data access layer for test customer (TC) inputs of assignment planning:
+
+1) Connection pool per database (psycopg2.pool), instead of a new connection per query
+2) All TC inputs of a period and project loaded in one transaction with three queries:
+	TCs of project, exclusion dates (availability) of these TCs, TC data (block days, alternative depots)
+3) Bulk reads with fetchmany (see FetchAllRowsInBatches); the timetable is read with
+	a server-side cursor in batches (see FetchRowBatchesWithServerSideCursor)
+4) Cache of loaded TC inputs per (PeriodBegin, PeriodEnd, project)
+5) Concurrent loading of all planning inputs (timetable, station chains, TC data) in a thread pool,
+	each query on its own pooled connection; returns one planning input bundle (see LoadPlanningInputs)
+
+Loaded dictionaries are the same as those of VerfuegbarkeitTK, TestKunden, MaxBlockTageTC
+and AlternativeDepotTK.
+"""
+import copy
+import time
+import threading
+import psycopg2
+import psycopg2.pool
+from multiprocessing.pool import ThreadPool
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+
+# connection pools per database parameters, see GetConnectionPool
+ConnectionPools = {}
+
+# lock for creation of connection pools by concurrent load tasks, see GetConnectionPool
+ConnectionPoolsLock = threading.Lock()
+
+# cache of TC data per (PeriodBegin, PeriodEnd, project), see LoadTestCustomerData
+TCDataCache = {}
+
+#######################################################################################
+# CONNECTION POOL
+#######################################################################################
+
+def GetConnectionPool(DBparameters, MinConnections=1, MaxConnections=8):
+	"""
+	Get (or create) thread-safe connection pool for database parameters DBparameters;
+	a pool is created only once per DBparameters, also by concurrent threads.
+
+	Returns: ConnectionPool (psycopg2.pool.ThreadedConnectionPool)
+	"""
+	PoolKey = tuple(sorted(DBparameters.items()))
+	with ConnectionPoolsLock:
+		if not PoolKey in ConnectionPools:
+			ConnectionPools[PoolKey] = psycopg2.pool.ThreadedConnectionPool(MinConnections, MaxConnections, **DBparameters)
+		return ConnectionPools[PoolKey]
+
+def GetPooledConnection(DBparameters):
+	"""
+	Get a connection from the pool of DBparameters; return it with ReleasePooledConnection
+	to the same pool.
+
+	Returns: (ConnectionPool, Connection)
+	"""
+	ConnectionPool = GetConnectionPool(DBparameters)
+	return (ConnectionPool, ConnectionPool.getconn())
+
+def ReleasePooledConnection(ConnectionPool, conn):
+	"""
+	Return connection to the pool it was taken from (see GetPooledConnection);
+	an open transaction is rolled back.
+	"""
+	if not conn.closed:
+		conn.rollback()
+	ConnectionPool.putconn(conn)
+
+def CloseConnectionPools():
+	"""
+	Close all connections of all pools.
+	"""
+	with ConnectionPoolsLock:
+		for PoolKey in ConnectionPools:
+			ConnectionPools[PoolKey].closeall()
+		ConnectionPools.clear()
+
+#######################################################################################
+# TEST CUSTOMER (TC) DATA
+#######################################################################################
+
+def LoadTestCustomerData(DBparameters, PeriodBegin, PeriodEnd, project, UseCache=True):
+	"""
+	Load all TC inputs of a period and project in one transaction on a pooled connection.
+
+	DBparameters: Parameters of TC database with schema tp_bav (like QDBparameters of VerfuegbarkeitTK)
+
+	PeriodBegin, PeriodEnd: Period like date(2016,7,1), date(2016,7,31)
+	project: Project name like 'BAV', 'SBB' or 'RBS'
+	UseCache: If True, TC data are loaded once per (PeriodBegin, PeriodEnd, project)
+
+	Returns: TCData (dictionary; a copy if read from cache)
+		TCData['TestCustomers'][TC] = name, see TestKunden
+		TCData['Availability'][(TC, DayOrd)] = list of time intervals or None, see VerfuegbarkeitTK
+		TCData['MaxBlockDays'][TC] = n, see MaxBlockTageTC
+		TCData['AlternativeDepots'][TC] = [(typ, wert), ...], see AlternativeDepotTK
+	"""
+	CacheKey = (PeriodBegin, PeriodEnd, project)
+	if UseCache and CacheKey in TCDataCache:
+		return copy.deepcopy(TCDataCache[CacheKey])
+
+	(ConnectionPool, conn) = GetPooledConnection(DBparameters)
+	try:
+		cursor = conn.cursor()
+
+		# TCs of project
+		SQL_TK = '''SELECT anwender.id_anwender, anwender.vorname, anwender.name
+			FROM tp_bav.anwender, tp_bav.anwenderanwendungsfall, tp_bav.anwendungsfall
+			WHERE anwenderanwendungsfall.id_anwender = anwender.id_anwender
+			AND anwendungsfall.id_anwendungsfall = anwenderanwendungsfall.id_anwendungsfall
+			AND anwendungsfalllang = %s;'''
+		cursor.execute(SQL_TK, (project,))
+		TKdata = FetchAllRowsInBatches(cursor)
+		TCIDs = [TK[0] for TK in TKdata]
+
+		# exclusion dates of TCs of project
+		SQL_AT = '''SELECT * FROM tp_bav.ausschlusstermin
+			WHERE datum BETWEEN %s AND %s AND eingetragen_nutzer = ANY(%s);'''
+		cursor.execute(SQL_AT, (PeriodBegin, PeriodEnd, TCIDs))
+		ATdata = FetchAllRowsInBatches(cursor)
+
+		# TC data: block days and alternative depots
+		SQL_TD = '''SELECT id_testkunde, typ, wert FROM tp_bav.testkunden_daten
+			WHERE datum BETWEEN %s AND %s;'''
+		cursor.execute(SQL_TD, (PeriodBegin, PeriodEnd))
+		TDdata = FetchAllRowsInBatches(cursor)
+	finally:
+		ReleasePooledConnection(ConnectionPool, conn)
+
+	TCData = {
+		'TestCustomers': 		GetTestCustomersFromRows(TKdata),
+		'Availability': 		GetAvailabilityOfTCsFromExclusionRows(ATdata),
+		'MaxBlockDays': 		GetMaxBlockDaysFromTCDataRows(TDdata),
+		'AlternativeDepots': 	GetAlternativeDepotsFromTCDataRows(TDdata),
+		}
+
+	if UseCache:
+		TCDataCache[CacheKey] = copy.deepcopy(TCData)
+	return TCData
+
+def ClearTestCustomerDataCache():
+	"""
+	Clear cache of loaded TC data, like after changes of TC inputs in database.
+	"""
+	TCDataCache.clear()
+
+#######################################################################################
+# CONCURRENT LOADING OF PLANNING INPUTS
+#######################################################################################
+
+def RunTimedLoadTask(TaskFunction, TaskArgs):
+	"""
+	Run load task TaskFunction(*TaskArgs) and measure its time (worker thread).
+
+	Returns: (TaskResult, TaskTime in seconds)
+	"""
+	st = time.time()
+	TaskResult = TaskFunction(*TaskArgs)
+	return (TaskResult, time.time() - st)
+
+def LoadTimeTableTask(DBparameters, RouteConditions):
+	"""
+	Load task of timetable on a pooled connection; rows are read with a server-side cursor
+	(without prepared statement) and added to the timetable builder batch by batch
+	while fetching (see ReadTimeTable).
+
+	Returns: (TimeTableList, TimeTableIndex, StationHourIndex)
+	"""
+	(ConnectionPool, conn) = GetPooledConnection(DBparameters)
+	try:
+		return ReadTimeTable(conn.cursor(), RouteConditions, IfPreparedStatement=False)
+	finally:
+		ReleasePooledConnection(ConnectionPool, conn)
+
+def LoadStationChainsTask(DBparameters, RouteConditions):
+	"""
+	Load task of station chains per fahrt_id on a pooled connection (see GetCompleteStationChainInformation).
+
+	Returns: global_StationChainInfoPerFahrtID
+	"""
+	(ConnectionPool, conn) = GetPooledConnection(DBparameters)
+	try:
+		GetCompleteStationChainInformation(conn.cursor(), RouteConditions)
+	finally:
+		ReleasePooledConnection(ConnectionPool, conn)
+	return global_StationChainInfoPerFahrtID
+
+def LoadPlanningInputs(DBparameters, RouteConditions, PeriodBegin=None, PeriodEnd=None, project=None, \
+	IfStationChains=False, TCDBparameters=None):
+	"""
+	Load planning inputs concurrently, each query in a worker thread with its own pooled connection
+	(see GetConnectionPool, at most 8 connections by default);
+	the total load time approaches the time of the slowest single query. The big timetable result is
+	converted batch by batch while it is fetched, and while the smaller queries finish.
+
+	DBparameters: Parameters of timetable database (like PrimaryDB)
+	RouteConditions: Route conditions of timetable query (see ReadTimeTable)
+	PeriodBegin, PeriodEnd, project: Period and project of TC data; TC data are not loaded if project is None
+	TCDBparameters: Parameters of TC database (like QDBparameters), with its own connection pool;
+		required if project is not None
+	IfStationChains: If True, station chains per fahrt_id are loaded (see GetCompleteStationChainInformation)
+
+	Returns: PlanningInputs (dictionary)
+		PlanningInputs['TimeTable'] = (TimeTableList, TimeTableIndex, StationHourIndex), see ReadTimeTable
+		PlanningInputs['StationChains'] = global_StationChainInfoPerFahrtID, or None
+		PlanningInputs['TCData'] = TCData (see LoadTestCustomerData), or None
+		PlanningInputs['LoadTimes'][TaskName] = load time in seconds, TaskName = 'Total' for all
+	"""
+	LoadTasks = {'TimeTable': (LoadTimeTableTask, (DBparameters, RouteConditions))}
+	if IfStationChains:
+		LoadTasks['StationChains'] = (LoadStationChainsTask, (DBparameters, RouteConditions))
+	if project != None:
+		if TCDBparameters == None:
+			raise Exception("Parameters of TC database (TCDBparameters) are required for TC data of project %s!" % project)
+		LoadTasks['TCData'] = (LoadTestCustomerData, (TCDBparameters, PeriodBegin, PeriodEnd, project))
+
+	# create connection pools before the workers
+	GetConnectionPool(DBparameters)
+	if project != None:
+		GetConnectionPool(TCDBparameters)
+
+	st = time.time()
+	Workers = ThreadPool(len(LoadTasks))
+	try:
+		AsyncResults = {}
+		for TaskName in LoadTasks:
+			(TaskFunction, TaskArgs) = LoadTasks[TaskName]
+			AsyncResults[TaskName] = Workers.apply_async(RunTimedLoadTask, (TaskFunction, TaskArgs))
+		TaskResults = dict((TaskName, AsyncResults[TaskName].get()) for TaskName in AsyncResults)
+	finally:
+		Workers.close()
+		Workers.join()
+
+	PlanningInputs = {'TimeTable': None, 'StationChains': None, 'TCData': None, 'LoadTimes': {}}
+	for TaskName in TaskResults:
+		(PlanningInputs[TaskName], PlanningInputs['LoadTimes'][TaskName]) = TaskResults[TaskName]
+	PlanningInputs['LoadTimes']['Total'] = time.time() - st
+	return PlanningInputs
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Rolling-horizon assignment planning over several months of a plan year (see PlanMonths).
+
+For each plan month m:
+1) Plan assignments for the horizon m, m+1, ..., m+k (k: LookaheadMonths), with the
+	remaining (yearly) LM requirements, or their share for the horizon.
+2) Commit the assignments of month m only.
+3) Subtract the LM coverage of the committed assignments from the remaining requirements.
+4) Roll forward to month m+1.
+
+Route pool and assignment parameters (like LMCoveragePerDayRoute) of each month are kept
+in a planning cache and reused across months; routes found for a lookahead month are
+available for all following plans.
+"""
+import math
+from timeit import default_timer
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+from BU2020_AssignmentFunctions import *
+from BU2020_ColumnGeneration import *
+
+#######################################################################################
+# PLANNING CACHE: ROUTE POOL & ASSIGNMENT PARAMETERS PER MONTH
+#######################################################################################
+
+def InitRollingHorizonCache(StartStationPerTestCustomer, LMRequirements, RouteInfoList=None):
+	"""
+	Initiate planning cache of rolling-horizon planning.
+
+	LMRequirements: (Yearly) LM requirements; LM coverage of routes is evaluated for
+		these LineKeys only.
+	RouteInfoList: Initial route pool
+
+	Returns: PlanningCache dictionary with keys:
+		'RoutePool': 		List of routes (RouteInfo), r is the index of a route
+		'RouteKeys': 		Set of route keys, see GetRouteKey
+		'SearchedMonths': 	Set of (year, month) for which routes were searched
+		'ParametersPerMonth'[(year, month)] = AssignmentPlanningVariables of month
+		'StartStationPerTestCustomer', 'LMRequirements': inputs of the cache
+	"""
+	PlanningCache = {
+		'RoutePool': 					[],
+		'RouteKeys': 					set(),
+		'SearchedMonths': 				set(),
+		'ParametersPerMonth': 			{},
+		'StartStationPerTestCustomer': 	StartStationPerTestCustomer,
+		'LMRequirements': 				LMRequirements,
+	}
+	if RouteInfoList:
+		AddRoutesToPool(PlanningCache, RouteInfoList)
+	return PlanningCache
+
+def AddRoutesToPool(PlanningCache, RouteInfoList):
+	"""
+	Add new (not yet included) routes to the route pool of planning cache.
+	Route indices of the pool remain unchanged.
+
+	Returns: Number of added routes
+	"""
+	ctr = 0
+	for RouteInfo in RouteInfoList:
+		RouteKey = GetRouteKey(RouteInfo)
+		if RouteKey in PlanningCache['RouteKeys']: continue
+		PlanningCache['RoutePool'].append(RouteInfo)
+		PlanningCache['RouteKeys'].add(RouteKey)
+		ctr += 1
+	return ctr
+
+def GetAssignmentParametersOfMonth(PlanningCache, PlanYear, PlanMonth):
+	"""
+	Get assignment parameters of a month for all routes of the route pool
+	(see GenerateAssignmentPlanningVariables); cached parameters are extended
+	for routes added to the pool since the last call.
+
+	Returns: AssignmentPlanningVariables of month
+	"""
+	(FirstDayOfMonth, LastDayOfMonth) = GetFirstAndLastDaysOfMonth(PlanYear, PlanMonth)
+	ParametersPerMonth = PlanningCache['ParametersPerMonth']
+
+	ParametersPerMonth[(PlanYear, PlanMonth)] = GenerateAssignmentPlanningVariables(PlanningCache['RoutePool'],
+		PlanningCache['StartStationPerTestCustomer'], ReqLineMeasureTime, FirstDayOfMonth, LastDayOfMonth,
+		PlanningCache['LMRequirements'], ParametersPerMonth.get((PlanYear, PlanMonth)))
+
+	return ParametersPerMonth[(PlanYear, PlanMonth)]
+
+def GetAssignmentParametersOfHorizon(PlanningCache, PlanYear, HorizonMonths):
+	"""
+	Get assignment parameters of a planning horizon (list of subsequent months)
+	by merging the (cached) parameters of the months.
+
+	Returns: AssignmentPlanningVariables of horizon
+	"""
+	HorizonParameters = {
+		'LMCoveragePerDayRoute': 		{},
+		'AvailableRoutesPerTCAndDay': 	{},
+	}
+	for PlanMonth in HorizonMonths:
+		MonthParameters = GetAssignmentParametersOfMonth(PlanningCache, PlanYear, PlanMonth)
+		HorizonParameters['LMCoveragePerDayRoute'].update(MonthParameters['LMCoveragePerDayRoute'])
+		HorizonParameters['AvailableRoutesPerTCAndDay'].update(MonthParameters['AvailableRoutesPerTCAndDay'])
+
+		# route-specific variables are the same for all months
+		HorizonParameters['TimeIntervalOfRoute'] = MonthParameters['TimeIntervalOfRoute']
+		HorizonParameters['TravelIDListOfRoute'] = MonthParameters['TravelIDListOfRoute']
+
+	return HorizonParameters
+
+#######################################################################################
+# REQUIREMENTS
+#######################################################################################
+
+def GetRequirementsOfHorizon(RemainingLMRequirements, HorizonMonthCount, RemainingMonthCount):
+	"""
+	Get share of remaining LM requirements for a planning horizon, assuming that
+	the requirements are spread evenly over the remaining months (rounded up).
+
+	Returns: LMRequirementsOfHorizon[LineKey] = x
+	"""
+	LMRequirementsOfHorizon = {}
+	for LineKey in RemainingLMRequirements:
+		x = int(math.ceil(RemainingLMRequirements[LineKey] * float(HorizonMonthCount) / RemainingMonthCount))
+		if x > 0:
+			LMRequirementsOfHorizon[LineKey] = x
+	return LMRequirementsOfHorizon
+
+def SubtractLMCoverageFromRequirements(LMRequirements, LMCoveragePerLineKey):
+	"""
+	Subtract achieved LM coverage from LM requirements.
+
+	Returns: RemainingLMRequirements[LineKey] = x, for x > 0 only
+	"""
+	RemainingLMRequirements = {}
+	for LineKey in LMRequirements:
+		x = LMRequirements[LineKey] - LMCoveragePerLineKey.get(LineKey, 0)
+		if x > 0:
+			RemainingLMRequirements[LineKey] = x
+	return RemainingLMRequirements
+
+#######################################################################################
+# ROLLING-HORIZON PLANNING
+#######################################################################################
+
+def PlanAssignmentsWithRollingHorizon(PlanningCache, PlanYear, PlanMonths, AssignmentConditions, Params,
+	LookaheadMonths=1, AssignmentFunc=FindOptimalAssignmentSolution, AssignmentFuncParameters=(),
+	RouteSearchFunc=None, RouteSearchParameters=(), MaxSurplusLM=2, SpreadRequirements=True, Verbose=True):
+	"""
+	Plan assignments for all PlanMonths (like range(1,11)) with a rolling horizon:
+	plan month m with lookahead over the months m+1..m+k (k = LookaheadMonths), commit
+	month m, subtract achieved LM coverage from the remaining requirements, roll forward.
+
+	PlanningCache: See InitRollingHorizonCache; its LMRequirements are the yearly requirements
+	AssignmentConditions: Conditions per month (see AssignCond); FirstAndLastDaysOfMeasurementPeriod
+		and MaxNumberOfMeasurementsPerLineKey are set for each horizon, MinNumberOfTripsPerTC
+		and MaxNumberOfTrips are scaled with the number of months of the horizon.
+	Params: Other assignment parameters (RevenueLineMeasure, CostLineMeasure,
+		TripCostPerTimeInterval, MinTripCountPerTC per month); route and day dependent
+		parameters are replaced by the parameters of the horizon.
+	AssignmentFunc: Assignment planner, called as
+		AssignmentFunc(AssignmentConditions, Params, *AssignmentFuncParameters)
+		returning the assignment solution as first element, like FindOptimalAssignmentSolution,
+		FindOptimalAssignmentSolutionPerDay or FindOptimalAssignmentSolutionMILP
+	RouteSearchFunc: Optional route search for a month, called once per month as
+		RouteSearchFunc(PlanYear, PlanMonth, *RouteSearchParameters) returning a RouteInfoList;
+		new routes are added to the route pool of PlanningCache.
+	MaxSurplusLM: Upper limit of measurements per LineKey = requirement of horizon + MaxSurplusLM
+	SpreadRequirements: If True, a horizon of h months gets the share h/M of the requirements
+		remaining for M months; otherwise all remaining requirements.
+
+	Note: Block days (MaxAllowedBlockDaysPerTC) are checked within each horizon only.
+
+	Returns: (AssignmentSolutionPerMonth, SolutionValuePerMonth, RemainingLMRequirements, RollingHorizonStatistics)
+		AssignmentSolutionPerMonth[m] = [(t,d,r), ...], r: index of route in PlanningCache['RoutePool']
+		RollingHorizonStatistics[m] = dictionary with statistics of month m
+	"""
+	PlanMonths = sorted(PlanMonths)
+	RemainingLMRequirements = dict(PlanningCache['LMRequirements'])
+
+	AssignmentSolutionPerMonth = {}
+	SolutionValuePerMonth = {}
+	RollingHorizonStatistics = {}
+
+	for i in range(0, len(PlanMonths)):
+		st = default_timer()
+		PlanMonth = PlanMonths[i]
+		HorizonMonths = PlanMonths[i: i + LookaheadMonths + 1]
+
+		# route search for new months of horizon
+		if RouteSearchFunc != None:
+			for month in HorizonMonths:
+				if (PlanYear, month) in PlanningCache['SearchedMonths']: continue
+				NewRouteCount = AddRoutesToPool(PlanningCache, RouteSearchFunc(PlanYear, month, *RouteSearchParameters))
+				PlanningCache['SearchedMonths'].add((PlanYear, month))
+				if Verbose:
+					print "Route search for month %s: %s new routes added to route pool" % (month, NewRouteCount)
+
+		# requirements & parameters of horizon
+		if SpreadRequirements:
+			LMRequirementsOfHorizon = GetRequirementsOfHorizon(RemainingLMRequirements, len(HorizonMonths), len(PlanMonths) - i)
+		else:
+			LMRequirementsOfHorizon = dict(RemainingLMRequirements)
+
+		HorizonParams = dict(Params)
+		HorizonParams.update(GetAssignmentParametersOfHorizon(PlanningCache, PlanYear, HorizonMonths))
+		HorizonParams['RouteInfoList'] = PlanningCache['RoutePool']
+		HorizonParams['StartStationPerTestCustomer'] = PlanningCache['StartStationPerTestCustomer']
+		HorizonParams['LMRequirements'] = LMRequirementsOfHorizon
+
+		UpperLimitLMperLineKey = {}
+		for LineKey in LMRequirementsOfHorizon:
+			UpperLimitLMperLineKey[LineKey] = LMRequirementsOfHorizon[LineKey] + MaxSurplusLM
+		HorizonParams['UpperLimitLMperLineKey'] = UpperLimitLMperLineKey
+
+		if Params.has_key('MinTripCountPerTC'):
+			HorizonParams['MinTripCountPerTC'] = {}
+			for t in Params['MinTripCountPerTC']:
+				HorizonParams['MinTripCountPerTC'][t] = Params['MinTripCountPerTC'][t] * len(HorizonMonths)
+
+		# assignment conditions of horizon
+		FirstDayOfHorizon = GetFirstAndLastDaysOfMonth(PlanYear, HorizonMonths[0])[0]
+		LastDayOfHorizon = GetFirstAndLastDaysOfMonth(PlanYear, HorizonMonths[-1])[1]
+
+		HorizonConditions = dict(AssignmentConditions)
+		HorizonConditions[AssignCond.FirstAndLastDaysOfMeasurementPeriod] = (FirstDayOfHorizon.toordinal(), LastDayOfHorizon.toordinal())
+		if HorizonConditions.has_key(AssignCond.MaxNumberOfMeasurementsPerLineKey):
+			HorizonConditions[AssignCond.MaxNumberOfMeasurementsPerLineKey] = (UpperLimitLMperLineKey,)
+		if HorizonConditions.has_key(AssignCond.MinNumberOfTripsPerTC):
+			HorizonConditions[AssignCond.MinNumberOfTripsPerTC] = (HorizonParams['MinTripCountPerTC'],)
+		if HorizonConditions.has_key(AssignCond.MaxNumberOfTrips):
+			HorizonConditions[AssignCond.MaxNumberOfTrips] = (AssignmentConditions[AssignCond.MaxNumberOfTrips][0] * len(HorizonMonths),)
+
+		# plan horizon, commit plan month
+		HorizonSolution = AssignmentFunc(HorizonConditions, HorizonParams, *AssignmentFuncParameters)[0]
+
+		(FirstDayOfMonth, LastDayOfMonth) = GetFirstAndLastDaysOfMonth(PlanYear, PlanMonth)
+		MonthSolution = [(t,d,r) for (t,d,r) in HorizonSolution \
+			if r != None and FirstDayOfMonth.toordinal() <= d <= LastDayOfMonth.toordinal()]
+		MonthSolution.sort(key=lambda tdr: (tdr[1], tdr[0]))
+
+		LMCoverageOfMonth = IncrementLMCounter(MonthSolution, {}, HorizonParams['LMCoveragePerDayRoute'])
+		SolutionValue = GetSolutionValue(MonthSolution, [], {}, RemainingLMRequirements, HorizonParams['LMCoveragePerDayRoute'],
+			HorizonParams['TimeIntervalOfRoute'], Params['RevenueLineMeasure'], Params['CostLineMeasure'],
+			Params['TripCostPerTimeInterval'])
+
+		RemainingLMRequirements = SubtractLMCoverageFromRequirements(RemainingLMRequirements, LMCoverageOfMonth)
+
+		AssignmentSolutionPerMonth[PlanMonth] = MonthSolution
+		SolutionValuePerMonth[PlanMonth] = SolutionValue
+		RollingHorizonStatistics[PlanMonth] = {
+			'HorizonMonths': 			HorizonMonths,
+			'TripCount': 				len(MonthSolution),
+			'SolutionValue': 			SolutionValue,
+			'RoutePoolSize': 			len(PlanningCache['RoutePool']),
+			'RemainingRequirements': 	sum(RemainingLMRequirements.values()),
+			'PlanningTime': 			default_timer() - st,
+		}
+
+		if Verbose:
+			print "Month %s (horizon %s): %s trips, value: %s, remaining requirements: %s, planning time: %.2f seconds" \
+				% (PlanMonth, HorizonMonths, len(MonthSolution), SolutionValue, sum(RemainingLMRequirements.values()),
+				RollingHorizonStatistics[PlanMonth]['PlanningTime'])
+
+	return (AssignmentSolutionPerMonth, SolutionValuePerMonth, RemainingLMRequirements, RollingHorizonStatistics)
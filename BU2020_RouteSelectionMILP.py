@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Route selection as a mixed-integer linear program (MILP):
+Select how many times each route is to be undertaken, such that all line measurement
+(LM) requirements are covered with minimum total route duration cost.
+
+	maximize 	Revenue * sum(Req) - sum(Cost[r] * x[r])
+	subject to 	sum(Coverage[i,r] * x[r]) >= Req[i] 	for each LineKey i
+				x[r] in {0, 1, 2, ...}
+
+The model is built in matrix form from a sparse (CSR) coverage matrix; see
+BU2020_MILPSolverInterface for solvers.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+from BU2020_MILPSolverInterface import *
+
+#######################################################################################
+# COVERAGE MATRIX & ROUTE COSTS
+#######################################################################################
+
+def GetCoverageMatrixOfRoutes(LMCoveragePerRoute, LineKeys=None, BinaryCoverage=False):
+	"""
+	Get sparse LM coverage matrix of routes: Coverage[i,r] = number of measurements
+	of LineKey i by route r.
+
+	LMCoveragePerRoute: List of LMCoveragePerLineKey dictionaries, one per route
+		(see GetLMCoverageOfRoute)
+	LineKeys: 	List of LineKeys (rows of matrix); if None, all LineKeys covered
+		by any route in sorted order. Coverage of other LineKeys is ignored.
+	BinaryCoverage: If True, Coverage[i,r] = 1 for any positive coverage.
+
+	Returns: (Coverage, LineKeys), Coverage is a CSR matrix (L x R)
+	"""
+	if LineKeys == None:
+		AllKeys = set()
+		for LMCoverage in LMCoveragePerRoute:
+			AllKeys.update(LMCoverage.keys())
+		LineKeys = sorted(AllKeys)
+
+	LineKeyIndex = dict((LineKey, i) for (i, LineKey) in enumerate(LineKeys))
+
+	rows = []
+	cols = []
+	vals = []
+	for r in range(0, len(LMCoveragePerRoute)):
+		LMCoverage = LMCoveragePerRoute[r]
+		for LineKey in LMCoverage:
+			if not LineKey in LineKeyIndex: continue
+			rows.append(LineKeyIndex[LineKey])
+			cols.append(r)
+			vals.append(LMCoverage[LineKey])
+
+	vals = np.array(vals, dtype=float)
+	if BinaryCoverage:
+		vals = (vals > 0).astype(float)
+
+	Coverage = sp.csr_matrix((vals, (rows, cols)), shape=(len(LineKeys), len(LMCoveragePerRoute)))
+	return (Coverage, LineKeys)
+
+def GetDurationOfRoutes(RouteInfoList):
+	"""
+	Get duration of each route in minutes, from the departure at the first connection
+	to the arrival at the last connection.
+
+	Returns: Numpy array of durations, one per route
+	"""
+	Durations = np.zeros(len(RouteInfoList))
+	for r in range(0, len(RouteInfoList)):
+		RouteInfo = RouteInfoList[r]
+		departure_first_station = RouteInfo[0][ConnInfoInd['departure_hour']]*60 + RouteInfo[0][ConnInfoInd['departure_min']]
+		arrival_last_station = RouteInfo[-1][ConnInfoInd['arrival_hour']]*60 + RouteInfo[-1][ConnInfoInd['arrival_min']]
+		Durations[r] = arrival_last_station - departure_first_station
+	return Durations
+
+#######################################################################################
+# MILP MODEL GENERATION
+#######################################################################################
+
+def GenerateRouteSelectionMILP(Coverage, LineKeys, LMRequirements, RouteCosts, RevenueLineMeasure=0,
+	MaxSelectionCount=None, IgnoreUncoverableKeys=True):
+	"""
+	Generate route selection MILP in matrix form (see CreateMILPModel).
+
+	Coverage: 	Sparse LM coverage matrix (L x R), see GetCoverageMatrixOfRoutes
+	LineKeys: 	List of LineKeys, one per row of Coverage
+	LMRequirements[LineKey] = x
+	RouteCosts: Cost of each route (array of length R), like route durations
+	RevenueLineMeasure: Revenue per required line measurement; constant part of objective
+	MaxSelectionCount: Upper limit for the selection count of a route (None: no limit)
+	IgnoreUncoverableKeys: If True, requirements of LineKeys that are not covered by
+		any route are ignored (otherwise the model is infeasible).
+
+	Returns: Model dictionary, with additional entries:
+		Model['LineKeys']: List of LineKeys, one per coverage constraint
+	"""
+	Coverage = sp.csr_matrix(Coverage)
+	(L, R) = Coverage.shape
+	Req = np.array([LMRequirements.get(LineKey, 0) for LineKey in LineKeys], dtype=float)
+
+	# coverage constraints for required LineKeys
+	Required = Req > 0
+	if IgnoreUncoverableKeys:
+		Required &= np.diff(Coverage.indptr) > 0
+	Rows = np.nonzero(Required)[0]
+
+	A = Coverage[Rows, :]
+	RowLower = Req[Rows]
+	RowUpper = INF * np.ones(len(Rows))
+
+	c = -np.asarray(RouteCosts, dtype=float)
+	ColLower = np.zeros(R)
+	ColUpper = INF * np.ones(R)
+	if MaxSelectionCount != None:
+		ColUpper = MaxSelectionCount * np.ones(R)
+	Integrality = np.ones(R, dtype=int)
+
+	ObjOffset = RevenueLineMeasure * RowLower.sum()
+
+	Model = CreateMILPModel(c, A, RowLower, RowUpper, ColLower, ColUpper, Integrality, Maximize=True,
+		ObjOffset=ObjOffset)
+	Model['LineKeys'] = [LineKeys[i] for i in Rows]
+
+	return Model
+
+def FindOptimalRouteSelection(RouteInfoList, LMRequirements, RouteCosts=None, RevenueLineMeasure=0,
+	MaxSelectionCount=None, Solver=None, TimeLimit=None, MipGap=None, LMCoveragePerRoute=None, BinaryCoverage=False):
+	"""
+	Select routes for covering LM requirements with minimum route costs.
+
+	RouteCosts: Cost per route; route durations in minutes if None
+	Solver: Name of solver backend; default backend if None (see GetDefaultMILPSolver)
+	LMCoveragePerRoute: List of LMCoveragePerLineKey per route (see GetLMCoverageOfRoute);
+		calculated if None.
+
+	Returns: (SelectionCountPerRoute, ObjValue, SolverStatus)
+		SelectionCountPerRoute[r] = n, for selected routes r only
+	"""
+	if LMCoveragePerRoute == None:
+		LMCoveragePerRoute = []
+		for RouteInfo in RouteInfoList:
+			(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+				GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements)
+			LMCoveragePerRoute.append(LMCoveragePerLineKey)
+
+	if RouteCosts is None:
+		RouteCosts = GetDurationOfRoutes(RouteInfoList)
+	if Solver == None:
+		Solver = GetDefaultMILPSolver()
+
+	(Coverage, LineKeys) = GetCoverageMatrixOfRoutes(LMCoveragePerRoute, sorted(LMRequirements.keys()), BinaryCoverage)
+	Model = GenerateRouteSelectionMILP(Coverage, LineKeys, LMRequirements, RouteCosts, RevenueLineMeasure, MaxSelectionCount)
+	print "Route selection MILP: %s columns, %s rows, %s nonzeros" % (Model['A'].shape[1], Model['A'].shape[0], Model['A'].nnz)
+
+	(Status, x, ObjValue, SolveTime) = SolveMILP(Model, Solver, None, TimeLimit, MipGap)
+	print "Route selection MILP solved with %s in %.2f seconds, status: %s" % (Solver, SolveTime, Status)
+
+	SelectionCountPerRoute = {}
+	if x is not None:
+		for r in np.nonzero(x > 0.5)[0]:
+			SelectionCountPerRoute[r] = int(round(x[r]))
+
+	return (SelectionCountPerRoute, ObjValue, Status)
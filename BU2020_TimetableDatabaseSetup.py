@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database setup tool for the timetable query of route search (see ReadTimeTable):
+
+1) Slim materialized view (projection) with only the fields read by ReadTimeTable
+	(see TimeTableFields), physically ordered like the query (station_from, departure_totalmin, conn_id)
+2) Composite B-tree indexes matching the filters and the sort order of the query
+3) CLUSTER of the view by the sort order index, ANALYZE
+4) Benchmark of the timetable query before (source table) and after (view)
+
+Usage: python BU2020_TimetableDatabaseSetup.py
+Set tbl_TimeTable = TimetableProjectionName in BU2019_CentralParameters to search on the view.
+"""
+import json
+from timeit import default_timer
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+
+# name of materialized view (projection) of timetable
+TimetableProjectionName = 'timetable_slim'
+
+#######################################################################################
+# PROJECTION & INDEXES
+#######################################################################################
+
+def GetTimetableIndexDefinitions(TableName):
+	"""
+	Get composite B-tree index definitions for the timetable query:
+	- sort order of query (ordered scans without sort),
+	- departure time window (StartTimeAndDuration),
+	- management and line category filters with departure time window.
+
+	Returns: IndexDefinitions, list of (IndexName, ColumnList)
+	"""
+	IndexDefinitions = [
+		('ix_%s_order' % TableName, 		TimeTableSortFields),
+		('ix_%s_departure' % TableName, 	['departure_totalmin', 'arrival_totalmin']),
+		('ix_%s_mgmt_cat' % TableName, 		['management', 'line_category', 'departure_totalmin']),
+		]
+	return IndexDefinitions
+
+def CreateTimetableProjection(dbcon, SourceTable=None, ViewName=TimetableProjectionName):
+	"""
+	Create (or re-create) the materialized view ViewName with the fields of TimeTableFields,
+	plus the weekday fields of Cond.SelectWeekDays (see CondSQLSelectedWeekDays):
+	trafficdays_bits and weekdays_mask if TimetableHasTrafficDayBits, else wochentage;
+	with indexes (see GetTimetableIndexDefinitions) and clustered by the sort order index.
+
+	SourceTable: Timetable table; tbl_TimeTable if None
+	"""
+	if SourceTable == None:
+		SourceTable = tbl_TimeTable
+	if SourceTable == ViewName:
+		raise Exception("Source table and view name of timetable projection must be different!")
+
+	Fields = list(TimeTableFields)
+	if TimetableHasTrafficDayBits:
+		Fields += ['trafficdays_bits', 'weekdays_mask']
+	else:
+		Fields += ['wochentage']
+
+	dbcur = dbcon.cursor()
+	dbcur.execute("DROP MATERIALIZED VIEW IF EXISTS %s;" % ViewName)
+
+	st = default_timer()
+	dbcur.execute("CREATE MATERIALIZED VIEW %s AS SELECT %s FROM %s ORDER BY %s;" \
+		% (ViewName, ','.join(Fields), SourceTable, ','.join(TimeTableSortFields)))
+	print "Materialized view %s created in %.2f seconds" % (ViewName, default_timer() - st)
+
+	IndexDefinitions = GetTimetableIndexDefinitions(ViewName)
+	for (IndexName, Columns) in IndexDefinitions:
+		st = default_timer()
+		dbcur.execute("CREATE INDEX %s ON %s (%s);" % (IndexName, ViewName, ','.join(Columns)))
+		print "Index %s (%s) created in %.2f seconds" % (IndexName, ','.join(Columns), default_timer() - st)
+
+	st = default_timer()
+	dbcur.execute("CLUSTER %s USING %s;" % (ViewName, IndexDefinitions[0][0]))
+	dbcur.execute("ANALYZE %s;" % ViewName)
+	print "Materialized view %s clustered and analyzed in %.2f seconds" % (ViewName, default_timer() - st)
+	dbcon.commit()
+
+def RefreshTimetableProjection(dbcon, ViewName=TimetableProjectionName):
+	"""
+	Refresh materialized view after changes of the source timetable; restore physical order.
+	"""
+	dbcur = dbcon.cursor()
+	dbcur.execute("REFRESH MATERIALIZED VIEW %s;" % ViewName)
+	dbcur.execute("CLUSTER %s;" % ViewName)
+	dbcur.execute("ANALYZE %s;" % ViewName)
+	dbcon.commit()
+
+#######################################################################################
+# BENCHMARK
+#######################################################################################
+
+def BenchmarkTimetableQuery(dbcur, RouteConditions, TableName, Repetitions=3):
+	"""
+	Benchmark timetable query of ReadTimeTable on table or view TableName.
+
+	Returns: Benchmark (dictionary)
+		'TableName', 'RowCount',
+		'MinTime', 'AvgTime': 	Time for query execution and fetching all rows, in seconds
+		'TableSize': 			Total size of table (or view) with indexes, like '120 MB'
+		'IfSort': 				True if query plan contains a sort
+		'SharedBuffers': 		Shared buffers (hit + read) of query execution
+	"""
+	(sql, SQLparams) = GetTimeTableQuery(RouteConditions, TableName)
+
+	Times = []
+	RowCount = 0
+	for i in range(0, Repetitions):
+		st = default_timer()
+		dbcur.execute(sql, SQLparams)
+		RowCount = len(dbcur.fetchall())
+		Times.append(default_timer() - st)
+
+	dbcur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, SQLparams)
+	Plan = dbcur.fetchone()[0]
+	if isinstance(Plan, basestring):
+		Plan = json.loads(Plan)
+	PlanNode = Plan[0]['Plan']
+
+	dbcur.execute("SELECT pg_size_pretty(pg_total_relation_size(%s::regclass));", (TableName,))
+	TableSize = dbcur.fetchone()[0]
+
+	Benchmark = {
+		'TableName': 		TableName,
+		'RowCount': 		RowCount,
+		'MinTime': 			min(Times),
+		'AvgTime': 			sum(Times) / len(Times),
+		'TableSize': 		TableSize,
+		'IfSort': 			CheckIfPlanContainsNodeType(PlanNode, 'Sort'),
+		'SharedBuffers': 	PlanNode.get('Shared Hit Blocks', 0) + PlanNode.get('Shared Read Blocks', 0),
+		}
+	return Benchmark
+
+def CheckIfPlanContainsNodeType(PlanNode, NodeType):
+	"""
+	Return True if query plan (EXPLAIN FORMAT JSON) contains a node of type NodeType (like 'Sort').
+	"""
+	if PlanNode['Node Type'] == NodeType:
+		return True
+	for SubNode in PlanNode.get('Plans', []):
+		if CheckIfPlanContainsNodeType(SubNode, NodeType):
+			return True
+	return False
+
+def PrintBenchmarkComparison(BenchmarkBefore, BenchmarkAfter):
+	"""
+	Print benchmarks of timetable query before and after setup side by side.
+	"""
+	print '{:<16}'.format('') + '{:>20}'.format(BenchmarkBefore['TableName']) + '{:>20}'.format(BenchmarkAfter['TableName'])
+	for key in ['RowCount', 'MinTime', 'AvgTime', 'TableSize', 'IfSort', 'SharedBuffers']:
+		ValBefore = BenchmarkBefore[key]
+		ValAfter = BenchmarkAfter[key]
+		if isinstance(ValBefore, float):
+			ValBefore = "%.3f" % ValBefore
+			ValAfter = "%.3f" % ValAfter
+		print '{:<16}'.format(key) + '{:>20}'.format(ValBefore) + '{:>20}'.format(ValAfter)
+
+#######################################################################################
+# SETUP
+#######################################################################################
+
+def SetupTimetableDatabase(dbcon, RouteConditions, SourceTable=None, ViewName=TimetableProjectionName, Repetitions=3):
+	"""
+	Create timetable projection with indexes (see CreateTimetableProjection) and benchmark
+	the timetable query for RouteConditions before and after.
+
+	Returns: (BenchmarkBefore, BenchmarkAfter)
+	"""
+	if SourceTable == None:
+		SourceTable = tbl_TimeTable
+	dbcur = dbcon.cursor()
+
+	print "Benchmark timetable query on %s..." % SourceTable
+	BenchmarkBefore = BenchmarkTimetableQuery(dbcur, RouteConditions, SourceTable, Repetitions)
+	dbcon.commit()
+
+	CreateTimetableProjection(dbcon, SourceTable, ViewName)
+
+	print "Benchmark timetable query on %s..." % ViewName
+	BenchmarkAfter = BenchmarkTimetableQuery(dbcur, RouteConditions, ViewName, Repetitions)
+	dbcon.commit()
+
+	if BenchmarkBefore['RowCount'] != BenchmarkAfter['RowCount']:
+		raise Exception("Timetable query returns different row counts on %s (%s) and %s (%s)!" \
+			% (SourceTable, BenchmarkBefore['RowCount'], ViewName, BenchmarkAfter['RowCount']))
+
+	PrintBenchmarkComparison(BenchmarkBefore, BenchmarkAfter)
+	return (BenchmarkBefore, BenchmarkAfter)
+
+# setup tool
+if __name__ == '__main__':
+
+	dbcon = psycopg2.connect(**PrimaryDB)
+
+	# typical timetable query of route search
+	RouteConditions = {
+		Cond.StartAndEndStations: (8503000, 8503000),
+		Cond.StartTimeAndDuration: (8, 0, 60, 6*60),
+		Cond.MaxWaitingTimeAtStation: (30,),
+		Cond.TimeForLineChange: (2,),
+		Cond.IncludeListedGattungsOnly: (['S','RE','IR','IC'],),
+		Cond.ConnectionsAreAvailableOnAllListedDays: (GetWeekdaysOfMonth(PlanMonth, PlanYear, WD[11]),),
+		}
+
+	SetupTimetableDatabase(dbcon, RouteConditions)
+	dbcon.close()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Import of a GTFS timetable (stops, routes, trips, calendar, calendar_dates, stop_times)
+directly into timetable column arrays (see BuildTimetableColumns of BU2020_TimetableSources),
+without loading the timetable into the database:
+
+1) Traffic days per service (calendar, calendar_dates) as bit strings of the FPLAN period,
+	like column trafficdays_hexcode (see GetTrafficDayBitMask), and weekday masks
+2) stop_times streamed trip by trip; each pair of consecutive stops of a trip is one connection
+	with station order, line id (route_id) and trip id (travel_id)
+3) Trips converted in chunks by a process pool; stop_times are read in waves of chunks,
+	such that only the connections (not the text file) are held in memory
+
+GTFS file stop_times must be grouped by trip (like all common GTFS exports).
+Trips without traffic day in the FPLAN period are skipped.
+Times of untimed stops (blank arrival and departure time) are interpolated, see GetGTFSStopTimesInMinutes.
+
+Usage: python BU2020_TimetableImport.py GTFSDirectory OutputFile (.npz or .sqlite)
+Then: SetTimetableSource(NpzTimetableSource(OutputFile)), see BU2020_TimetableSources
+"""
+import csv
+import re
+import multiprocessing
+import numpy as np
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+from BU2020_TimetableSources import *
+
+# station numbers for GTFS stop ids without numeric station number (like UIC number 8503000)
+GTFSStationNumberOffset = 10**8
+
+# context of GTFS import in worker processes, see InitGTFSWorker
+GTFSWorkerContext = {}
+
+#######################################################################################
+# GTFS MASTER DATA
+#######################################################################################
+
+def ReadGTFSFile(GTFSDirectory, FileName):
+	"""
+	Read GTFS text file FileName (like 'trips.txt') as a list of dictionaries; empty list if not existing.
+
+	Returns: List of rows (dictionaries with column names as keys)
+	"""
+	FilePath = os.path.join(GTFSDirectory, FileName)
+	if not os.path.exists(FilePath):
+		return []
+	f = open(FilePath, 'rb')
+	try:
+		return [dict((key.strip().lstrip('\xef\xbb\xbf'), value) for (key, value) in row.items()) for row in csv.DictReader(f)]
+	finally:
+		f.close()
+
+def GetGTFSStationNumberOfID(StationID, ChildIDs):
+	"""
+	Get the station number of a GTFS station id (see GetGTFSStationNumbers):
+	1) numeric part before ':' (like '8503000:0:3' -> 8503000)
+	2) numeric prefix shared by all child stop ids (like 'Parent8503000' with children '8503000:0:1', '8503000:0:2')
+	3) the only digit run of the station id (like 'Parent8503000' or '8503000P' -> 8503000)
+
+	Returns: (StationNumber, IfExact); StationNumber is None if the id has no usable digits,
+		IfExact is False for a digit run embedded in the id (case 3)
+	"""
+	NumberPart = StationID.split(':')[0]
+	if NumberPart.isdigit():
+		return (int(NumberPart), True)
+
+	ChildNumberParts = set(ChildID.split(':')[0] for ChildID in ChildIDs)
+	if len(ChildNumberParts) == 1:
+		NumberPart = ChildNumberParts.pop()
+		if NumberPart.isdigit():
+			return (int(NumberPart), True)
+
+	DigitRuns = re.findall(r'\d+', StationID)
+	if len(DigitRuns) == 1 and int(DigitRuns[0]) < GTFSStationNumberOffset:
+		return (int(DigitRuns[0]), False)
+	return (None, False)
+
+def GetGTFSStationNumbers(StopRows):
+	"""
+	Get station numbers of GTFS stop ids: platforms and stop points are mapped to their parent
+	station, with the station number of the parent station id (see GetGTFSStationNumberOfID).
+	Station ids without digits, or whose embedded digit run is also the number of another
+	station, get numbers from GTFSStationNumberOffset.
+
+	Returns: StationNumbers[stop_id] = station number
+	"""
+	ParentStations = {}
+	ChildIDsPerStation = {}
+	for row in StopRows:
+		if row.get('parent_station'):
+			ParentStations[row['stop_id']] = row['parent_station']
+			ChildIDsPerStation.setdefault(row['parent_station'], []).append(row['stop_id'])
+
+	# station number per station id
+	NumberPerStation = {}
+	StationsPerNumber = {}
+	for row in StopRows:
+		StationID = ParentStations.get(row['stop_id'], row['stop_id'])
+		if StationID in NumberPerStation: continue
+		(StationNumber, IfExact) = GetGTFSStationNumberOfID(StationID, ChildIDsPerStation.get(StationID, []))
+		NumberPerStation[StationID] = (StationNumber, IfExact)
+		if StationNumber != None:
+			StationsPerNumber.setdefault(StationNumber, set()).add(StationID)
+
+	StationNumbers = {}
+	OtherStations = {}
+	for row in StopRows:
+		StationID = ParentStations.get(row['stop_id'], row['stop_id'])
+		(StationNumber, IfExact) = NumberPerStation[StationID]
+		if StationNumber != None and (IfExact or len(StationsPerNumber[StationNumber]) == 1):
+			StationNumbers[row['stop_id']] = StationNumber
+		else:
+			if not StationID in OtherStations:
+				OtherStations[StationID] = GTFSStationNumberOffset + len(OtherStations)
+			StationNumbers[row['stop_id']] = OtherStations[StationID]
+	return StationNumbers
+
+def GetGTFSDate(DateStr):
+	"""
+	Convert GTFS date 'YYYYMMDD' to ordinal date.
+
+	Returns: DayOrd
+	"""
+	return date(int(DateStr[0:4]), int(DateStr[4:6]), int(DateStr[6:8])).toordinal()
+
+def GetGTFSServiceDays(CalendarRows, CalendarDateRows):
+	"""
+	Get traffic days of GTFS services within the FPLAN period (FPLAN_BeginDate - FPLAN_EndDate).
+
+	Returns: ServiceDays[service_id] = set of ordinal dates
+	"""
+	GTFSWeekdays = ['monday','tuesday','wednesday','thursday','friday','saturday','sunday']
+	FirstDay = FPLAN_BeginDate.toordinal()
+	LastDay = FPLAN_EndDate.toordinal()
+
+	ServiceDays = {}
+	for row in CalendarRows:
+		Days = set()
+		for DayOrd in range(max(GetGTFSDate(row['start_date']), FirstDay), min(GetGTFSDate(row['end_date']), LastDay) + 1):
+			if row[GTFSWeekdays[GetWeekdayOfDate(DayOrd) - 1]].strip() == '1':
+				Days.add(DayOrd)
+		ServiceDays[row['service_id']] = Days
+
+	# exceptions: 1 = service added, 2 = service removed
+	for row in CalendarDateRows:
+		DayOrd = GetGTFSDate(row['date'])
+		if DayOrd < FirstDay or DayOrd > LastDay:
+			continue
+		Days = ServiceDays.setdefault(row['service_id'], set())
+		if row['exception_type'].strip() == '1':
+			Days.add(DayOrd)
+		else:
+			Days.discard(DayOrd)
+	return ServiceDays
+
+def ConvertBitMaskToHexCode(BitMaskStr):
+	"""
+	Convert bit string (like '0010011...') to hex code (like '27...'), zero-padded at the right.
+
+	Returns: HexCode
+	"""
+	BitMaskStr += '0' * (-len(BitMaskStr) % 4)
+	return ''.join('%x' % int(BitMaskStr[i:i+4], 2) for i in range(0, len(BitMaskStr), 4))
+
+def GetGTFSServiceTrafficDays(ServiceDays):
+	"""
+	Get traffic day data of services with at least one traffic day.
+
+	Returns: (ServiceIndex, ServiceHexCodes, ServiceWeekdayMasks)
+		ServiceIndex[service_id] = index of service in ServiceHexCodes and ServiceWeekdayMasks
+		ServiceHexCodes: list of traffic day hex codes (see CondStrSelectedTripDays_hex)
+		ServiceWeekdayMasks: list of weekday masks (see GetWeekdayMask)
+	"""
+	ServiceIndex = {}
+	ServiceHexCodes = []
+	ServiceWeekdayMasks = []
+	for service_id in sorted(ServiceDays):
+		Days = ServiceDays[service_id]
+		if not Days:
+			continue
+		ServiceIndex[service_id] = len(ServiceHexCodes)
+		ServiceHexCodes.append(ConvertBitMaskToHexCode(GetTrafficDayBitMask(Days)))
+		ServiceWeekdayMasks.append(GetWeekdayMask(set(GetWeekdayOfDate(d) for d in Days)))
+	return (ServiceIndex, ServiceHexCodes, ServiceWeekdayMasks)
+
+def GetGTFSRouteInfo(RouteRows):
+	"""
+	Get management (agency), line category and line of GTFS routes; line category is route_desc
+	(like 'IC', 'S' in Swiss GTFS), or route_type if route_desc is empty.
+
+	Returns: RouteInfo[route_id] = (management, line_category, line)
+	"""
+	RouteInfo = {}
+	for row in RouteRows:
+		management = row.get('agency_id', '').strip()
+		if management.isdigit():
+			management = int(management)
+		line_category = row.get('route_desc', '').strip() or row.get('route_type', '').strip()
+		line = row.get('route_short_name', '').strip() or row.get('route_long_name', '').strip()
+		RouteInfo[row['route_id']] = (management, line_category, line)
+	return RouteInfo
+
+#######################################################################################
+# STOP TIMES (CONNECTIONS)
+#######################################################################################
+
+def GetGTFSTimeInMinutes(TimeStr):
+	"""
+	Convert GTFS time 'HH:MM:SS' (hours may exceed 23) to (hour, minute, total minutes).
+
+	Returns: (hour, minute, totalmin)
+	"""
+	parts = TimeStr.strip().split(':')
+	(hour, minute) = (int(parts[0]), int(parts[1]))
+	return (hour, minute, 60*hour + minute)
+
+def GetGTFSStopTimesInMinutes(StopTimes):
+	"""
+	Get arrival and departure times (total minutes) of the stops of a trip. Times of untimed
+	stops (blank arrival_time and departure_time, like non-timepoint stops) are interpolated
+	linearly between the neighbouring timed stops, by the number of stops in between;
+	untimed stops before the first or after the last timed stop are skipped.
+
+	StopTimes: list of (stop_sequence, stop_id, arrival_time, departure_time), sorted by stop_sequence
+
+	Returns: list of (stop_id, arrival_totalmin, departure_totalmin)
+	"""
+	Times = []
+	for (stop_sequence, stop_id, ArrivalTime, DepartureTime) in StopTimes:
+		ArrivalTime = (ArrivalTime or '').strip()
+		DepartureTime = (DepartureTime or '').strip()
+		if not ArrivalTime and not DepartureTime:
+			Times.append((stop_id, None, None))
+			continue
+		arrival_totalmin = GetGTFSTimeInMinutes(ArrivalTime or DepartureTime)[2]
+		departure_totalmin = GetGTFSTimeInMinutes(DepartureTime or ArrivalTime)[2]
+		Times.append((stop_id, arrival_totalmin, departure_totalmin))
+
+	TimedIndices = [i for i in range(0, len(Times)) if Times[i][1] != None]
+
+	StopMinutes = []
+	for k in range(0, len(TimedIndices)):
+		i = TimedIndices[k]
+		StopMinutes.append(Times[i])
+		if k == len(TimedIndices) - 1: break
+
+		# untimed stops between timed stops i and j
+		j = TimedIndices[k+1]
+		(DepartureMin, ArrivalMin) = (Times[i][2], Times[j][1])
+		for u in range(i+1, j):
+			totalmin = int(round(DepartureMin + float(ArrivalMin - DepartureMin) * (u - i) / (j - i)))
+			StopMinutes.append((Times[u][0], totalmin, totalmin))
+	return StopMinutes
+
+def InitGTFSWorker(Context):
+	"""
+	Set context of GTFS import (trips, routes, services, stations) in a worker process.
+	"""
+	GTFSWorkerContext.clear()
+	GTFSWorkerContext.update(Context)
+
+def ConvertGTFSTripChunk(TripChunk):
+	"""
+	Convert a chunk of trips to connections (worker process, see InitGTFSWorker).
+
+	TripChunk: list of (TripIndex, trip_id, StopTimes) where StopTimes is a list of
+		(stop_sequence, stop_id, arrival_time, departure_time); times of untimed stops
+		are interpolated, see GetGTFSStopTimesInMinutes
+
+	Returns: ChunkColumns[field] = list of values, for TimeTableFields (without conn_id and
+		trafficdays_hexcode) and 'service_index' (index of service, see GetGTFSServiceTrafficDays)
+	"""
+	Trips = GTFSWorkerContext['Trips']
+	RouteInfo = GTFSWorkerContext['RouteInfo']
+	ServiceIndex = GTFSWorkerContext['ServiceIndex']
+	StationNumbers = GTFSWorkerContext['StationNumbers']
+
+	Fields = [field for field in TimeTableFields if not field in ('conn_id', 'trafficdays_hexcode')] + ['service_index']
+	ChunkColumns = dict((field, []) for field in Fields)
+
+	for (TripIndex, trip_id, StopTimes) in TripChunk:
+		(route_id, service_id, travel_no) = Trips[trip_id]
+		(management, line_category, line) = RouteInfo[route_id]
+		StopMinutes = GetGTFSStopTimesInMinutes(sorted(StopTimes, key=lambda st: int(st[0])))
+
+		for i in range(0, len(StopMinutes) - 1):
+			(stop_from, ArrivalFrom, departure_totalmin) = StopMinutes[i]
+			(stop_to, arrival_totalmin, DepartureTo) = StopMinutes[i+1]
+			(departure_hour, departure_min) = divmod(departure_totalmin, 60)
+			(arrival_hour, arrival_min) = divmod(arrival_totalmin, 60)
+
+			ChunkColumns['station_order'].append(i + 1)
+			ChunkColumns['travel_id'].append(TripIndex)
+			ChunkColumns['travel_no'].append(travel_no)
+			ChunkColumns['management'].append(management)
+			ChunkColumns['line_category'].append(line_category)
+			ChunkColumns['line'].append(line)
+			ChunkColumns['line_id'].append(route_id)
+			ChunkColumns['station_from'].append(StationNumbers[stop_from])
+			ChunkColumns['station_to'].append(StationNumbers[stop_to])
+			ChunkColumns['departure_hour'].append(departure_hour)
+			ChunkColumns['departure_min'].append(departure_min)
+			ChunkColumns['departure_totalmin'].append(departure_totalmin)
+			ChunkColumns['arrival_hour'].append(arrival_hour)
+			ChunkColumns['arrival_min'].append(arrival_min)
+			ChunkColumns['arrival_totalmin'].append(arrival_totalmin)
+			ChunkColumns['service_index'].append(ServiceIndex[service_id])
+	return ChunkColumns
+
+def GetGTFSTripChunks(GTFSDirectory, Trips, ServiceIndex, TripsPerChunk):
+	"""
+	Stream stop_times of GTFS trips (grouped by trip) as chunks of TripsPerChunk trips;
+	trips without traffic days in the FPLAN period are skipped.
+
+	Yields: TripChunk, see ConvertGTFSTripChunk
+	"""
+	f = open(os.path.join(GTFSDirectory, 'stop_times.txt'), 'rb')
+	try:
+		reader = csv.reader(f)
+		header = [key.strip().lstrip('\xef\xbb\xbf') for key in reader.next()]
+		(iTrip, iSeq, iStop, iArr, iDep) = [header.index(key) for key in \
+			['trip_id', 'stop_sequence', 'stop_id', 'arrival_time', 'departure_time']]
+
+		FinishedTrips = set()
+		TripChunk = []
+		CurTripID = None
+		StopTimes = []
+
+		for row in reader:
+			trip_id = row[iTrip]
+			if trip_id != CurTripID:
+				if CurTripID != None:
+					if CurTripID in FinishedTrips:
+						raise Exception("GTFS stop_times are not grouped by trip (trip_id %s)!" % CurTripID)
+					FinishedTrips.add(CurTripID)
+					if Trips[CurTripID][1] in ServiceIndex:
+						TripChunk.append((len(FinishedTrips), CurTripID, StopTimes))
+					if len(TripChunk) >= TripsPerChunk:
+						yield TripChunk
+						TripChunk = []
+				CurTripID = trip_id
+				StopTimes = []
+			StopTimes.append((row[iSeq], row[iStop], row[iArr], row[iDep]))
+
+		if CurTripID != None:
+			if CurTripID in FinishedTrips:
+				raise Exception("GTFS stop_times are not grouped by trip (trip_id %s)!" % CurTripID)
+			FinishedTrips.add(CurTripID)
+			if Trips[CurTripID][1] in ServiceIndex:
+				TripChunk.append((len(FinishedTrips), CurTripID, StopTimes))
+		if TripChunk:
+			yield TripChunk
+	finally:
+		f.close()
+
+#######################################################################################
+# IMPORT
+#######################################################################################
+
+def ImportGTFSTimetable(GTFSDirectory, Processes=None, TripsPerChunk=2000):
+	"""
+	Import GTFS timetable in GTFSDirectory into timetable column arrays.
+
+	Processes: Number of worker processes (CPU count if None); no process pool if 1
+	TripsPerChunk: Number of trips per converted chunk; stop_times are read in waves of
+		2*Processes chunks, which bounds memory use for stop_times
+
+	Returns: Columns, see BuildTimetableColumns of BU2020_TimetableSources
+	"""
+	st = time.time()
+	ServiceDays = GetGTFSServiceDays(ReadGTFSFile(GTFSDirectory, 'calendar.txt'), ReadGTFSFile(GTFSDirectory, 'calendar_dates.txt'))
+	(ServiceIndex, ServiceHexCodes, ServiceWeekdayMasks) = GetGTFSServiceTrafficDays(ServiceDays)
+
+	Trips = {}
+	for row in ReadGTFSFile(GTFSDirectory, 'trips.txt'):
+		Trips[row['trip_id']] = (row['route_id'], row['service_id'], row.get('trip_short_name', '').strip() or row['trip_id'])
+
+	Context = {
+		'Trips': 			Trips,
+		'RouteInfo': 		GetGTFSRouteInfo(ReadGTFSFile(GTFSDirectory, 'routes.txt')),
+		'ServiceIndex': 	ServiceIndex,
+		'StationNumbers': 	GetGTFSStationNumbers(ReadGTFSFile(GTFSDirectory, 'stops.txt')),
+		}
+	print "GTFS master data read in %.2f seconds: %s trips, %s services with traffic days" \
+		% (time.time() - st, len(Trips), len(ServiceIndex))
+
+	if Processes == None:
+		Processes = multiprocessing.cpu_count()
+	WorkerPool = None
+	if Processes > 1:
+		WorkerPool = multiprocessing.Pool(Processes, InitGTFSWorker, (Context,))
+	else:
+		InitGTFSWorker(Context)
+
+	# convert stop_times in waves of chunks
+	ColumnLists = None
+	try:
+		Wave = []
+		for TripChunk in GetGTFSTripChunks(GTFSDirectory, Trips, ServiceIndex, TripsPerChunk):
+			Wave.append(TripChunk)
+			if len(Wave) >= 2*Processes:
+				ColumnLists = AddGTFSChunkColumns(ColumnLists, ConvertGTFSWave(WorkerPool, Wave))
+				Wave = []
+		if Wave:
+			ColumnLists = AddGTFSChunkColumns(ColumnLists, ConvertGTFSWave(WorkerPool, Wave))
+	finally:
+		if WorkerPool:
+			WorkerPool.close()
+			WorkerPool.join()
+
+	if ColumnLists == None:
+		raise Exception("No trips with traffic days in FPLAN period found in GTFS timetable %s!" % GTFSDirectory)
+
+	# column arrays; traffic day columns from services
+	Columns = dict((field, np.array(ColumnLists[field])) for field in ColumnLists if field != 'service_index')
+	ServiceIndexOfRows = np.array(ColumnLists['service_index'], dtype=int)
+	Columns['conn_id'] = np.arange(1, len(ServiceIndexOfRows) + 1)
+	Columns['trafficdays_hexcode'] = np.array(ServiceHexCodes, dtype=object)[ServiceIndexOfRows]
+	Columns['trafficdays_bytes'] = GetTrafficDayBytes(ServiceHexCodes)[ServiceIndexOfRows]
+	Columns['weekdays_mask'] = np.array(ServiceWeekdayMasks, dtype=int)[ServiceIndexOfRows]
+
+	print "GTFS timetable imported in %.2f seconds: %s connections" % (time.time() - st, len(ServiceIndexOfRows))
+	return Columns
+
+def ConvertGTFSWave(WorkerPool, Wave):
+	"""
+	Convert a wave (list) of trip chunks, with the worker pool if available.
+
+	Returns: List of ChunkColumns, see ConvertGTFSTripChunk
+	"""
+	if WorkerPool:
+		return WorkerPool.map(ConvertGTFSTripChunk, Wave)
+	return [ConvertGTFSTripChunk(TripChunk) for TripChunk in Wave]
+
+def AddGTFSChunkColumns(ColumnLists, ChunkColumnsList):
+	"""
+	Append converted chunk columns to column lists (None for first chunks).
+
+	Returns: ColumnLists
+	"""
+	for ChunkColumns in ChunkColumnsList:
+		if ColumnLists == None:
+			ColumnLists = dict((field, []) for field in ChunkColumns)
+		for field in ChunkColumns:
+			ColumnLists[field].extend(ChunkColumns[field])
+	return ColumnLists
+
+# import tool
+if __name__ == '__main__':
+
+	if len(sys.argv) != 3:
+		print "Usage: python BU2020_TimetableImport.py GTFSDirectory OutputFile (.npz or .sqlite)"
+		sys.exit(1)
+
+	(GTFSDirectory, OutputFile) = sys.argv[1:3]
+	Columns = ImportGTFSTimetable(GTFSDirectory)
+	if OutputFile.endswith('.npz'):
+		SaveTimetableColumnsToNpz(Columns, OutputFile)
+	else:
+		SaveTimetableColumnsToSQLite(Columns, OutputFile)
+	print "Timetable columns saved to %s" % OutputFile
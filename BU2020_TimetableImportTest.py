@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test functions for the GTFS timetable import (BU2020_TimetableImport), without database
+"""
+from BU2020_TimetableImport import *
+
+def TEST_ConvertGTFSTripWithUntimedStop():
+	"""
+	Trip A - B - C - D where B and C are untimed stops (blank arrival and departure time):
+	times of B and C are interpolated between departure at A and arrival at D.
+	"""
+	Context = {
+		'Trips': 			{'T1': ('R1', 'S1', 123)},
+		'RouteInfo': 		{'R1': (11, 'S', '3')},
+		'ServiceIndex': 	{'S1': 0},
+		'StationNumbers': 	{'A': 8500010, 'B': 8500020, 'C': 8500030, 'D': 8500040},
+		}
+	InitGTFSWorker(Context)
+
+	StopTimes = [
+		('1', 'A', '07:58:00', '08:00:00'),
+		('3', 'C', '', ''),
+		('2', 'B', '', ''),
+		('4', 'D', '08:30:00', '08:31:00'),
+		]
+	ChunkColumns = ConvertGTFSTripChunk([(0, 'T1', StopTimes)])
+
+	print "Connections:"
+	for i in range(0, len(ChunkColumns['station_order'])):
+		print (ChunkColumns['station_from'][i], ChunkColumns['station_to'][i], \
+			ChunkColumns['departure_totalmin'][i], ChunkColumns['arrival_totalmin'][i])
+
+	assert ChunkColumns['station_from'] == [8500010, 8500020, 8500030]
+	assert ChunkColumns['station_to'] == [8500020, 8500030, 8500040]
+	assert ChunkColumns['departure_totalmin'] == [480, 490, 500]
+	assert ChunkColumns['arrival_totalmin'] == [490, 500, 510]
+	assert ChunkColumns['departure_hour'] == [8, 8, 8]
+	assert ChunkColumns['departure_min'] == [0, 10, 20]
+
+	# untimed stops before the first and after the last timed stop are skipped
+	StopTimes = [('1', 'A', '', ''), ('2', 'B', '08:00:00', '08:00:00'), ('3', 'C', '08:05:00', ''), ('4', 'D', '', '')]
+	ChunkColumns = ConvertGTFSTripChunk([(0, 'T1', StopTimes)])
+	assert ChunkColumns['station_from'] == [8500020]
+	assert ChunkColumns['station_to'] == [8500030]
+	print "TEST_ConvertGTFSTripWithUntimedStop: ok"
+
+# test module
+if __name__ == '__main__':
+	TEST_ConvertGTFSTripWithUntimedStop()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Timetable sources of route search (see SetTimetableSource and ReadTimeTable):
+
+1) PostgreSQL: timetable query (GetTimeTableQuery) on a database cursor
+2) SQLite file: timetable extract in a single table, read with the departure time window of the query
+3) NumPy npz file: timetable extract as column arrays
+
+All sources yield the same filtered and sorted rows (fields as TimeTableFields) as the
+timetable query; for the file sources, the conditions of GenerateSQLQueryConditions are
+applied on the column arrays with NumPy (see FilterTimetableColumns).
+
+Extract (like a regional timetable) for searches without database server:
+	Columns = ReadTimetableColumnsFromPostgreSQL(dbcur, RouteConditions)
+	SaveTimetableColumnsToNpz(Columns, 'timetable_region.npz')
+	SetTimetableSource(NpzTimetableSource('timetable_region.npz'))
+"""
+import binascii
+import sqlite3
+import numpy as np
+
+from BU2019_CentralParameters import *
+from BU2019_BasicFunctionsLib import *
+from BU2019_TourSearch import *
+
+# number of bytes per row of column array trafficdays_bytes (bit string of trafficdays_bits)
+TrafficDayByteLength = (TrafficDayBitLength + 7) // 8
+
+# default number of rows per yielded row batch
+SourceBatchSize = 10000
+
+#######################################################################################
+# TIMETABLE SOURCES
+#######################################################################################
+
+def PostgreSQLTimetableSource(dbcur, TableName=None):
+	"""
+	Timetable source for the timetable query on a PostgreSQL database.
+
+	TableName: Timetable table or view; tbl_TimeTable if None
+
+	Returns: Source (dictionary)
+	"""
+	Source = {
+		'Type': 			'postgresql',
+		'dbcur': 			dbcur,
+		'TableName': 		TableName,
+		'ReadRowBatches': 	ReadRowBatchesFromPostgreSQL,
+		}
+	return Source
+
+def SQLiteTimetableSource(FilePath, TableName='timetable'):
+	"""
+	Timetable source for a timetable extract in SQLite file FilePath (see SaveTimetableColumnsToSQLite).
+
+	Returns: Source (dictionary)
+	"""
+	Source = {
+		'Type': 			'sqlite',
+		'FilePath': 		FilePath,
+		'TableName': 		TableName,
+		'ReadRowBatches': 	ReadRowBatchesFromSQLite,
+		}
+	return Source
+
+def NpzTimetableSource(FilePath):
+	"""
+	Timetable source for a timetable extract in npz file FilePath (see SaveTimetableColumnsToNpz);
+	column arrays are loaded once.
+
+	Returns: Source (dictionary)
+	"""
+	Source = {
+		'Type': 			'npz',
+		'FilePath': 		FilePath,
+		'Columns': 			LoadTimetableColumnsFromNpz(FilePath),
+		'ReadRowBatches': 	ReadRowBatchesFromColumns,
+		}
+	return Source
+
+def ReadRowBatchesFromPostgreSQL(Source, RouteConditions):
+	"""
+	Yield row batches of the timetable query, read with a server-side cursor on the connection
+	of the source cursor (see FetchRowBatchesWithServerSideCursor).
+	"""
+	dbcur = Source['dbcur']
+	(sql, SQLparams) = GetTimeTableQuery(RouteConditions, Source['TableName'])
+	for RowBatch in FetchRowBatchesWithServerSideCursor(dbcur.connection, sql, SQLparams, SourceBatchSize):
+		yield RowBatch
+
+def ReadRowBatchesFromSQLite(Source, RouteConditions):
+	"""
+	Yield row batches of the SQLite timetable extract; the departure time window is selected
+	with SQL (indexed), all conditions are applied with NumPy (see FilterTimetableColumns).
+	"""
+	Fields = TimeTableFields + ['weekdays_mask', 'trafficdays_bytes']
+	sql = "select %s from %s" % (','.join(Fields), Source['TableName'])
+	SQLparams = []
+	if Cond.StartTimeAndDuration in RouteConditions:
+		parameters = RouteConditions[Cond.StartTimeAndDuration]
+		StartMin = parameters[0]*60 + parameters[1]
+		sql += " where departure_totalmin >= ? and departure_totalmin <= ?"
+		SQLparams = [StartMin, StartMin + parameters[3]]
+
+	con = sqlite3.connect(Source['FilePath'])
+	try:
+		cur = con.cursor()
+		cur.execute(sql, SQLparams)
+		rows = FetchAllRowsInBatches(cur)
+	finally:
+		con.close()
+
+	ColumnSource = {'Columns': BuildTimetableColumns(rows, Fields)}
+	for RowBatch in ReadRowBatchesFromColumns(ColumnSource, RouteConditions):
+		yield RowBatch
+
+def ReadRowBatchesFromColumns(Source, RouteConditions):
+	"""
+	Yield row batches of timetable column arrays Source['Columns'], filtered with NumPy
+	and sorted like the timetable query (see TimeTableSortFields).
+	"""
+	Columns = Source['Columns']
+	RowIndices = FilterTimetableColumns(Columns, RouteConditions)
+
+	# np.lexsort: last key is the primary sort key
+	SortKeys = tuple(Columns[field][RowIndices] for field in reversed(TimeTableSortFields))
+	RowIndices = RowIndices[np.lexsort(SortKeys)]
+
+	for i in range(0, len(RowIndices), SourceBatchSize):
+		BatchIndices = RowIndices[i:i+SourceBatchSize]
+		yield zip(*[Columns[field][BatchIndices].tolist() for field in TimeTableFields])
+
+#######################################################################################
+# NUMPY FILTERS
+#######################################################################################
+
+def FilterTimetableColumns(Columns, RouteConditions):
+	"""
+	Apply the timetable query conditions of GenerateSQLQueryConditions on column arrays.
+
+	Returns: RowIndices (numpy array) of selected rows
+	"""
+	RowCount = len(Columns['conn_id'])
+	Selected = np.ones(RowCount, dtype=bool)
+
+	for cond in RouteConditions:
+		parameters = RouteConditions[cond]
+
+		if cond == Cond.StartTimeAndDuration:
+			StartMin = parameters[0]*60 + parameters[1]
+			LatestArrival = StartMin + parameters[3]
+			Selected &= (Columns['departure_totalmin'] >= StartMin) & (Columns['departure_totalmin'] <= LatestArrival) \
+				& (Columns['arrival_totalmin'] <= LatestArrival)
+
+		elif cond == Cond.SelectWeekDays:
+			if parameters[0]:
+				WeekdayMask = GetWeekdayMask(set(parameters[0]))
+				Selected &= (Columns['weekdays_mask'] & WeekdayMask) == WeekdayMask
+
+		elif cond == Cond.IncludeListedManagementsOnly:
+			Selected &= np.in1d(Columns['management'], list(parameters[0]))
+
+		elif cond == Cond.IncludeListedGattungsOnly:
+			Selected &= np.in1d(Columns['line_category'], list(parameters[0]))
+
+		elif cond == Cond.ExcludeListedGattungs:
+			Selected &= ~np.in1d(Columns['line_category'], list(parameters[0]))
+
+		elif cond == Cond.VisitStations:
+			if parameters[1] in (INCLUDE_ALL_AND_ONLY, INCLUDE_ONLY):
+				Selected &= np.in1d(Columns['station_from'], list(parameters[0])) \
+					& np.in1d(Columns['station_to'], list(parameters[0]))
+
+		elif cond == Cond.ConnectionsAreAvailableOnAllListedDays:
+			Selected &= CheckTrafficDayBits(Columns['trafficdays_bytes'], parameters[0])
+
+	return np.nonzero(Selected)[0]
+
+def CheckTrafficDayBits(TrafficDayBytes, DayOrdList):
+	"""
+	Check traffic days of rows (like CondSQLSelectedTripDays): True for rows available on ALL listed days.
+
+	TrafficDayBytes: Numpy array (RowCount x TrafficDayByteLength) of bit strings, see GetTrafficDayBytes
+
+	Returns: Numpy array of booleans
+	"""
+	BitMask = GetTrafficDayBitMask(DayOrdList)
+	Selected = np.ones(TrafficDayBytes.shape[0], dtype=bool)
+	for pos in range(0, len(BitMask)):
+		if BitMask[pos] == '1':
+			Selected &= (TrafficDayBytes[:, pos >> 3] & (0x80 >> (pos & 7))) > 0
+	return Selected
+
+def GetTrafficDayBytes(TrafficDaysHexCodes):
+	"""
+	Convert traffic day hex codes to bit strings like ('x' || trafficdays_hexcode)::bit(TrafficDayBitLength),
+	cut or zero-padded at the right; all bits are set for a null hex code (like column trafficdays_bits).
+
+	Returns: Numpy array (RowCount x TrafficDayByteLength) of uint8
+	"""
+	HexLength = 2*TrafficDayByteLength
+	AllDays = '\xff' * TrafficDayByteLength
+	ByteStrings = []
+	for HexCode in TrafficDaysHexCodes:
+		if HexCode == None:
+			ByteStrings.append(AllDays)
+		else:
+			ByteStrings.append(binascii.unhexlify((HexCode + '0' * HexLength)[:HexLength]))
+	TrafficDayBytes = np.frombuffer(''.join(ByteStrings), dtype=np.uint8)
+	return TrafficDayBytes.reshape((len(ByteStrings), TrafficDayByteLength))
+
+def GetWeekdayMaskOfWeekdayString(wochentage):
+	"""
+	Get weekday mask (see GetWeekdayMask) of column wochentage (like '12345'), 0 if null.
+
+	Returns: WeekdayMask (int)
+	"""
+	if not wochentage:
+		return 0
+	return GetWeekdayMask([int(c) for c in str(wochentage) if c.isdigit()])
+
+#######################################################################################
+# EXTRACTION
+#######################################################################################
+
+def BuildTimetableColumns(rows, Fields):
+	"""
+	Build column arrays from rows with Fields (TimeTableFields, plus weekday and traffic day fields).
+
+	Returns: Columns (dictionary of numpy arrays)
+		Columns[field] for field in TimeTableFields
+		Columns['weekdays_mask']: see GetWeekdayMask
+		Columns['trafficdays_bytes']: see GetTrafficDayBytes
+	"""
+	Columns = {}
+	for i in range(0, len(Fields)):
+		Values = [row[i] for row in rows]
+		field = Fields[i]
+
+		if field == 'wochentage':
+			Columns['weekdays_mask'] = np.array([GetWeekdayMaskOfWeekdayString(v) for v in Values], dtype=int)
+		elif field == 'trafficdays_bytes':
+			ByteStrings = ''.join(str(v) for v in Values)
+			Columns[field] = np.frombuffer(ByteStrings, dtype=np.uint8).reshape((len(Values), TrafficDayByteLength))
+		elif field == 'weekdays_mask':
+			Columns[field] = np.array(Values, dtype=int)
+		else:
+			Columns[field] = np.array(Values)
+
+	if not 'trafficdays_bytes' in Columns:
+		Columns['trafficdays_bytes'] = GetTrafficDayBytes(Columns['trafficdays_hexcode'])
+	return Columns
+
+def ReadTimetableColumnsFromPostgreSQL(dbcur, RouteConditions=None, TableName=None):
+	"""
+	Read timetable (or a section like a region, with RouteConditions) from PostgreSQL into column arrays.
+	Only the query conditions of RouteConditions are applied (see GenerateSQLQueryConditions),
+	like IncludeListedManagementsOnly or VisitStations for a regional timetable.
+
+	Returns: Columns, see BuildTimetableColumns
+	"""
+	if TableName == None:
+		TableName = tbl_TimeTable
+	if RouteConditions == None:
+		RouteConditions = {}
+
+	# weekdays of query condition SelectWeekDays, see CondSQLSelectedWeekDays
+	if TimetableHasTrafficDayBits:
+		Fields = TimeTableFields + ['weekdays_mask']
+	else:
+		Fields = TimeTableFields + ['wochentage']
+
+	(SQLcond, SQLparams) = Cond.GenerateSQLQueryConditions(RouteConditions)
+	sql = "select %s from %s" % (','.join(Fields), TableName)
+	if SQLcond:
+		sql += " where " + SQLcond
+	dbcur.execute(sql, SQLparams)
+	rows = FetchAllRowsInBatches(dbcur)
+	return BuildTimetableColumns(rows, Fields)
+
+def SaveTimetableColumnsToNpz(Columns, FilePath):
+	"""
+	Save timetable column arrays to npz file FilePath (see NpzTimetableSource).
+	"""
+	np.savez_compressed(FilePath, **Columns)
+
+def LoadTimetableColumnsFromNpz(FilePath):
+	"""
+	Load timetable column arrays from npz file FilePath.
+
+	Returns: Columns, see BuildTimetableColumns
+	"""
+	NpzFile = np.load(FilePath, allow_pickle=True)
+	Columns = dict((field, NpzFile[field]) for field in NpzFile.files)
+	NpzFile.close()
+	return Columns
+
+def SaveTimetableColumnsToSQLite(Columns, FilePath, TableName='timetable'):
+	"""
+	Save timetable column arrays to a table of SQLite file FilePath (see SQLiteTimetableSource);
+	an existing table is replaced.
+	"""
+	Fields = TimeTableFields + ['weekdays_mask', 'trafficdays_bytes']
+	ColumnValues = [Columns[field].tolist() for field in TimeTableFields]
+	ColumnValues.append(Columns['weekdays_mask'].tolist())
+	ColumnValues.append([sqlite3.Binary(b.tostring()) for b in Columns['trafficdays_bytes']])
+
+	con = sqlite3.connect(FilePath)
+	try:
+		cur = con.cursor()
+		cur.execute("drop table if exists %s" % TableName)
+		cur.execute("create table %s (%s)" % (TableName, ','.join(Fields)))
+		cur.executemany("insert into %s values (%s)" % (TableName, ','.join(['?'] * len(Fields))), zip(*ColumnValues))
+		cur.execute("create index ix_%s_departure on %s (departure_totalmin)" % (TableName, TableName))
+		con.commit()
+	finally:
+		con.close()
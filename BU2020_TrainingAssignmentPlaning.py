@@ -22,14 +22,9 @@ from BU2019_CentralParameters import *
 from BU2019_BasicFunctionsLib import *
 from BU2019_TourSearch import *
 from BU2020_AssignmentFunctions import *
-
-# **************************************************************************************
-# connection to local database
-# **************************************************************************************
-
-# connection to local db
-dbcon = psycopg2.connect(**PrimaryDB) 
-dbcur = dbcon.cursor()
+from BU2020_AssignmentMILP import *
+from BU2020_AssignmentLocalSearch import *
+from BU2020_RollingHorizonPlanning import *
 
 # line separator string
 LineSeparator = 100 * '*' 
@@ -149,332 +144,433 @@ def GenerateTestData():
 	SaveVariableToFile(LMRequirementsAll, PlanYear, PlanMonth, 'LMRequirementsAll', directory=VariableDirectory)
 
 
-# **************************************************************************************
-# Input Parameters: Plan Month
-# **************************************************************************************
+# training script; the script body runs in the main process only, as worker processes of
+# multiprocessing (like FindOptimalAssignmentSolutionMultiStart) re-import this module on Windows
+if __name__ == '__main__':
+	# **************************************************************************************
+	# connection to local database
+	# **************************************************************************************
+
+	# connection to local db
+	dbcon = psycopg2.connect(**PrimaryDB) 
+	dbcur = dbcon.cursor()
+
+	# **************************************************************************************
+	# Input Parameters: Plan Month
+	# **************************************************************************************
+
+	print "PlanYear = %s" % PlanYear
+	print "PlanMonth = %s" % PlanMonth
+
+	# first and last days of PlanMonth
+	(PlanMonthFirstDay, PlanMonthLastDay) = GetFirstAndLastDaysOfMonth(PlanYear, PlanMonth)
+	PlanMonthFirstDayOrd = PlanMonthFirstDay.toordinal()
+	PlanMonthLastDayOrd = PlanMonthLastDay.toordinal()
+
+	print "\nDays of Plan Month %s and Year %s:" % (PlanMonth, PlanYear)
+	for DayOrd in range(PlanMonthFirstDayOrd, PlanMonthLastDayOrd+1):
+		print "Date: %s, DayOrd: %s, Weekday: %s" % (ConvertDateOrdinalToDateString(DayOrd), DayOrd, GetWeekdayOfDate(DayOrd))
+
+	# **************************************************************************************
+	# Input Parameters: Remaining Line Measurement (LM) Requirements
+	# Relevant TUs & Gattungs
+	# **************************************************************************************
+
+	print 
+	print LineSeparator
+	print "Remaining Line Measurement Requirements for PlanMonth"
+	print LineSeparator
+
+	# LM Requirements per LineKey (LineID, TimeWindow, WeekdayGroup):
+	# (remaining measurement requirements for the rest of the year)
+	LMRequirementsAll = {
+		('3.S5', 2, 11): 	2,
+		('3.S5', 2, 12): 	2,
+		('3.S5', 2, 13):	2,
+		('3.S5', 3, 11): 	2,
+		('3.S5', 3, 12): 	2,
+		('3.S5', 3, 13):	2,
+
+		('3.S52', 2, 11): 	2,
+		('3.S52', 2, 12): 	2,
+		('3.S52', 2, 13):	2,
+		('3.S52', 3, 11): 	2,
+		('3.S52', 3, 12): 	2,
+		('3.S52', 3, 13):	2,
+
+		('3.S6', 2, 11): 	2,
+		('3.S6', 2, 12): 	2,
+		('3.S6', 2, 13):	2,
+		('3.S6', 3, 11): 	2,
+		('3.S6', 3, 12): 	2,
+		('3.S6', 3, 13):	2,
+	}
+
+	print "\nLMRequirements:"
+	PrintDictionaryContent(LMRequirementsAll)
+
+	# Get list of all required line IDs
+	LineList = set()
+	for key in LMRequirementsAll.keys():
+		line = key[0]
+		LineList.add(line)
+	print "\nAll required LineIDs (%s):" % len(LineList)
+	print LineList
+
+	# Relevant TUs and Gattings are required as limiting & filtering
+	# parameters for RouteConditions
+	RelevantTUs = None
+	RelevantGattungs = None 
+
+	# For the sake of completeness & simplicity, all lines are mapped to a single LineBundle
+	LineToBundle = {}
+	LBname = 'LineBundle-1'
+	for LineID in LineList:
+		LineToBundle[LineID] = LBname
+
+	# station measurement requirements
+	StationMeasurementRequirementsPerLB = {}
+	StationMeasurementRequirementsPerLB[LBname] = 30 
+
+	# **************************************************************************************
+	# Input Parameters: Customer Preferences
+	# **************************************************************************************
+
+	print 
+	print LineSeparator
+	print "Customer Preferences"
+	print LineSeparator
+
+	# List of Test Customers (test travelers)
+	# AllTestCustomers[t] = NameOfTC
+	AllTestCustomers = {
+		1: 	"Murtaza",
+		2: 	"Hatice",
+		3: 	"Manfred",
+		4: 	"Elif",
+	}
+
+	print "\nAllTestCustomers:"
+	PrintDictionaryContent(AllTestCustomers)
+
+	# Depots: start station per test customer
+	# StartingStationTC[t] = StationNr 	(Depot)
+	# 8507000: Bern 
+	# 8503000: Zürich
+	StartStationPerTestCustomer = {
+		1: 8507000, 		# Murtaza --> Bern
+		2: 8507000, 		# Hatice --> Bern
+		3: 8503000, 		# Manfred --> Zürich
+		4: 8503000,			# Elif --> Zürich
+	}
+
+	print "\nStartStationPerTestCustomer:"
+	PrintDictionaryContent(StartStationPerTestCustomer)
+
+	# Availability: Availability of Test Customers
+	# Availability[(t,d)] = [(m1,m2),(m3,m4), ...] (or None, i.e. not available for the whole day)
+	# no key/value pair for key (t,d) means no time limits for (t,d)
+	Availability = {
+		(1, 736147): None, 								# Saturday
+		(1, 736148): None, 								# Sunday
+		(1, 736149): [(8*60, 14*60),(16*60, 22*60)],	# Monday
+		(1, 736154): None, 		
+		(1, 736155): None, 
+		(1, 736156): [(8*60, 14*60),(16*60, 22*60)],
+		(1, 736161): None, 
+		(1, 736162): None, 
+		(1, 736163): [(8*60, 14*60),(16*60, 22*60)],
+		(1, 736161): None, 
+		(1, 736162): None, 
+		(1, 736163): [(8*60, 14*60),(16*60, 22*60)],
+		(1, 736168): None, 								# Saturday
+		(1, 736169): None, 
+		(1, 736170): [(8*60, 14*60),(16*60, 22*60)],
+		(1, 736175): None, 
+		(1, 736176): None, 
+	}
+
+	print "\nAvailability:"
+	PrintDictionaryContent(Availability)
+
+	# Minimum total number of trips per test customer in a month
+	# MinTripCountPerTC[t] = MinDayCount
+	MinTripCountPerTC = {
+		1: 3, 
+		2: 4, 
+		3: 4, 
+		4: 3,
+	}
+
+	print "\nMinTripCountPerTC:"
+	PrintDictionaryContent(MinTripCountPerTC)
+
+	# max number of subsequent days with assigned trips
+	MaxBlockDaysPerTC = {
+		1: 2, 
+		2: 3, 
+		3: 1, 
+		4: 3,
+	}
+
+	print "\nMinTripCountPerTC:"
+	PrintDictionaryContent(MinTripCountPerTC)
+
+	# **************************************************************************************
+	# Get selected tours from Travel Planning 
+	# **************************************************************************************
+
+	print 
+	print LineSeparator
+	print "Read selected routes from saved variable"
+	print LineSeparator
+
+	Read_TestData_FromFile = True
+	if not Read_TestData_FromFile: GenerateTestData()
+
+	RouteInfoList = ReadVariableFromFile(PlanYear, PlanMonth, 'RouteInfoList', directory=VariableDirectory)
+	if not RouteInfoList:
+		raise Exception("RouteInfoList is Empty or None; no saved variable for routes!")
+
+	LMRequirementsAll = ReadVariableFromFile(PlanYear, PlanMonth, 'LMRequirementsAll', directory=VariableDirectory)
+	if not RouteInfoList:
+		raise Exception("LMRequirementsAll is Empty or None; no saved variable for routes!")
+
+	print "There are %s routes in RouteInfoList" % len(RouteInfoList)
+
+
+	# given day of year, see BU2019_BasicFunctions.py for date functions
+	day = date(2018, 4, 10)
+	dayOrd = day.toordinal()
+
+	DateStr = ConvertDateToDateString(day)
+	Weekday = GetWeekdayOfDate(dayOrd)						# 1 for Monday, 7 for Sunday
+	WeekdayGroups = GetWeekdayGroupsOfDate(WD, dayOrd)  	# 11, 12, 13, 11 for workdays (Mon-Fri)
+	WeekdayGroup = WeekdayGroups[0]
+
+	print "\nGiven date: %s, Weekday: %s, WeekdayGroup: %s" % (DateStr, Weekday, WeekdayGroup)
+
+	# **************************************************************************************
+	# Routes, Travel Segments, LM Coverage
+	# **************************************************************************************
+
+	N = 10
+
+	print 
+	print LineSeparator
+	print "Display first %s routes in RouteInfoList with Travel Segments" % N
+	print LineSeparator
+
+	ctr = 0
+	for RouteInfo in RouteInfoList:
+		ctr += 1 
+		if ctr > N: break
+
+		print "\n******* Route-%s ****************" % ctr
+
+		# print raw RouteInfo
+		print "\nRaw RouteInfo:"
+		for conn in RouteInfo:
+			conn = list(conn)
+			conn[ConnInfoInd['trafficdays_hexcode']] = '-'
+			print tuple(conn)
+
+		print "\nRouteInfo:"
+		print PrettyStringRouteInfo(RouteInfo)
+
+		print "\nTravel Segment of RouteInfo:"
+		TravelSegments = GetTravelSegments(RouteInfo, TimeWindows)
+		print PrettyStringRouteSegmentsInfo(TravelSegments)
+
+		# how to obtain LineID of a segment 
+		print "\nGet LineID of segment 1:"
+		LineID_seg1 = TravelSegments[1][SegmentInfoInd['line_id']]
+		print "LineID_seg1 = %s" % LineID_seg1
 
-print "PlanYear = %s" % PlanYear
-print "PlanMonth = %s" % PlanMonth
+		# get potential Line Measurement (LM) coverage of route (LMRequirements can be set to None)
+		(LMCoveragePerSegment, LMCoveragePerLineKey) = \
+			GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
 
-# first and last days of PlanMonth
-(PlanMonthFirstDay, PlanMonthLastDay) = GetFirstAndLastDaysOfMonth(PlanYear, PlanMonth)
-PlanMonthFirstDayOrd = PlanMonthFirstDay.toordinal()
-PlanMonthLastDayOrd = PlanMonthLastDay.toordinal()
+		print "\nPotential LM Coverage of Route per LineKey:" 
+		PrintDictionaryContent(LMCoveragePerLineKey)
 
-print "\nDays of Plan Month %s and Year %s:" % (PlanMonth, PlanYear)
-for DayOrd in range(PlanMonthFirstDayOrd, PlanMonthLastDayOrd+1):
-	print "Date: %s, DayOrd: %s, Weekday: %s" % (ConvertDateOrdinalToDateString(DayOrd), DayOrd, GetWeekdayOfDate(DayOrd))
+		# get concrete LM coverage of route for the given day
+		print "\nConcrete LM Coverage of Route per LineKey for given date %s (WeekdayGroup=%s)" % (DateStr, WeekdayGroup)
+		GetLMCoveragePerLineKeyForDay = GetLMCoverageOfRouteForGivenDay(RouteInfo, dayOrd, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
+		PrintDictionaryContent(GetLMCoveragePerLineKeyForDay)
 
-# **************************************************************************************
-# Input Parameters: Remaining Line Measurement (LM) Requirements
-# Relevant TUs & Gattungs
-# **************************************************************************************
+	# **************************************************************************************
+	# Total potential Line Measurement (LM) Coverage of all routes in RouteInfoList
+	# **************************************************************************************
 
-print 
-print LineSeparator
-print "Remaining Line Measurement Requirements for PlanMonth"
-print LineSeparator
-
-# LM Requirements per LineKey (LineID, TimeWindow, WeekdayGroup):
-# (remaining measurement requirements for the rest of the year)
-LMRequirementsAll = {
-	('3.S5', 2, 11): 	2,
-	('3.S5', 2, 12): 	2,
-	('3.S5', 2, 13):	2,
-	('3.S5', 3, 11): 	2,
-	('3.S5', 3, 12): 	2,
-	('3.S5', 3, 13):	2,
-
-	('3.S52', 2, 11): 	2,
-	('3.S52', 2, 12): 	2,
-	('3.S52', 2, 13):	2,
-	('3.S52', 3, 11): 	2,
-	('3.S52', 3, 12): 	2,
-	('3.S52', 3, 13):	2,
-
-	('3.S6', 2, 11): 	2,
-	('3.S6', 2, 12): 	2,
-	('3.S6', 2, 13):	2,
-	('3.S6', 3, 11): 	2,
-	('3.S6', 3, 12): 	2,
-	('3.S6', 3, 13):	2,
-}
-
-print "\nLMRequirements:"
-PrintDictionaryContent(LMRequirementsAll)
-
-# Get list of all required line IDs
-LineList = set()
-for key in LMRequirementsAll.keys():
-	line = key[0]
-	LineList.add(line)
-print "\nAll required LineIDs (%s):" % len(LineList)
-print LineList
-
-# Relevant TUs and Gattings are required as limiting & filtering
-# parameters for RouteConditions
-RelevantTUs = None
-RelevantGattungs = None 
-
-# For the sake of completeness & simplicity, all lines are mapped to a single LineBundle
-LineToBundle = {}
-LBname = 'LineBundle-1'
-for LineID in LineList:
-	LineToBundle[LineID] = LBname
-
-# station measurement requirements
-StationMeasurementRequirementsPerLB = {}
-StationMeasurementRequirementsPerLB[LBname] = 30 
+	print 
+	print LineSeparator
+	print "Get Total potential Line Measurement (LM) Coverage of all routes in RouteInfoList"
+	print LineSeparator
 
-# **************************************************************************************
-# Input Parameters: Customer Preferences
-# **************************************************************************************
+	# note: LMRequirements can be set to None
+	TotalLMCoveragePerLineKey = GetLMCoverageOfMultipleRoutes(RouteInfoList, ReqLineMeasureTime, PeriodBegin, PeriodEnd, 
+		LMRequirements=LMRequirementsAll)
 
-print 
-print LineSeparator
-print "Customer Preferences"
-print LineSeparator
-
-# List of Test Customers (test travelers)
-# AllTestCustomers[t] = NameOfTC
-AllTestCustomers = {
-	1: 	"Murtaza",
-	2: 	"Hatice",
-	3: 	"Manfred",
-	4: 	"Elif",
-}
-
-print "\nAllTestCustomers:"
-PrintDictionaryContent(AllTestCustomers)
-
-# Depots: start station per test customer
-# StartingStationTC[t] = StationNr 	(Depot)
-# 8507000: Bern 
-# 8503000: Zürich
-StartStationPerTestCustomer = {
-	1: 8507000, 		# Murtaza --> Bern
-	2: 8507000, 		# Hatice --> Bern
-	3: 8503000, 		# Manfred --> Zürich
-	4: 8503000,			# Elif --> Zürich
-}
-
-print "\nStartStationPerTestCustomer:"
-PrintDictionaryContent(StartStationPerTestCustomer)
-
-# Availability: Availability of Test Customers
-# Availability[(t,d)] = [(m1,m2),(m3,m4), ...] (or None, i.e. not available for the whole day)
-# no key/value pair for key (t,d) means no time limits for (t,d)
-Availability = {
-	(1, 736147): None, 								# Saturday
-	(1, 736148): None, 								# Sunday
-	(1, 736149): [(8*60, 14*60),(16*60, 22*60)],	# Monday
-	(1, 736154): None, 		
-	(1, 736155): None, 
-	(1, 736156): [(8*60, 14*60),(16*60, 22*60)],
-	(1, 736161): None, 
-	(1, 736162): None, 
-	(1, 736163): [(8*60, 14*60),(16*60, 22*60)],
-	(1, 736161): None, 
-	(1, 736162): None, 
-	(1, 736163): [(8*60, 14*60),(16*60, 22*60)],
-	(1, 736168): None, 								# Saturday
-	(1, 736169): None, 
-	(1, 736170): [(8*60, 14*60),(16*60, 22*60)],
-	(1, 736175): None, 
-	(1, 736176): None, 
-}
-
-print "\nAvailability:"
-PrintDictionaryContent(Availability)
-
-# Minimum total number of trips per test customer in a month
-# MinTripCountPerTC[t] = MinDayCount
-MinTripCountPerTC = {
-	1: 3, 
-	2: 4, 
-	3: 4, 
-	4: 3,
-}
-
-print "\nMinTripCountPerTC:"
-PrintDictionaryContent(MinTripCountPerTC)
-
-# max number of subsequent days with assigned trips
-MaxBlockDaysPerTC = {
-	1: 2, 
-	2: 3, 
-	3: 1, 
-	4: 3,
-}
-
-print "\nMinTripCountPerTC:"
-PrintDictionaryContent(MinTripCountPerTC)
+	print "\nTotal Potential LM Coverage of all Routes in RouteInfoList, per LineKey:" 
+	PrintDictionaryContent(TotalLMCoveragePerLineKey)
 
-# **************************************************************************************
-# Get selected tours from Travel Planning 
-# **************************************************************************************
 
-print 
-print LineSeparator
-print "Read selected routes from saved variable"
-print LineSeparator
+	# **************************************************************************************
+	# Prepare Assignment Parameters
+	# **************************************************************************************
 
-Read_TestData_FromFile = True
-if not Read_TestData_FromFile: GenerateTestData()
+	print 
+	print LineSeparator
+	print "Generate all parameters required for Assignment Planning"
+	print LineSeparator
 
-RouteInfoList = ReadVariableFromFile(PlanYear, PlanMonth, 'RouteInfoList', directory=VariableDirectory)
-if not RouteInfoList:
-	raise Exception("RouteInfoList is Empty or None; no saved variable for routes!")
+	AssignmentParameters = GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustomer, ReqLineMeasureTime, 
+		PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
 
-LMRequirementsAll = ReadVariableFromFile(PlanYear, PlanMonth, 'LMRequirementsAll', directory=VariableDirectory)
-if not RouteInfoList:
-	raise Exception("LMRequirementsAll is Empty or None; no saved variable for routes!")
+	print "\nAssignmentPlanParameters:\n" 
+	PrintDictionaryContent(AssignmentParameters)
 
-print "There are %s routes in RouteInfoList" % len(RouteInfoList)
+	# add other required parameters 
+	AssignmentParameters['StartStationPerTestCustomer'] = StartStationPerTestCustomer
+	AssignmentParameters['LMRequirements'] = LMRequirementsAll
+	AssignmentParameters['RevenueLineMeasure'] = RevenueLineMeasure
+	AssignmentParameters['CostLineMeasure'] = CostLineMeasure
+	AssignmentParameters['TripCostPerTimeInterval'] = TripCostPerTimeInterval
+	AssignmentParameters['RouteInfoList'] = RouteInfoList
+	AssignmentParameters['MinTripCountPerTC'] = MinTripCountPerTC
 
+	# UpperLimitLMperLineKey
+	MaxSurpLusLM = 2
+	UpperLimitLMperLineKey = {}
+	for LineKey in LMRequirementsAll:
+		UpperLimitLMperLineKey[LineKey] = LMRequirementsAll[LineKey] + MaxSurpLusLM
 
-# given day of year, see BU2019_BasicFunctions.py for date functions
-day = date(2018, 4, 10)
-dayOrd = day.toordinal()
+	AssignmentParameters['UpperLimitLMperLineKey'] = UpperLimitLMperLineKey
 
-DateStr = ConvertDateToDateString(day)
-Weekday = GetWeekdayOfDate(dayOrd)						# 1 for Monday, 7 for Sunday
-WeekdayGroups = GetWeekdayGroupsOfDate(WD, dayOrd)  	# 11, 12, 13, 11 for workdays (Mon-Fri)
-WeekdayGroup = WeekdayGroups[0]
+	# **************************************************************************************
+	# Execute Assignment Planning
+	# **************************************************************************************
 
-print "\nGiven date: %s, Weekday: %s, WeekdayGroup: %s" % (DateStr, Weekday, WeekdayGroup)
+	# set all assignment conditions
 
-# **************************************************************************************
-# Routes, Travel Segments, LM Coverage
-# **************************************************************************************
+	AssignmentConditions = {
+		# mandatory condition
+		AssignCond.FirstAndLastDaysOfMeasurementPeriod: (StartDate.toordinal(), EndDate.toordinal()),
 
-N = 10
+		# only single TravelID per day is allowed
+		AssignCond.SingleFahrtIDMeasurementPerDay: (True,),
 
-print 
-print LineSeparator
-print "Display first %s routes in RouteInfoList with Travel Segments" % N
-print LineSeparator
+		# minimum number of trips per Test Customer
+		AssignCond.MinNumberOfTripsPerTC: 	(MinTripCountPerTC,),
 
-ctr = 0
-for RouteInfo in RouteInfoList:
-	ctr += 1 
-	if ctr > N: break
-	
-	print "\n******* Route-%s ****************" % ctr
+		# max number of subsequent days with trips per Test Customer
+		AssignCond.MaxAllowedBlockDaysPerTC: 	(MaxBlockDaysPerTC,),
 
-	# print raw RouteInfo
-	print "\nRaw RouteInfo:"
-	for conn in RouteInfo:
-		conn = list(conn)
-		conn[ConnInfoInd['trafficdays_hexcode']] = '-'
-		print tuple(conn)
+		# upper limit to line measurements per LineKey
+		AssignCond.MaxNumberOfMeasurementsPerLineKey:	(UpperLimitLMperLineKey,),
 
-	print "\nRouteInfo:"
-	print PrettyStringRouteInfo(RouteInfo)
+	}
 
-	print "\nTravel Segment of RouteInfo:"
-	TravelSegments = GetTravelSegments(RouteInfo, TimeWindows)
-	print PrettyStringRouteSegmentsInfo(TravelSegments)
+	# find optimal solutions, simple optimization without foresight
+	(AssignmentSolution, SolutionValue, LMCoverageOfSolution, IncrementalValuePerTDR) = FindOptimalAssignmentSolution(AssignmentConditions, AssignmentParameters)
 
-	# how to obtain LineID of a segment 
-	print "\nGet LineID of segment 1:"
-	LineID_seg1 = TravelSegments[1][SegmentInfoInd['line_id']]
-	print "LineID_seg1 = %s" % LineID_seg1
+	# save solution to file
+	SaveVariableToFile(AssignmentSolution, PlanYear, PlanMonth, 'AssignmentSolution', directory=VariableDirectory)
 
-	# get potential Line Measurement (LM) coverage of route (LMRequirements can be set to None)
-	(LMCoveragePerSegment, LMCoveragePerLineKey) = \
-		GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
+	print "\nAssignment Solution (t,d,r):"
+	print PrettyStringAssignmentSolution(AssignmentSolution, AllTestCustomers)
 
-	print "\nPotential LM Coverage of Route per LineKey:" 
-	PrintDictionaryContent(LMCoveragePerLineKey)
+	print "\nLMCoverageOfSolution:" 
+	PrintDictionaryContent(LMCoverageOfSolution)
 
-	# get concrete LM coverage of route for the given day
-	print "\nConcrete LM Coverage of Route per LineKey for given date %s (WeekdayGroup=%s)" % (DateStr, WeekdayGroup)
-	GetLMCoveragePerLineKeyForDay = GetLMCoverageOfRouteForGivenDay(RouteInfo, dayOrd, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
-	PrintDictionaryContent(GetLMCoveragePerLineKeyForDay)
+	print "\nSolutionValue = %s" % SolutionValue
 
-# **************************************************************************************
-# Total potential Line Measurement (LM) Coverage of all routes in RouteInfoList
-# **************************************************************************************
+	print "\nIncrementalValuePerTDR = %s" % IncrementalValuePerTDR
 
-print 
-print LineSeparator
-print "Get Total potential Line Measurement (LM) Coverage of all routes in RouteInfoList"
-print LineSeparator
+	# **************************************************************************************
+	# Execute Multi-Start Assignment Planning
+	# **************************************************************************************
 
-# note: LMRequirements can be set to None
-TotalLMCoveragePerLineKey = GetLMCoverageOfMultipleRoutes(RouteInfoList, ReqLineMeasureTime, PeriodBegin, PeriodEnd, 
-	LMRequirements=LMRequirementsAll)
+	# best of several greedy runs with random TC orders, reproducible for given MasterSeed
+	(AssignmentSolutionMS, SolutionValueMS, LMCoverageOfSolutionMS, IncrementalValuePerTDRMS, MultiStartStatistics) = \
+		FindOptimalAssignmentSolutionMultiStart(AssignmentConditions, AssignmentParameters, NumberOfStarts=16, MasterSeed=100)
 
-print "\nTotal Potential LM Coverage of all Routes in RouteInfoList, per LineKey:" 
-PrintDictionaryContent(TotalLMCoveragePerLineKey)
+	print "\nMulti-start statistics:"
+	PrintDictionaryContent(MultiStartStatistics)
 
+	print "\nSolutionValue (best of multi-start) = %s" % SolutionValueMS
 
-# **************************************************************************************
-# Prepare Assignment Parameters
-# **************************************************************************************
+	# **************************************************************************************
+	# Execute Assignment Planning with Joint Per-Day Assignments
+	# **************************************************************************************
 
-print 
-print LineSeparator
-print "Generate all parameters required for Assignment Planning"
-print LineSeparator
+	# best joint set of trips of all TCs for each day (branch-and-bound), instead of TC by TC
+	(AssignmentSolutionPD, SolutionValuePD, LMCoverageOfSolutionPD, IncrementalValuePerTDRPD) = \
+		FindOptimalAssignmentSolutionPerDay(AssignmentConditions, AssignmentParameters, MaxNodeCountPerDay=100000)
 
-AssignmentParameters = GenerateAssignmentPlanningVariables(RouteInfoList, StartStationPerTestCustomer, ReqLineMeasureTime, 
-	PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
+	print "\nSolutionValue (joint per-day assignments) = %s" % SolutionValuePD
 
-print "\nAssignmentPlanParameters:\n" 
-PrintDictionaryContent(AssignmentParameters)
+	# **************************************************************************************
+	# Improve Assignment Solution by Local Search
+	# **************************************************************************************
 
-# add other required parameters 
-AssignmentParameters['StartStationPerTestCustomer'] = StartStationPerTestCustomer
-AssignmentParameters['LMRequirements'] = LMRequirementsAll
-AssignmentParameters['RevenueLineMeasure'] = RevenueLineMeasure
-AssignmentParameters['CostLineMeasure'] = CostLineMeasure
-AssignmentParameters['TripCostPerTimeInterval'] = TripCostPerTimeInterval
-AssignmentParameters['RouteInfoList'] = RouteInfoList
-AssignmentParameters['MinTripCountPerTC'] = MinTripCountPerTC
+	# revise myopic greedy choices with swap/relocate/replace/drop/insert moves
+	(AssignmentSolutionLS, SolutionValueLS, LMCoverageOfSolutionLS, LocalSearchStatistics) = ImproveAssignmentSolutionByLocalSearch(
+		AssignmentSolutionMS, AssignmentConditions, AssignmentParameters, Method='SA', TimeBudget=30)
 
-# UpperLimitLMperLineKey
-MaxSurpLusLM = 2
-UpperLimitLMperLineKey = {}
-for LineKey in LMRequirementsAll:
-	UpperLimitLMperLineKey[LineKey] = LMRequirementsAll[LineKey] + MaxSurpLusLM
+	print "\nLocal search statistics:"
+	PrintDictionaryContent(LocalSearchStatistics)
 
-AssignmentParameters['UpperLimitLMperLineKey'] = UpperLimitLMperLineKey
+	print "\nSolutionValue (local search) = %s" % SolutionValueLS
 
-# **************************************************************************************
-# Execute Assignment Planning
-# **************************************************************************************
+	# **************************************************************************************
+	# Execute Assignment Planning with MILP Solver
+	# **************************************************************************************
+
+	# exact optimization with the default MILP solver (see GetDefaultMILPSolver), improved greedy solution as warm start
+	(AssignmentSolutionMILP, SolutionValueMILP, LMCoverageOfSolutionMILP, SolverStatus) = FindOptimalAssignmentSolutionMILP(
+		AssignmentConditions, AssignmentParameters, WarmStartSolution=AssignmentSolutionLS, TimeLimit=60)
+
+	print "\nAssignment Solution of MILP (t,d,r):"
+	print PrettyStringAssignmentSolution(AssignmentSolutionMILP, AllTestCustomers)
 
-# set all assignment conditions
+	print "\nLMCoverageOfSolution (MILP):" 
+	PrintDictionaryContent(LMCoverageOfSolutionMILP)
 
-AssignmentConditions = {
-	# mandatory condition
-	AssignCond.FirstAndLastDaysOfMeasurementPeriod: (StartDate.toordinal(), EndDate.toordinal()),
+	print "\nSolutionValue (MILP) = %s" % SolutionValueMILP
 
-	# only single TravelID per day is allowed
-	AssignCond.SingleFahrtIDMeasurementPerDay: (True,),
+	# **************************************************************************************
+	# Rolling-Horizon Assignment Planning over all PlanMonths
+	# **************************************************************************************
 
-	# minimum number of trips per Test Customer
-	AssignCond.MinNumberOfTripsPerTC: 	(MinTripCountPerTC,),
+	# plan each month with lookahead of one month; route pool and parameters are reused across months
+	PlanningCache = InitRollingHorizonCache(StartStationPerTestCustomer, LMRequirementsAll, RouteInfoList)
 
-	# upper limit to line measurements per LineKey
-	AssignCond.MaxNumberOfMeasurementsPerLineKey:	(UpperLimitLMperLineKey,),
+	(AssignmentSolutionPerMonth, SolutionValuePerMonth, RemainingLMRequirements, RollingHorizonStatistics) = \
+		PlanAssignmentsWithRollingHorizon(PlanningCache, PlanYear, PlanMonths, AssignmentConditions, AssignmentParameters, 
+		LookaheadMonths=1, AssignmentFuncParameters=(100, False))
 
-}
+	print "\nSolutionValuePerMonth (rolling horizon):"
+	PrintDictionaryContent(SolutionValuePerMonth)
 
-# find optimal solutions, simple optimization without foresight
-(AssignmentSolution, SolutionValue, LMCoverageOfSolution, IncrementalValuePerTDR) = FindOptimalAssignmentSolution(AssignmentConditions, AssignmentParameters)
+	print "\nRemaining LM Requirements after PlanMonths:"
+	PrintDictionaryContent(RemainingLMRequirements)
 
-# save solution to file
-SaveVariableToFile(AssignmentSolution, PlanYear, PlanMonth, 'AssignmentSolution', directory=VariableDirectory)
+	# **************************************************************************************
+	# Incremental Re-planning after Availability Changes
+	# **************************************************************************************
 
-print "\nAssignment Solution (t,d,r):"
-print PrettyStringAssignmentSolution(AssignmentSolution, AllTestCustomers)
+	# test customer 1 reports new unavailability on the days of its first two trips
+	AvailabilityDelta = {}
+	for (t,d,r) in AssignmentSolutionLS:
+		if t == 1 and len(AvailabilityDelta) < 2:
+			AvailabilityDelta[(t,d)] = None
 
-print "\nLMCoverageOfSolution:" 
-PrintDictionaryContent(LMCoverageOfSolution)
+	(AssignmentSolutionRP, SolutionValueRP, LMCoverageOfSolutionRP, ReplanDiff) = ReplanAssignmentSolutionForAvailabilityDelta(
+		AssignmentSolutionLS, AvailabilityDelta, AssignmentConditions, AssignmentParameters)
 
-print "\nSolutionValue = %s" % SolutionValue
+	print "\nRe-planning diff:"
+	PrintDictionaryContent(ReplanDiff)
 
-print "\nIncrementalValuePerTDR = %s" % IncrementalValuePerTDR
\ No newline at end of file
+	print "\nSolutionValue (re-planned) = %s" % SolutionValueRP
\ No newline at end of file
@@ -25,8 +25,6 @@ import itertools as it
 
 import csv
 from matplotlib import pyplot as plt
-import gurobipy as gp
-from gurobipy import GRB
 import pandas as pd
 import numpy as np
 
@@ -34,6 +32,7 @@ from BU2019_CentralParameters import *
 from BU2019_BasicFunctionsLib import *
 from BU2019_TourSearch import *
 from BU2020_AssignmentFunctions import *
+from BU2020_RouteSelectionMILP import *
 
 # **************************************************************************************
 # start
@@ -193,7 +192,8 @@ if __name__ == '__main__':
 	print LineSeparator
 	
 	global AllRoutes
-	AllRoutes=[]
+	RouteStream = InitDistinctRouteStream()
+	AllRoutes = RouteStream['DistinctRoutes']
 
 	print "Starting to create requirement Clusters"
 	requirement_clusters={ 
@@ -568,13 +568,15 @@ if __name__ == '__main__':
 		CoverageForClusterFileWriter.writerows(CoverageForCluster)
 		CoverageForClusterFile.close()
 
-		AllRoutes.extend(FoundRoutes)
+		# merge found routes into AllRoutes without duplicates
+		NewRoutes = AddRoutesToDistinctRouteStream(RouteStream, FoundRoutes)
+		print "%s of %s found routes are new (not found for a previous cluster)" % (len(NewRoutes), len(FoundRoutes))
 
 	print LineSeparator
 	print "Evaluate tours"
 	print LineSeparator
 
-	print "All Routes is a list that contains %s routes." % len(AllRoutes)
+	print "All Routes is a list that contains %s distinct routes (%s routes found in total)." % (len(AllRoutes), RouteStream['RouteCount'])
 
 	# **************************************************************************************
 	# Line Measurement (LM) Coverage of Routes
@@ -798,28 +800,16 @@ if __name__ == '__main__':
 	}
 	
 	LMCoverageTotal = {}
-	RouteCosts = {}
-	RouteInd=1
-	Routes = {}
+	LMCoveragePerRoute = []
+	RoutesWithCoverage = []
 
 	for RouteInfo in AllRoutes:
-		RouteName='Route' + str(RouteInd)
-		
-		if RouteName not in Routes : 
-			Routes[RouteName]={}
-		
 		(LMCoveragePerSegment, LMCoveragePerLineKey) = \
 			GetLMCoverageOfRoute(RouteInfo, ReqLineMeasureTime, PeriodBegin, PeriodEnd, LMRequirements=LMRequirementsAll)
 		
 		if len(LMCoveragePerLineKey)>0:
-			RouteInd = RouteInd+1
-			for key,value in LMCoveragePerLineKey.items():
-				# Put the key in the first column for each key in the dictionary
-				Routes[RouteName][str(key)]=value
-			departure_first_station = RouteInfo[0][ConnInfoInd['departure_hour']]*60 + RouteInfo[0][ConnInfoInd['departure_min']]
-			arrival_last_station = RouteInfo[-1][ConnInfoInd['arrival_hour']]*60 + RouteInfo[-1][ConnInfoInd['arrival_min']]
-			routeDur=arrival_last_station-departure_first_station
-			RouteCosts[RouteName]=routeDur
+			LMCoveragePerRoute.append(LMCoveragePerLineKey)
+			RoutesWithCoverage.append(RouteInfo)
 
 		LMCoverageTotal = AddDicValues(LMCoverageTotal, LMCoveragePerLineKey)
 	
@@ -854,49 +844,25 @@ if __name__ == '__main__':
 	CoverageFileWriter.writerow(NumberOfRoutes)
 	CoverageFile.close()
 
-	CoverReqforLPstr = {}
-	for key,value in LMCoverageTotal.items():
-		# Put the key in the first column for each key in the dictionary
-		CoverReqforLPstr[str(key)] = LMRequirementsAll[key]
-
-	#LP Model & Gurobi Start
-
-	model = gp.Model("mipl")
-
-	CoverReqforLP = dict((k,int(v)) for k,v in CoverReqforLPstr.iteritems())
-
-	route_line_param ={}
-
-	for route_name in Routes:
-
-		for lines in CoverReqforLP.keys():
-
-			if lines in Routes[route_name]:
-				route_line_param[route_name,lines]=1
-			else:
-				route_line_param[route_name,lines]=0
-
-	#Create Decision Variables
-	selected_routes = model.addVars(Routes.keys(), lb=0,vtype=GRB.INTEGER,name="open")
-	model.update()
-
-	#Objective Function (belki quicksum daha iyi gurobide)
-	model.setObjective(sum(CoverReqforLP[j]*150 for j in CoverReqforLP) - sum(1*RouteCosts[i]*selected_routes[i] for i in RouteCosts), GRB.MAXIMIZE)
+	# **************************************************************************************
+	# Route Selection MILP (sparse coverage matrix)
+	# **************************************************************************************
+	print LineSeparator 
+	print "Route Selection MILP"
+	print LineSeparator
 
-	#Add Constraints
-	for lines in CoverReqforLP:
-		model.addConstr(sum(selected_routes[route]*route_line_param[route,lines] for route in Routes.keys())>=CoverReqforLP[lines])
+	# route covers a LineKey or not (1/0), revenue 150 per required line measurement
+	(Coverage, LineKeys) = GetCoverageMatrixOfRoutes(LMCoveragePerRoute, sorted(LMRequirementsAll.keys()), BinaryCoverage=True)
+	RouteCosts = GetDurationOfRoutes(RoutesWithCoverage)
 
-	model.update()
-	model.optimize()
+	Model = GenerateRouteSelectionMILP(Coverage, LineKeys, LMRequirementsAll, RouteCosts, RevenueLineMeasure=150)
+	print "Route selection MILP: %s columns, %s rows, %s nonzeros" % (Model['A'].shape[1], Model['A'].shape[0], Model['A'].nnz)
 
-	# for v in model.getVars():
-	# 	print('%s %g' % (v.varName, v.x))
+	(Status, x, ObjValue, SolveTime) = SolveMILP(Model, Solver='gurobi')
+	print "Solver status: %s, solve time: %.2f seconds, objective value: %s" % (Status, SolveTime, ObjValue)
 
-	Profit=["Profit:",model.objVal]
+	Profit=["Profit:",ObjValue]
 	ProfitFile = open("CoverageForClusters.csv",'a')
 	ProfitFileWriter= csv.writer(ProfitFile,delimiter=',',dialect='excel',lineterminator = '\n')
 	ProfitFileWriter.writerow(Profit)
-	ProfitFile.close()
-
-	print('Obj: %g' % model.objVal)
\ No newline at end of file
+	ProfitFile.close()
\ No newline at end of file